@@ -3,41 +3,165 @@ import streamlit as st
 import pandas as pd
 from collections import Counter
 from datetime import datetime
+from html import escape
 from streamlit.components.v1 import html
 from fpdf import FPDF
-import os
 import io
+import json
+import time
+import uuid
 import numpy as np  # noqa: F401
 import traceback
-from core.pdf_reader import extract_text_from_pdf
+from core.pdf_reader import document_id
+from core.pipeline import boq_record, checklist_record, deduplicated_pages, iter_document
+from core.report import ReportWriter
 from core.checker import check_items
-from core.evidence_counter import collect_evidence
-from core.boq_extractor import find_boq_page, extract_boq_table_with_cv
+from core.checklist import CHECKLIST_ITEMS, IGNORE_TITLES, STRUCTURED_ITEMS
+from core.doc_index import save_document
+from core.evidence_counter import build_evidence_index, locate_label, update_evidence_pages
+from core.document_store import get_document_store
+from core.job_store import JOB_DONE, JOB_FAILED
+from core.service_client import get_job, get_result, get_service_url, get_trace, pages_from_result, submit_job
+from core.config import load_config
+from core.instrumentation import process_metrics, trace_document
+from core.ocr_scheduler import get_ocr_scheduler, ocr_session
 
-st.cache_data.clear()
 # ---- CACHING ----
-@st.cache_data
-def process_uploaded_pdf(uploaded_file_bytes):
-    if not os.path.exists('data'):
-        os.makedirs('data')
-    temp_file_path = f"data/temp_{datetime.now().timestamp()}.pdf"
-    with open(temp_file_path, "wb") as f:
-        f.write(uploaded_file_bytes)
-
-    ignore_titles = [
-        "CHECKLIST VERIFIKASI BA UJI TERIMA",
-        "CHECKLIST VERIFIKASI BERITA ACARA UJI TERIMA",
-        "CHECKLIST VERIFIKASI BERITA ACARA COMMISSIONING TEST",
-        "DOKUMEN BERITA ACARA UJI TERIMA KESATU",
-        "DOKUMEN BERITA ACARA UJI TERIMA",
-    ]
-    text_per_page, images = extract_text_from_pdf(temp_file_path, ignore_titles=ignore_titles)
-
-    boq_page_index = find_boq_page(images)
-    df_boq_auto = extract_boq_table_with_cv(images, boq_page_index)
-
-    os.remove(temp_file_path)
-    return text_per_page, images, boq_page_index, df_boq_auto
+# Hasil OCR per halaman juga disimpan di cache disk (core/ocr_cache.py), sehingga
+# restart server atau upload ulang dokumen yang sedikit berubah tidak mengulang OCR.
+def format_check_results(check_results, structured_items):
+    formatted_results = []
+    for i, row in enumerate(check_results):
+        no, sub, item = structured_items[i]
+
+        # Format keterangan berdasarkan list 'Pages' yang diterima
+        keterangan_text = "Halaman tidak ditemukan atau judul tidak sesuai."
+        if row["Pages"]: # Jika list tidak kosong
+            # Ubah list angka menjadi string yang dipisahkan koma
+            pages_str = ', '.join(map(str, row["Pages"]))
+            keterangan_text = f"Ada di halaman {pages_str}"
+
+        formatted_results.append({
+            "No": no,
+            "": sub,
+            "ITEM YG DI PERIKSA": item,
+            "STATUS OK": "✔" if row["Status"] == "OK" else "",
+            "STATUS NOK": "✔" if row["Status"] == "NOK" else "",
+            "KETERANGAN": keterangan_text # Menggunakan keterangan yang sudah di format
+        })
+    return formatted_results
+
+def session_id():
+    # ID sesi browser, dipakai untuk antrian adil OCR lokal maupun antrian job di service
+    return st.session_state.setdefault('client_id', uuid.uuid4().hex)
+
+def process_uploaded_pdf(uploaded_file_bytes, doc_id, live_placeholder):
+    """
+    Memproses PDF halaman demi halaman; tabel checklist di live_placeholder diperbarui
+    setiap kali satu halaman selesai, dan OCR berhenti lebih awal jika semua item sudah OK
+    dan halaman BOQ sudah ditemukan. Hasil disimpan di session_state per dokumen.
+    """
+    results = st.session_state.setdefault('local_results', {})
+    if doc_id not in results:
+        result = None
+        # PDF dibuka langsung dari byte upload, tanpa file sementara di data/
+        with trace_document() as trace, ocr_session(session_id()):
+            for event in iter_document(uploaded_file_bytes, ignore_titles=IGNORE_TITLES):
+                if event["event"] == "done":
+                    result = event
+                    continue
+                with live_placeholder.container():
+                    st.progress(
+                        (event["index"] + 1) / event["page_count"],
+                        text=f"Menganalisis halaman {event['index'] + 1}/{event['page_count']}...",
+                    )
+                    st.dataframe(
+                        pd.DataFrame(format_check_results(event["check_results"], STRUCTURED_ITEMS)),
+                        hide_index=True, use_container_width=True,
+                    )
+        live_placeholder.empty()
+        st.session_state.setdefault('traces', {})[doc_id] = trace.to_json()
+
+        if not result["pages"]:
+            results[doc_id] = ([], [], -1, pd.DataFrame())
+        else:
+            # Gambar halaman tetap di document store; yang disimpan di sesi hanya handle
+            page_handles = get_document_store().register(doc_id, result["images"])
+            results[doc_id] = (result["pages"], page_handles, result["boq_page_index"], result["df_boq"])
+            save_document(doc_id, result["pages"], result["boq_page_index"], result["df_boq"])
+    return results[doc_id]
+
+# Indeks bukti disimpan sebagai resource (tidak di-pickle, tidak dihitung ulang setiap rerun)
+@st.cache_resource(max_entries=8, show_spinner=False)
+def get_evidence_index(doc_id, _images, _pages, boq_page_index, _df_boq):
+    evidence_index = build_evidence_index(_images, _pages, boq_page_index)
+    # Halaman yang baru di-OCR untuk bukti ikut disimpan, agar replay aturan bisa melihatnya
+    save_document(doc_id, _pages, boq_page_index, _df_boq)
+    return evidence_index
+
+def process_via_service(service_url, uploaded_file_bytes, doc_id):
+    """
+    Mode klien tipis: PDF dikirim ke service worker, lalu status job dipantau sampai selesai.
+    Hasil disimpan di session_state sehingga rerun tidak perlu bertanya ke service lagi.
+    """
+    results = st.session_state.setdefault('service_results', {})
+    if doc_id not in results:
+        job = submit_job(service_url, uploaded_file_bytes, session_id())
+        progress_bar = st.progress(0.0, text="Menunggu antrian...")
+        while job["status"] not in (JOB_DONE, JOB_FAILED):
+            time.sleep(1)
+            job = get_job(service_url, job["job_id"])
+            progress = job.get("progress") or {}
+            if job.get("queue_position") is not None:
+                progress_bar.progress(0.0, text=f"Menunggu antrian (posisi {job['queue_position'] + 1})...")
+            elif progress.get("total"):
+                progress_bar.progress(
+                    min(progress["done"] / progress["total"], 1.0),
+                    text=f"{progress['stage']}: {progress['done']}/{progress['total']}",
+                )
+        progress_bar.empty()
+        if job["status"] == JOB_FAILED:
+            raise RuntimeError(job.get("error") or "Job gagal diproses oleh service.")
+        results[doc_id] = get_result(service_url, job["job_id"])
+        try:
+            st.session_state.setdefault('traces', {})[doc_id] = get_trace(service_url, job["job_id"])
+        except Exception as e:
+            print(f"PERINGATAN: Trace job tidak bisa diambil: {e}")
+
+    result = results[doc_id]
+    pages = pages_from_result(result)
+    df_boq_auto = pd.DataFrame(result.get("boq_rows", []))
+    boq_page_index = result.get("boq_page_index", -1)
+    evidence_index = result.get("evidence_index")
+    if evidence_index is None:
+        # Hasil job lama tanpa indeks bukti: cukup cari di teks yang sudah ada, tanpa OCR lokal
+        evidence_index = build_evidence_index(None, pages, boq_page_index)
+    return pages, boq_page_index, df_boq_auto, evidence_index
+
+def render_debug_panel(trace_json):
+    """
+    Panel debug profiling: waktu per tahap, pemanggilan OCR per config psm dan per halaman,
+    serta counter kumulatif proses (cache OCR, render, fuzzy match).
+    """
+    with st.expander("🛠️ Debug: profiling pemrosesan", expanded=False):
+        if trace_json:
+            summary = trace_json["summary"]
+            st.subheader("Dokumen ini")
+            st.dataframe(pd.DataFrame.from_dict(summary["stages"], orient="index"), use_container_width=True)
+            col1, col2 = st.columns(2)
+            col1.caption("OCR per config psm")
+            col1.dataframe(pd.DataFrame.from_dict(summary["ocr_by_config"], orient="index"), use_container_width=True)
+            col2.caption("OCR per halaman (index 0)")
+            col2.dataframe(pd.DataFrame.from_dict(summary["ocr_by_page"], orient="index"), use_container_width=True)
+            st.json(summary["totals"])
+            st.download_button(
+                label="Download trace (JSON)",
+                data=json.dumps(trace_json, ensure_ascii=False, indent=2),
+                file_name="trace.json",
+                mime="application/json",
+            )
+        st.subheader("Kumulatif proses ini")
+        st.code(process_metrics().to_prometheus(extra=get_ocr_scheduler().snapshot()), language="text")
 
 # ---- APLIKASI UTAMA ----
 st.set_page_config(page_title="SIVERDI | Sistem Verifikasi Dokumen Internal", layout="wide")
@@ -51,8 +175,8 @@ if 'final_report_df' not in st.session_state:
     st.session_state.final_report_df = None    
 if 'comparison_df' not in st.session_state:
     st.session_state.comparison_df = None
-if 'evidence_galleries' not in st.session_state:
-    st.session_state.evidence_galleries = None
+if 'evidence_pages' not in st.session_state:
+    st.session_state.evidence_pages = {}
 if 'boq_data_for_gallery' not in st.session_state:
     st.session_state.boq_data_for_gallery = None
 if 'stage' not in st.session_state:
@@ -61,108 +185,61 @@ if 'stage' not in st.session_state:
 uploaded_file = st.file_uploader("Upload dokumen PDF", type="pdf")
 if uploaded_file:
     uploaded_file_bytes = uploaded_file.getvalue()
+    doc_id = document_id(uploaded_file_bytes)
+    document_store = get_document_store()
+    service_url = get_service_url()
+
+    tab1, tab2 = st.tabs(["Checklist Kelengkapan Item", "Verifikasi Kuantitas BOQ"])
+    with tab1:
+        # Checklist sementara selama dokumen masih diproses
+        live_placeholder = st.empty()
+
     try:
-        text_per_page, images, boq_page_index, df_boq_auto = process_uploaded_pdf(uploaded_file_bytes)
+        if service_url:
+            # OCR berjalan di service worker; di sini hanya memantau job
+            pages, boq_page_index, df_boq_auto, service_evidence_index = process_via_service(
+                service_url, uploaded_file_bytes, doc_id
+            )
+            document_store.ensure(doc_id, uploaded_file_bytes)
+            page_handles = document_store.handles(doc_id) if pages else []
+        else:
+            pages, page_handles, boq_page_index, df_boq_auto = process_uploaded_pdf(
+                uploaded_file_bytes, doc_id, live_placeholder
+            )
+            service_evidence_index = None
     except Exception as e:
         st.error(f"❌ Terjadi error saat memproses PDF: {e}")
         st.text(traceback.format_exc())
         st.stop()
 
-    if not images:
+    if not page_handles:
         st.error("Gagal memproses file PDF.")
         st.stop()
-        
-    st.success("File berhasil dianalisis!")
 
-    tab1, tab2 = st.tabs(["Checklist Kelengkapan Item", "Verifikasi Kuantitas BOQ"])
+    # Piksel halaman diambil dari document store hanya saat ditampilkan
+    document_store.ensure(doc_id, uploaded_file_bytes)
+    images = document_store.images(doc_id)
 
     with tab1:
-        st.header("Hasil Pengecekan Kelengkapan Dokumen")
-    # Kata kunci pencarian yang diperbarui dan lebih akurat
-    # Menggunakan list untuk memungkinkan beberapa kemungkinan judul per item
-        checklist_items = {
-            # Pencarian menggunakan metode regex
-            "BAUT": {
-                "keywords": [r"BERITA ACARA\s*UJI TERIMA"],
-                "method": "regex"
-            },
-            "Laporan UT": {
-                "keywords": ["LAPORAN UJI TERIMA", r"LAPORAN\s*UJI TERIMA"],
-                "method": "regex"
-            },
-            # Pencarian menggunakan metode title
-            "BA Test Commissioning": {
-                "keywords": ["BERITA ACARA COMMISSIONING TEST"],
-                "method": "title"
-            },
-            "Redline Drawing": {
-                "keywords": ["PETA LOKASI", "SKEMA KABEL", "SKEMA"],
-                "method": "title"
-            },
-            "BoQ Akhir": {
-                "keywords": ["BILL OF QUANTITY UJI TERIMA", "BOQ UJI TERIMA", "BOQ COMMISSIONING TEST", "LAPORAN BOQ UJI TERIMA"],
-                "method": "title"
-            },
-            "Hasil Capture": {
-                "keywords": ["FOTO PENGUKURAN OPM", "HASIL UKUR OTDR", "OTDR REPORT", "OTDR Report",
-                             "DATA PENGUKURAN OPM", "EVIDENCE HASIL UKUR", "EVIDENCE HASIL UKUR FEEDER", "EVIDENCE HASIL IN FEEDER OPM"],
-                "method": "title"
-            },
-            # Pencarian menggunakan metode presence (mencari berdasarkan frasa yang ditemukan)
-            "Evidence Photo": {
-                "keywords": ["LAMPIRAN EVIDENCE UJI TERIMA", "DOKUMENTASI UJI TERIMA", "EVIDENCE ODP", "EVIDENCE TIANG"],
-                "method": "presence"
-            },
-            "Surat Permintaan Uji Terima dari Mitra": {
-                "keywords": ["Permohonan Uji Terima SP"],
-                "method": "presence"
-            },
-            "S/K Penunjukan Team Uji Terima": {
-                "keywords": ["Penunjukan Personil Tim Uji Terima"],
-                "method": "presence"
-            },
-            "Nota Dinas Pelaksanaan Uji Terima": {
-                "keywords": ["Adapun periode waktu pelaksanaan dari tanggal"],
-                "method": "presence"
-            }
-            }
+        st.success("File berhasil dianalisis!")
+        duplicates = deduplicated_pages(pages, doc_id)
+        if duplicates:
+            st.caption("Hasil OCR dipakai ulang untuk halaman yang hampir identik: " + "; ".join(
+                f"hal. {d['page']} = hal. {d['source_page']}" + ("" if d["same_document"] else " dokumen lain")
+                for d in duplicates
+            ))
 
-        structured_items = [
-            ("1", "A", "BAUT"),
-            ("1", "B", "Laporan UT"),
-            ("2", "A", "Surat Permintaan Uji Terima dari Mitra"),
-            ("2", "B", "BA Test Commissioning dan Lampirannya"),
-            ("3", "A", "S/K Penunjukan Team Uji Terima"),
-            ("3", "B", "Nota Dinas Pelaksanaan Uji Terima"),
-            ("4", "A", "Redline Drawing"),
-            ("4", "B", "BoQ Akhir"),
-            ("4", "C", "Hasil Capture"),
-            ("4", "D", "Evidence Photo")
-        ]
+    with tab1:
+        st.header("Hasil Pengecekan Kelengkapan Dokumen")
+        # Definisi checklist ada di core/checklist.py (dipakai juga oleh mode batch)
+        checklist_items = CHECKLIST_ITEMS
+        structured_items = STRUCTURED_ITEMS
 
         # Menggunakan structured_items untuk memastikan urutan yang benar
         item_keys_in_order = [item[2] for item in structured_items]
-        check_results = check_items(checklist_items, text_per_page, item_keys_in_order)
+        check_results = check_items(checklist_items, pages, item_keys_in_order)
 
-        formatted_results = []
-        for i, row in enumerate(check_results):
-            no, sub, item = structured_items[i]
-    
-            # Format keterangan berdasarkan list 'Pages' yang diterima
-            keterangan_text = "Halaman tidak ditemukan atau judul tidak sesuai."
-            if row["Pages"]: # Jika list tidak kosong
-                # Ubah list angka menjadi string yang dipisahkan koma
-                pages_str = ', '.join(map(str, row["Pages"]))
-                keterangan_text = f"Ada di halaman {pages_str}"
-    
-            formatted_results.append({
-                "No": no,
-                "": sub,
-                "ITEM YG DI PERIKSA": item,
-                "STATUS OK": "✔" if row["Status"] == "OK" else "",
-                "STATUS NOK": "✔" if row["Status"] == "NOK" else "",
-                "KETERANGAN": keterangan_text # Menggunakan keterangan yang sudah di format
-            })
+        formatted_results = format_check_results(check_results, structured_items)
 
         df = pd.DataFrame(formatted_results)
         no_counts = Counter([row["No"] for row in formatted_results])
@@ -288,7 +365,7 @@ if uploaded_file:
         if st.session_state.stage == 'input_boq':
             st.header("Langkah 1: Verifikasi Kuantitas BOQ")
             if boq_page_index != -1:
-                st.image(images[boq_page_index], caption=f"Halaman BOQ (Otomatis terdeteksi di hal. {boq_page_index + 1})")
+                st.image(document_store.get_bytes(page_handles[boq_page_index]), caption=f"Halaman BOQ (Otomatis terdeteksi di hal. {boq_page_index + 1})")
                 
                 with st.form(key="boq_form"):
                     if df_boq_auto is not None and not df_boq_auto.empty:
@@ -319,8 +396,38 @@ if uploaded_file:
             st.header("Langkah 2: Laporan Verifikasi Akhir")
             st.info("Berikut adalah bukti yang terkumpul. Berikan status dan catatan verifikasi Anda.")
             
-            with st.spinner("Mengumpulkan semua bukti dari lampiran..."):
-                evidence_galleries = collect_evidence(images, st.session_state.final_boq_data, text_per_page, boq_page_index)
+            if service_evidence_index is not None:
+                # Mode klien tipis: indeks bukti sudah dibangun oleh service
+                evidence_index = service_evidence_index
+            else:
+                with st.spinner("Mengumpulkan semua bukti dari lampiran..."), ocr_session(session_id()):
+                    evidence_index = get_evidence_index(doc_id, images, pages, boq_page_index, df_boq_auto)
+            # Hanya designator yang berubah di tabel BOQ yang dihitung ulang
+            if st.session_state.get('evidence_doc_id') != doc_id:
+                st.session_state.evidence_pages = {}
+                st.session_state.evidence_doc_id = doc_id
+            st.session_state.evidence_pages = update_evidence_pages(
+                st.session_state.evidence_pages, evidence_index, st.session_state.final_boq_data['DESIGNATOR']
+            )
+            evidence_pages = st.session_state.evidence_pages
+
+            # Galeri hanya memakai thumbnail/potongan; resolusi penuh dirender untuk bukti yang dipilih saja
+            evidence_choices = list(dict.fromkeys(
+                (designator, page_index)
+                for designator in st.session_state.final_boq_data['DESIGNATOR']
+                for page_index in evidence_pages.get(designator, [])
+            ))
+            if evidence_choices:
+                with st.sidebar:
+                    selected_evidence = st.selectbox(
+                        "Lihat bukti resolusi penuh:", [None] + evidence_choices,
+                        format_func=lambda choice: "-" if choice is None else f"{choice[0]} (hal. {choice[1] + 1})",
+                    )
+                    if selected_evidence is not None:
+                        st.image(
+                            document_store.get_bytes(page_handles[selected_evidence[1]]), use_container_width=True,
+                            caption=f"Halaman {selected_evidence[1] + 1}",
+                        )
 
             with st.form(key="report_form"):
                 for index, row in st.session_state.final_boq_data.iterrows():
@@ -328,12 +435,16 @@ if uploaded_file:
                     st.subheader(f"Item: {designator}")
                     st.markdown(f"Kuantitas Menurut BOQ: **{boq_qty}**")
 
-                    gallery_images = evidence_galleries.get(designator, [])
-                    if gallery_images:
-                        st.write(f"Jumlah Halaman Bukti Ditemukan: **{len(gallery_images)}**")
+                    gallery_pages = evidence_pages.get(designator, [])
+                    if gallery_pages:
+                        st.write(f"Jumlah Halaman Bukti Ditemukan: **{len(gallery_pages)}**")
                         cols = st.columns(4) 
-                        for i, img in enumerate(gallery_images):
-                            cols[i % 4].image(img, use_container_width=True, caption=f"Bukti #{i+1}")
+                        for i, page_index in enumerate(gallery_pages):
+                            handle = page_handles[page_index]
+                            # Potongan di sekitar label jika OCR menemukan posisinya, selain itu thumbnail halaman
+                            box = locate_label(pages[page_index], designator)
+                            image_bytes = document_store.get_region(handle, box) if box else document_store.get_thumbnail(handle)
+                            cols[i % 4].image(image_bytes, use_container_width=True, caption=f"Bukti #{i+1} (hal. {page_index + 1})")
                     else:
                         st.warning("Tidak ada bukti foto yang ditemukan untuk item ini.")
                     
@@ -349,7 +460,7 @@ if uploaded_file:
                     for index, row in st.session_state.final_boq_data.iterrows():
                         report_data.append({
                             "DESIGNATOR": row['DESIGNATOR'], "KUANTITAS_BOQ": row['KUANTITAS_BOQ'],
-                            #"JML_HALAMAN_BUKTI": len(evidence_galleries.get(row['DESIGNATOR'], [])),
+                            #"JML_HALAMAN_BUKTI": len(evidence_pages.get(row['DESIGNATOR'], [])),
                             "STATUS_VERIFIKASI": st.session_state[f"status_{row['DESIGNATOR']}"],
                             "CATATAN": st.session_state[f"notes_{row['DESIGNATOR']}"]
                         })
@@ -390,16 +501,18 @@ if uploaded_file:
               </tr>
             """
             
-            for _, row in final_df.iterrows():
-                report_table_html += f"""
+            report_rows = final_df.to_dict("records")
+            report_table_html += "".join(
+                f"""
                 <tr>
-                    <td class="item-name">{row['DESIGNATOR']}</td>
+                    <td class="item-name">{escape(str(row['DESIGNATOR']))}</td>
                     <td>{row['KUANTITAS_BOQ']}</td>
-                    <td>{row['STATUS_VERIFIKASI']}</td>
-                    <td class="notes">{row['CATATAN']}</td>
+                    <td>{escape(str(row['STATUS_VERIFIKASI']))}</td>
+                    <td class="notes">{escape(str(row['CATATAN']))}</td>
                 </tr>
                 """
-            report_table_html += "</table>"
+                for row in report_rows
+            ) + "</table>"
 
             html(report_table_html, height=400, scrolling=True)
             
@@ -408,9 +521,23 @@ if uploaded_file:
             #col1, col2 = st.columns(2)
 
             #with col1:
+            # Workbook yang sama dengan laporan gabungan mode batch (core/report.py), berisi satu dokumen
+            record = {
+                "path": uploaded_file.name,
+                "doc_id": doc_id,
+                "page_count": len(pages),
+                "checklist": checklist_record(check_results, structured_items),
+                "boq_page_index": boq_page_index,
+                "boq_rows": boq_record(final_df[['DESIGNATOR', 'KUANTITAS_BOQ']]),
+                "evidence": {
+                    designator: [i + 1 for i in page_list]
+                    for designator, page_list in st.session_state.get('evidence_pages', {}).items()
+                },
+            }
+            verification = {row['DESIGNATOR']: (row['STATUS_VERIFIKASI'], row['CATATAN']) for row in report_rows}
             output_excel = io.BytesIO()
-            with pd.ExcelWriter(output_excel, engine='xlsxwriter') as writer:
-                final_df.to_excel(writer, index=False, sheet_name='Laporan Verifikasi')
+            with ReportWriter(output_excel) as report:
+                report.add_document(record, verification)
             excel_data = output_excel.getvalue()
             st.download_button(
                 label="Download Laporan (Excel)",
@@ -462,4 +589,9 @@ if uploaded_file:
                 st.session_state.stage = 'input_boq'
                 st.session_state.final_boq_data = None
                 st.session_state.final_report_df = None
-                st.rerun()
\ No newline at end of file
+                st.rerun()
+
+    if st.sidebar.checkbox(
+        "Tampilkan panel debug", value=load_config().getboolean('instrumentation', 'debug_panel', fallback=False)
+    ):
+        render_debug_panel(st.session_state.get('traces', {}).get(doc_id))
@@ -0,0 +1,181 @@
+# batch.py
+"""
+Mode batch tanpa Streamlit: memproses banyak PDF sekaligus dan menulis satu baris JSON
+(JSONL) per dokumen berisi hasil checklist, halaman BOQ, baris BOQ dan waktu per tahap.
+
+Contoh:
+    python batch.py data/arsip --output hasil.jsonl --workers 4
+    python batch.py "data/arsip/**/*.pdf" --output hasil.jsonl
+
+Dokumen yang sudah ada di file output dilewati, sehingga batch bisa dilanjutkan setelah crash.
+
+Evaluasi ulang tanpa OCR (aturan checklist, ignore_titles, LABEL_MAP atau keyword BOQ berubah):
+    python batch.py --replay --output hasil_replay.jsonl
+    python batch.py --replay data/doc_index --output hasil_replay.jsonl
+Setiap dokumen yang diproses disimpan di indeks dokumen ([doc_index] di config.ini); --replay
+membaca indeks itu (default direktori [doc_index] path), bukan PDF-nya, dan menulis ulang
+file output secara penuh.
+
+Laporan gabungan (Excel, ditulis bertahap dengan memori konstan) untuk semua dokumen di file output:
+    python batch.py data/arsip --output hasil.jsonl --report laporan.xlsx
+
+Profiling:
+    --trace-dir DIR   menulis trace JSON per dokumen (span per tahap, OCR per psm dan halaman)
+    --metrics FILE    menulis total metrik seluruh batch dalam format teks Prometheus
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from core.doc_index import find_indexed_documents, replay_document, save_document
+from core.instrumentation import Recorder, trace_document
+from core.parallel import set_page_workers
+from core.pipeline import document_record, process_document, replay_record
+from core.report import write_report
+
+def find_documents(inputs):
+    """
+    Mengubah daftar direktori/pola glob menjadi daftar path PDF unik (absolut, terurut).
+    """
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            matches = glob.glob(os.path.join(item, "**", "*.pdf"), recursive=True)
+            matches += glob.glob(os.path.join(item, "**", "*.PDF"), recursive=True)
+        else:
+            matches = glob.glob(item, recursive=True)
+        paths.extend(os.path.abspath(path) for path in matches if os.path.isfile(path))
+    return sorted(set(paths))
+
+def load_processed(output_path, retry_errors=False):
+    """
+    Membaca file output yang sudah ada dan mengembalikan path dokumen yang sudah diproses.
+    Baris terakhir yang terpotong (karena crash) diabaikan.
+    """
+    processed = set()
+    if not os.path.exists(output_path):
+        return processed
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if retry_errors and record.get("error"):
+                continue
+            processed.add(record.get("path"))
+    return processed
+
+def _init_worker(page_workers):
+    # Batasi paralelisme per dokumen agar total worker tidak melebihi jumlah core
+    set_page_workers(page_workers)
+
+def process_one(path, trace_dir=None):
+    with trace_document() as trace:
+        try:
+            result = process_document(path)
+            record = document_record(path, result)
+            save_document(record["doc_id"], result["pages"], result["boq_page_index"], result["df_boq"], source=path)
+        except Exception as e:
+            record = {"path": path, "error": f"{type(e).__name__}: {e}", "traceback": traceback.format_exc()}
+    if trace_dir and record.get("doc_id"):
+        with open(os.path.join(trace_dir, f"{record['doc_id']}.json"), "w", encoding="utf-8") as f:
+            json.dump(dict(trace.to_json(), path=path), f, ensure_ascii=False)
+    # Counter dikirim balik ke proses utama untuk digabung, tidak ditulis ke JSONL
+    record["_counters"] = trace.counter_rows()
+    return record
+
+def replay_one(path):
+    try:
+        return replay_record(replay_document(path))
+    except Exception as e:
+        return {"path": path, "error": f"{type(e).__name__}: {e}", "traceback": traceback.format_exc()}
+
+def replay(args):
+    """
+    Menjalankan ulang aturan terhadap semua dokumen di indeks, tanpa OCR.
+    """
+    documents = find_indexed_documents(args.inputs)
+    print(f"INFO: {len(documents)} dokumen di indeks akan dievaluasi ulang tanpa OCR.")
+    failed = 0
+    with open(args.output, "w", encoding="utf-8") as output, ProcessPoolExecutor(
+        max_workers=max(1, args.workers)
+    ) as executor:
+        for done, record in enumerate(executor.map(replay_one, documents, chunksize=16), start=1):
+            if record.get("error"):
+                failed += 1
+            output.write(json.dumps(record, ensure_ascii=False) + "\n")
+            if record.get("error"):
+                print(f"[{done}/{len(documents)}] GAGAL {record['path']}")
+    print(f"INFO: {len(documents) - failed} dokumen dievaluasi ulang, {failed} gagal.")
+    return 1 if failed else 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Proses batch dokumen PDF tanpa Streamlit (output JSONL).")
+    parser.add_argument("inputs", nargs="*",
+                        help="Direktori atau pola glob file PDF (dengan --replay: file indeks .npz, default [doc_index] path)")
+    parser.add_argument("--output", "-o", required=True, help="File output JSONL (ditambahkan, bukan ditimpa)")
+    parser.add_argument("--workers", "-w", type=int, default=2, help="Jumlah dokumen yang diproses bersamaan")
+    parser.add_argument("--page-workers", type=int, default=0,
+                        help="Worker OCR per dokumen (0 = jumlah core dibagi --workers)")
+    parser.add_argument("--retry-errors", action="store_true", help="Proses ulang dokumen yang sebelumnya error")
+    parser.add_argument("--trace-dir", help="Direktori untuk trace JSON per dokumen")
+    parser.add_argument("--metrics", help="File output metrik format teks Prometheus")
+    parser.add_argument("--report", help="File Excel laporan gabungan dari seluruh isi file output")
+    parser.add_argument("--replay", action="store_true",
+                        help="Evaluasi ulang dokumen dari indeks dokumen tanpa OCR (output ditimpa)")
+    args = parser.parse_args(argv)
+
+    if not args.replay and not args.inputs:
+        parser.error("inputs wajib diisi kecuali dengan --replay")
+    status = replay(args) if args.replay else process(args)
+    if args.report and os.path.exists(args.output):
+        documents = write_report(args.output, args.report)
+        print(f"INFO: laporan gabungan {documents} dokumen ditulis ke {args.report}.")
+    return status
+
+def process(args):
+    """
+    Memproses dokumen PDF yang belum ada di file output.
+    """
+    documents = find_documents(args.inputs)
+    processed = load_processed(args.output, retry_errors=args.retry_errors)
+    pending = [path for path in documents if path not in processed]
+    print(f"INFO: {len(documents)} dokumen ditemukan, {len(documents) - len(pending)} sudah diproses, {len(pending)} akan diproses.")
+    if not pending:
+        return 0
+
+    if args.trace_dir and not os.path.exists(args.trace_dir):
+        os.makedirs(args.trace_dir)
+    metrics = Recorder(keep_spans=False)
+
+    workers = max(1, args.workers)
+    page_workers = args.page_workers or max(1, (os.cpu_count() or 1) // workers)
+    failed = 0
+    with open(args.output, "a", encoding="utf-8") as output, ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(page_workers,)
+    ) as executor:
+        futures = {executor.submit(process_one, path, args.trace_dir): path for path in pending}
+        for done, future in enumerate(as_completed(futures), start=1):
+            record = future.result()
+            metrics.merge_rows(record.pop("_counters", []), drop_labels=("page",))
+            if record.get("error"):
+                failed += 1
+            # Satu baris per dokumen, langsung di-flush agar aman jika proses berhenti di tengah
+            output.write(json.dumps(record, ensure_ascii=False) + "\n")
+            output.flush()
+            status = "GAGAL" if record.get("error") else "OK"
+            print(f"[{done}/{len(pending)}] {status} {futures[future]}")
+
+    if args.metrics:
+        with open(args.metrics, "w", encoding="utf-8") as f:
+            f.write(metrics.to_prometheus(extra={"batch_documents": len(pending), "batch_failed_documents": failed}))
+
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,195 @@
+# bench/run.py
+"""
+Benchmark end-to-end pipeline pada bundle sintetis (bench/synthetic.py).
+
+Setiap ukuran bundle dijalankan di proses baru, sehingga peak RSS per ukuran terukur
+terpisah. Yang dilaporkan: waktu per tahap, throughput (halaman/detik), peak RSS,
+jumlah pemanggilan OCR (per psm), piksel yang di-OCR dan akurasi terhadap ground truth
+(status checklist, halaman BOQ, baris BOQ, halaman bukti).
+
+Contoh:
+    python -m bench.run --pages 12 40 100 --output bench_output.json
+    python -m bench.run --pages 40 --repeat 2 --cache      # run kedua memakai cache OCR dan indeks dedup yang sudah terisi
+
+Exit code 1 jika akurasi di bawah --min-accuracy, agar optimasi tidak diam-diam merusak hasil.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from bench.synthetic import generate_bundle
+
+def _f1(expected, found):
+    expected, found = set(expected), set(found)
+    if not expected and not found:
+        return 1.0
+    true_positive = len(expected & found)
+    precision = true_positive / len(found) if found else 0.0
+    recall = true_positive / len(expected) if expected else 0.0
+    return 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+
+def score(truth, result, evidence_index):
+    """
+    Membandingkan hasil pipeline dengan ground truth. Semua skor bernilai 0-1.
+    """
+    expected_pages = truth["checklist"]
+    status_hits, page_pairs_expected, page_pairs_found = 0, [], []
+    for row in result["check_results"]:
+        expected = expected_pages.get(row["Item"], [])
+        status_hits += (row["Status"] == "OK") == bool(expected)
+        page_pairs_expected += [(row["Item"], page) for page in expected]
+        page_pairs_found += [(row["Item"], page) for page in row["Pages"]]
+
+    def boq_key(row):
+        digits = "".join(ch for ch in str(row.get("KUANTITAS_BOQ", "")) if ch.isdigit())
+        return (str(row.get("DESIGNATOR", "")).upper(), int(digits) if digits else 0)
+
+    # Halaman dengan teks digital yang tidak pernah di-OCR tidak diklasifikasi, jadi tidak dinilai
+    expected_kinds = {"digital": "text", "scan": "text", "boq": "table", "photo": "photo", "blank": "blank"}
+    classified = [
+        (page.kind, expected_kinds[page_type])
+        for page, page_type in zip(result["pages"], truth["page_types"]) if page.kind
+    ]
+
+    evidence_expected = [(d, page) for d, pages in truth["evidence"].items() for page in pages]
+    evidence_found = [(d, page) for d, pages in evidence_index.items() for page in pages]
+    return {
+        "checklist_status": status_hits / len(result["check_results"]) if result["check_results"] else 1.0,
+        "checklist_pages_f1": _f1(page_pairs_expected, page_pairs_found),
+        "boq_page": float(result["boq_page_index"] == truth["boq_page_index"]),
+        "boq_rows_f1": _f1(
+            [boq_key(row) for row in truth["boq_rows"]],
+            [boq_key(row) for row in result["df_boq"].to_dict("records")] if not result["df_boq"].empty else [],
+        ),
+        "evidence_f1": _f1(evidence_expected, evidence_found),
+        "page_class": sum(kind == expected for kind, expected in classified) / len(classified) if classified else 1.0,
+    }
+
+def _peak_rss_mb():
+    # ru_maxrss dalam kilobyte di Linux dan byte di macOS
+    unit = 1 if sys.platform == "darwin" else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * unit
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * unit
+    return round(own / 2 ** 20, 1), round(children / 2 ** 20, 1)
+
+def run_case(page_count, seed, repeat, use_cache, page_workers):
+    """
+    Dijalankan di proses terpisah: membuat bundle, lalu menjalankan pipeline repeat kali.
+    """
+    # Import di dalam worker agar setiap kasus mulai dari proses yang bersih
+    from core.evidence_counter import build_evidence_index
+    from core.instrumentation import trace_document
+    from core.ocr_cache import OcrCache, set_ocr_cache
+    from core.page_dedup import PageIndex, set_page_index
+    from core.parallel import set_page_workers
+    from core.pipeline import process_document
+
+    if page_workers:
+        set_page_workers(page_workers)
+    work_dir = tempfile.mkdtemp(prefix="docscheck_bench_")
+    # Default tanpa cache dan dedup agar yang terukur OCR sebenarnya; --cache memakai cache/indeks baru yang kosong
+    set_ocr_cache(OcrCache(os.path.join(work_dir, "ocr_cache.sqlite"), 512 * 2 ** 20) if use_cache else None)
+    set_page_index(PageIndex(os.path.join(work_dir, "page_index.sqlite"), 256 * 2 ** 20) if use_cache else None)
+    try:
+        start = time.perf_counter()
+        pdf_bytes, truth = generate_bundle(page_count, seed=seed)
+        generate_seconds = time.perf_counter() - start
+        path = os.path.join(work_dir, "bundle.pdf")
+        with open(path, "wb") as f:
+            f.write(pdf_bytes)
+
+        runs = []
+        for _ in range(repeat):
+            with trace_document() as trace:
+                start = time.perf_counter()
+                result = process_document(path)
+                evidence_start = time.perf_counter()
+                evidence_index = build_evidence_index(result["images"], result["pages"], result["boq_page_index"])
+                end = time.perf_counter()
+            timings = dict(result["timings"], collect_evidence=end - evidence_start)
+            summary = trace.summary()
+            runs.append({
+                "seconds": round(end - start, 3),
+                "pages_per_second": round(page_count / (end - start), 3),
+                "stages": {stage: round(seconds, 3) for stage, seconds in timings.items()},
+                "ocr_calls": sum(item["calls"] for item in summary["ocr_by_config"].values()),
+                "ocr_calls_by_psm": {psm: item["calls"] for psm, item in summary["ocr_by_config"].items()},
+                "ocr_cache_hits": summary["totals"].get("ocr_cache_hits_total", 0),
+                "dedup_hits": summary["totals"].get("dedup_hits_total", 0),
+                "ocr_megapixels": round(summary["totals"].get("ocr_pixels_total", 0) / 1e6, 1),
+                "ocr_escalations": summary["totals"].get("ocr_escalations_total", 0),
+                "renders": summary["stages"].get("render_page", {}).get("calls", 0),
+                "accuracy": score(truth, result, evidence_index),
+            })
+            result["images"].close()
+
+        peak_rss_mb, peak_child_rss_mb = _peak_rss_mb()
+        return {
+            "pages": page_count,
+            "seed": seed,
+            "pdf_mb": round(len(pdf_bytes) / 2 ** 20, 2),
+            "generate_seconds": round(generate_seconds, 3),
+            "peak_rss_mb": peak_rss_mb,
+            "peak_child_rss_mb": peak_child_rss_mb,
+            "runs": runs,
+        }
+    finally:
+        set_ocr_cache(None)
+        set_page_index(None)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def _print_case(case):
+    for number, run in enumerate(case["runs"], start=1):
+        accuracy = " ".join(f"{name}={value:.2f}" for name, value in run["accuracy"].items())
+        stages = " ".join(f"{name}={seconds:.2f}s" for name, seconds in run["stages"].items())
+        print(
+            f"{case['pages']:>5} hal | run {number} | {run['seconds']:>8.2f}s | {run['pages_per_second']:>6.2f} hal/s"
+            f" | RSS {case['peak_rss_mb']:.0f} MB (proses anak {case['peak_child_rss_mb']:.0f} MB)"
+            f" | OCR {run['ocr_calls']} (cache {run['ocr_cache_hits']}, dedup {run['dedup_hits']},"
+            f" {run['ocr_megapixels']} MP, eskalasi {run['ocr_escalations']})"
+        )
+        print(f"        tahap: {stages}")
+        print(f"        akurasi: {accuracy}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark pipeline pada bundle PDF sintetis.")
+    parser.add_argument("--pages", type=int, nargs="+", default=[12, 40, 100], help="Jumlah halaman per bundle")
+    parser.add_argument("--seed", type=int, default=0, help="Seed generator bundle")
+    parser.add_argument("--repeat", type=int, default=1, help="Jumlah run per bundle di proses yang sama")
+    parser.add_argument("--cache", action="store_true", help="Pakai cache OCR dan indeks dedup halaman (kosong di awal setiap bundle)")
+    parser.add_argument("--page-workers", type=int, default=0, help="Worker OCR per dokumen (0 = config.ini)")
+    parser.add_argument("--min-accuracy", type=float, default=0.9,
+                        help="Batas bawah setiap skor akurasi; di bawahnya exit code 1")
+    parser.add_argument("--output", "-o", help="File output JSON")
+    args = parser.parse_args(argv)
+
+    cases = []
+    context = multiprocessing.get_context("spawn")
+    for page_count in args.pages:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            case = executor.submit(run_case, page_count, args.seed, args.repeat, args.cache, args.page_workers).result()
+        _print_case(case)
+        cases.append(case)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"created": time.time(), "args": vars(args), "cases": cases}, f, indent=2)
+
+    failures = [
+        (case["pages"], name, value)
+        for case in cases for run in case["runs"] for name, value in run["accuracy"].items()
+        if value < args.min_accuracy
+    ]
+    for pages, name, value in failures:
+        print(f"GAGAL: akurasi {name} = {value:.2f} pada bundle {pages} halaman (batas {args.min_accuracy})")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
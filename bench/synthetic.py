@@ -0,0 +1,257 @@
+# bench/synthetic.py
+"""
+Generator bundle PDF sintetis untuk benchmark, lengkap dengan ground truth.
+
+Isi bundle meniru dokumen uji terima yang sebenarnya:
+- halaman teks digital (BAUT, laporan, S/K, BA commissioning, halaman checklist yang diabaikan),
+- halaman "scan" (teks dirender ke gambar, diberi noise dan kemiringan, tanpa teks digital),
+- satu halaman tabel BOQ hasil scan dengan header asli (designator, uraian pekerjaan, satuan, aktual),
+- halaman foto bukti dengan label LABEL_MAP pada strip keterangan,
+- halaman pengisi (teks, scan, kosong) sampai jumlah halaman yang diminta.
+
+Semua acak diambil dari random.Random(seed), sehingga bundle yang sama selalu identik.
+"""
+import io
+import random
+
+import fitz
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from core.evidence_counter import LABEL_MAP
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842  # A4 dalam point
+SCAN_DPI = 150
+MIN_PAGES = 12
+
+FONT_CANDIDATES = [
+    "DejaVuSans.ttf",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "Arial.ttf",
+    "C:/Windows/Fonts/arial.ttf",
+]
+
+FILLER_WORDS = (
+    "pekerjaan pemasangan kabel serat optik telah dilaksanakan sesuai spesifikasi teknis yang berlaku "
+    "pada lokasi proyek dengan hasil pengukuran baik dan seluruh material terpasang dalam kondisi "
+    "normal tim pelaksana melakukan pemeriksaan jalur distribusi tiang dan kotak sambung serta "
+    "mendokumentasikan setiap titik pemasangan untuk keperluan administrasi"
+).split()
+
+BOQ_HEADERS = ["NO", "DESIGNATOR", "URAIAN PEKERJAAN", "SATUAN", "VOLUME", "AKTUAL"]
+BOQ_COLUMN_WIDTHS = [0.06, 0.22, 0.34, 0.12, 0.12, 0.14]
+BOQ_UNITS = ["pcs", "unit", "meter", "set", "buah"]
+EXTRA_DESIGNATORS = ["AC-OF-SM-12D", "DC-OF-SM-24D", "OS-SM-1-ODP", "PS-1-4-ODP", "TC-02-ODP", "BC-TR0-3"]
+
+def _font(size):
+    for candidate in FONT_CANDIDATES:
+        try:
+            return ImageFont.truetype(candidate, size)
+        except OSError:
+            continue
+    return ImageFont.load_default(size=size)
+
+def _label_text(pattern):
+    # Pola regex LABEL_MAP diubah menjadi teks yang akan tercetak di foto
+    return pattern.replace(r"\s*", " ")
+
+def _paragraph(rng, words=60):
+    return " ".join(rng.choice(FILLER_WORDS) for _ in range(words)).capitalize() + "."
+
+def _wrap(text, width=90):
+    lines, line = [], ""
+    for word in text.split():
+        if len(line) + len(word) + 1 > width:
+            lines.append(line)
+            line = word
+        else:
+            line = f"{line} {word}".strip()
+    return lines + ([line] if line else [])
+
+def _canvas():
+    scale = SCAN_DPI / 72
+    image = Image.new("L", (int(PAGE_WIDTH * scale), int(PAGE_HEIGHT * scale)), 255)
+    return image, ImageDraw.Draw(image), scale
+
+def _scan(image, rng, skew=1.5, noise=10.0):
+    """
+    Membuat gambar bersih terlihat seperti hasil scan: sedikit miring dan bernoise.
+    """
+    angle = rng.uniform(-skew, skew)
+    image = image.rotate(angle, resample=Image.BICUBIC, fillcolor=255)
+    pixels = np.asarray(image, dtype=np.float32)
+    noise_rng = np.random.default_rng(rng.randrange(2 ** 32))
+    pixels = pixels + noise_rng.normal(0, noise, pixels.shape)
+    return Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+
+def _insert_image_page(doc, image):
+    page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+    buffer = io.BytesIO()
+    image.convert("L").save(buffer, format="JPEG", quality=80)
+    page.insert_image(page.rect, stream=buffer.getvalue())
+
+def _digital_page(doc, title, body):
+    page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+    page.insert_text((60, 80), title, fontsize=16, fontname="hebo")
+    y = 120
+    for line in _wrap(body):
+        page.insert_text((60, y), line, fontsize=10, fontname="helv")
+        y += 14
+
+def _text_image(title, body):
+    image, draw, scale = _canvas()
+    draw.text((60 * scale, 60 * scale), title, fill=0, font=_font(int(16 * scale)))
+    body_font = _font(int(10 * scale))
+    y = 110 * scale
+    for line in _wrap(body, width=80):
+        draw.text((60 * scale, y), line, fill=0, font=body_font)
+        y += 15 * scale
+    return image
+
+def _boq_image(rows):
+    image, draw, scale = _canvas()
+    draw.text((60 * scale, 50 * scale), "BOQ UJI TERIMA", fill=0, font=_font(int(16 * scale)))
+    left, right = 40 * scale, (PAGE_WIDTH - 40) * scale
+    top, row_height = 100 * scale, 26 * scale
+    xs = [left]
+    for fraction in BOQ_COLUMN_WIDTHS:
+        xs.append(xs[-1] + fraction * (right - left))
+    bottom = top + row_height * (len(rows) + 1)
+
+    header_font, cell_font = _font(int(8 * scale)), _font(int(9 * scale))
+    cells = [BOQ_HEADERS] + [
+        [str(i + 1), row["DESIGNATOR"], row["URAIAN"], row["SATUAN"], str(row["VOLUME"]), str(row["KUANTITAS_BOQ"])]
+        for i, row in enumerate(rows)
+    ]
+    for r, values in enumerate(cells):
+        y = top + r * row_height
+        for c, value in enumerate(values):
+            draw.text((xs[c] + 5 * scale, y + 7 * scale), value, fill=0, font=header_font if r == 0 else cell_font)
+
+    # Garis tabel tebal agar terdeteksi oleh morfologi OpenCV
+    line_width = max(2, int(scale * 1.5))
+    for r in range(len(cells) + 1):
+        y = top + r * row_height
+        draw.line([(left, y), (right, y)], fill=0, width=line_width)
+    for x in xs:
+        draw.line([(x, top), (x, bottom)], fill=0, width=line_width)
+    return image
+
+def _photo_image(rng, label, title):
+    image, draw, scale = _canvas()
+    draw.text((60 * scale, 40 * scale), title, fill=0, font=_font(int(14 * scale)))
+    # "Foto": gradasi dan blok acak agar mirip gambar lapangan (bukan teks)
+    x0, y0, x1, y1 = int(50 * scale), int(80 * scale), int((PAGE_WIDTH - 50) * scale), int(640 * scale)
+    noise_rng = np.random.default_rng(rng.randrange(2 ** 32))
+    height, width = y1 - y0, x1 - x0
+    gradient = np.linspace(60, 200, width, dtype=np.float32)[None, :].repeat(height, axis=0)
+    photo = np.clip(gradient + noise_rng.normal(0, 25, (height, width)), 0, 255).astype(np.uint8)
+    image.paste(Image.fromarray(photo), (x0, y0))
+    for _ in range(6):
+        bx, by = rng.randrange(x0, x1 - 80), rng.randrange(y0, y1 - 80)
+        draw.rectangle([bx, by, bx + rng.randrange(30, 80), by + rng.randrange(30, 80)], fill=rng.randrange(0, 120))
+    # Strip keterangan berisi label designator
+    draw.rectangle([x0, y1 + 10 * scale, x1, y1 + 50 * scale], fill=255, outline=0, width=2)
+    draw.text((x0 + 10 * scale, y1 + 20 * scale), f"Label: {label}", fill=0, font=_font(int(13 * scale)))
+    return image
+
+def _boq_rows(rng):
+    designators = list(LABEL_MAP) + rng.sample(EXTRA_DESIGNATORS, 3)
+    rng.shuffle(designators)
+    rows = []
+    for designator in designators:
+        volume = rng.randrange(1, 40)
+        rows.append({
+            "DESIGNATOR": designator,
+            "URAIAN": " ".join(rng.sample(FILLER_WORDS, 3)),
+            "SATUAN": rng.choice(BOQ_UNITS),
+            "VOLUME": volume,
+            "KUANTITAS_BOQ": max(1, volume - rng.randrange(0, 3)),
+        })
+    return rows
+
+def generate_bundle(page_count, seed=0, scanned_ratio=0.5, skew=1.5, noise=10.0):
+    """
+    Membuat satu bundle sintetis berisi page_count halaman.
+    Mengembalikan (pdf_bytes, truth). truth berisi:
+      checklist      : item -> nomor halaman (berbasis 1) yang seharusnya cocok
+      boq_page_index : index halaman BOQ (berbasis 0)
+      boq_rows       : baris BOQ yang seharusnya terbaca (DESIGNATOR, SATUAN, KUANTITAS_BOQ)
+      evidence       : designator -> index halaman foto bukti (berbasis 0)
+      page_types     : jenis setiap halaman (digital, scan, boq, photo, blank)
+    """
+    if page_count < MIN_PAGES:
+        raise ValueError(f"page_count minimal {MIN_PAGES}")
+    rng = random.Random(seed)
+    doc = fitz.open()
+    truth = {
+        "page_count": page_count,
+        "seed": seed,
+        "checklist": {},
+        "boq_page_index": -1,
+        "boq_rows": [],
+        "evidence": {designator: [] for designator in LABEL_MAP},
+        "page_types": [],
+    }
+
+    def expect(item):
+        truth["checklist"].setdefault(item, []).append(len(truth["page_types"]) + 1)
+
+    def digital(title, item=None, words=120):
+        if item:
+            expect(item)
+        _digital_page(doc, title, _paragraph(rng, words))
+        truth["page_types"].append("digital")
+
+    def scanned(title, item=None, words=80):
+        if item:
+            expect(item)
+        _insert_image_page(doc, _scan(_text_image(title, _paragraph(rng, words)), rng, skew, noise))
+        truth["page_types"].append("scan")
+
+    # Bagian inti bundle, urutannya mengikuti bundle uji terima pada umumnya
+    digital("BERITA ACARA UJI TERIMA", "BAUT")
+    digital("LAPORAN UJI TERIMA", "Laporan UT")
+    digital("CHECKLIST VERIFIKASI BA UJI TERIMA", words=40)  # diabaikan lewat IGNORE_TITLES
+    scanned("Permohonan Uji Terima SP", "Surat Permintaan Uji Terima dari Mitra")
+    digital("Penunjukan Personil Tim Uji Terima", "S/K Penunjukan Team Uji Terima")
+    scanned("Adapun periode waktu pelaksanaan dari tanggal", "Nota Dinas Pelaksanaan Uji Terima")
+
+    rows = _boq_rows(rng)
+    expect("BoQ Akhir")
+    truth["boq_page_index"] = len(truth["page_types"])
+    truth["boq_rows"] = [
+        {"DESIGNATOR": row["DESIGNATOR"], "SATUAN": row["SATUAN"], "KUANTITAS_BOQ": row["KUANTITAS_BOQ"]}
+        for row in rows
+    ]
+    _insert_image_page(doc, _scan(_boq_image(rows), rng, skew=min(skew, 0.5), noise=noise))
+    truth["page_types"].append("boq")
+
+    scanned("PETA LOKASI", "Redline Drawing", words=20)
+    scanned("HASIL UKUR OTDR", "Hasil Capture", words=30)
+    digital("BERITA ACARA COMMISSIONING TEST", "BA Test Commissioning")
+
+    # Foto bukti dan halaman pengisi sampai page_count
+    designators = list(LABEL_MAP)
+    photo_count = 0
+    while len(truth["page_types"]) < page_count:
+        slot = len(truth["page_types"]) % 5
+        if slot in (0, 1, 3):
+            designator = designators[photo_count % len(designators)]
+            photo_count += 1
+            expect("Evidence Photo")
+            truth["evidence"][designator].append(len(truth["page_types"]))
+            image = _photo_image(rng, _label_text(LABEL_MAP[designator]), "LAMPIRAN EVIDENCE UJI TERIMA")
+            _insert_image_page(doc, _scan(image, rng, skew, noise))
+            truth["page_types"].append("photo")
+        elif slot == 2 and rng.random() < scanned_ratio:
+            scanned("Catatan Lapangan")
+        elif slot == 2:
+            digital("Catatan Lapangan")
+        else:
+            doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+            truth["page_types"].append("blank")
+
+    pdf_bytes = doc.tobytes(garbage=3, deflate=True)
+    doc.close()
+    return pdf_bytes, truth
@@ -1,120 +1,388 @@
 # core/boq_extractor.py
-import pytesseract
 import pandas as pd
 import cv2
 import numpy as np
 import re
+import fitz
+from core.config import load_config
+from core.evidence_counter import LABEL_MAP
+from core.instrumentation import page_scope, traced
+from core.ocr import ocr_to_data, ocr_to_string
+from core.ocr_scheduler import LANE_INTERACTIVE, in_lane
+from core.page_classifier import PAGE_BLANK, PAGE_PHOTO, PAGE_TABLE, PAGE_TEXT, classify_page
+from core.page_images import DEFAULT_DPI
+from core.parallel import map_pages
+from core.resolution import ocr_with_escalation
+from core.table_grid import crop_cell, detect_table_grid, is_blank_cell, same_columns
 
-def find_boq_page(images):
+# Keyword utama yang kemungkinan besar ada di header tabel BOQ
+BOQ_PRIMARY_KEYWORDS = ["uraian pekerjaan", "satuan"]
+# Keyword kuantitas (setidaknya salah satu harus ada)
+BOQ_QUANTITY_KEYWORDS = ["aktual", "actual", "volume", "jumlah"]
+# Judul umum halaman BOQ (fallback)
+BOQ_TITLE_KEYWORDS = ["bill of quantity", "boq uji terima"]
+
+def match_boq_keywords(page_text):
+    """
+    Mengembalikan (cocok_header, cocok_judul) untuk satu teks halaman.
+    """
+    page_text_lower = page_text.lower()
+
+    # Kondisi Cerdas:
+    # 1. Cek apakah SEMUA keyword utama ada di halaman ini.
+    has_all_primary = all(keyword in page_text_lower for keyword in BOQ_PRIMARY_KEYWORDS)
+    # 2. Cek apakah SETIDAKNYA SATU keyword kuantitas ada.
+    has_any_quantity = any(keyword in page_text_lower for keyword in BOQ_QUANTITY_KEYWORDS)
+
+    has_title = any(keyword in page_text_lower for keyword in BOQ_TITLE_KEYWORDS)
+    return has_all_primary and has_any_quantity, has_title
+
+def rank_boq_candidates(indices, page_count):
+    """
+    Mengurutkan halaman kandidat berdasarkan jarak ke posisi BOQ yang paling sering
+    ([boq] expected_position di config.ini, pecahan 0-1 dari panjang bundle).
+    """
+    config = load_config()
+    expected = config.getfloat('boq', 'expected_position', fallback=0.2)
+    target = expected * max(page_count - 1, 0)
+    return sorted(indices, key=lambda i: (abs(i - target), i))
+
+def _probe_boq_header(index, images, dpi, header_fraction):
+    # Render hanya bagian atas halaman (judul + header tabel) pada DPI rendah;
+    # dirender ulang pada DPI tinggi hanya jika confidence OCR-nya rendah
+    page_rect = images.page_rect(index)
+    clip = fitz.Rect(page_rect.x0, page_rect.y0, page_rect.x1, page_rect.y0 + page_rect.height * header_fraction)
+    with page_scope(index):
+        text, _, _ = ocr_with_escalation(
+            lambda probe_dpi: images.get(index, dpi=probe_dpi, clip=clip), "--psm 3", "boq_probe", dpi, timeout=12
+        )
+        return text
+
+@traced()
+@in_lane(LANE_INTERACTIVE)
+def find_boq_page(pages, images=None):
     """
     Mencari halaman BOQ yang benar dengan memeriksa kombinasi header kolom yang khas.
+    Tahap 1: kedua tingkat keyword (header tabel dan judul) dicek sekaligus pada teks
+    yang sudah ada (teks digital atau hasil OCR sebelumnya), tanpa OCR baru.
+    Tahap 2: hanya halaman tanpa teks yang di-OCR, sebatas area header pada DPI rendah,
+    diurutkan berdasarkan posisi BOQ yang paling mungkin dan berhenti di kecocokan pertama.
+    Halaman foto dan kosong (page_classifier) tidak pernah dipertimbangkan; halaman tabel
+    diperiksa lebih dulu, halaman teks hasil scan hanya sebagai cadangan.
     """
-    # Keyword utama yang kemungkinan besar ada di header tabel BOQ
-    primary_keywords = ["uraian pekerjaan", "satuan"]
-    # Keyword kuantitas (setidaknya salah satu harus ada)
-    quantity_keywords = ["aktual", "actual", "volume", "jumlah"]
+    title_hit = -1
+    unread = []
+    text_class = []
 
-    for i, image in enumerate(images):
-        try:
-            # Lakukan OCR cepat untuk memeriksa konten halaman
-            page_text = pytesseract.image_to_string(image, lang="ind+eng", config="--psm 3", timeout=12)
-            page_text_lower = page_text.lower()
+    def check(i, page_text):
+        nonlocal title_hit
+        is_header, is_title = match_boq_keywords(page_text)
+        if is_title and (title_hit == -1 or i < title_hit):
+            title_hit = i
+        return is_header
 
-            # Kondisi Cerdas:
-            # 1. Cek apakah SEMUA keyword utama ada di halaman ini.
-            has_all_primary = all(keyword in page_text_lower for keyword in primary_keywords)
-            
-            # 2. Cek apakah SETIDAKNYA SATU keyword kuantitas ada.
-            has_any_quantity = any(keyword in page_text_lower for keyword in quantity_keywords)
+    for i, page in enumerate(pages):
+        if page.kind in (PAGE_BLANK, PAGE_PHOTO):
+            continue
+        page_text = page.content
+        if not page_text.strip():
+            if not page.ocr_done:
+                unread.append(i)
+            continue
+        if page.kind == PAGE_TEXT and not page.has_text_layer:
+            text_class.append(i)
+            continue
 
-            # Halaman yang benar adalah yang memenuhi kedua kondisi di atas
-            if has_all_primary and has_any_quantity:
-                print(f"INFO: Halaman BOQ terdeteksi di halaman {i+1} berdasarkan kombinasi header.")
+        # Halaman yang benar adalah yang memenuhi kedua kondisi header
+        if check(i, page_text):
+            print(f"INFO: Halaman BOQ terdeteksi di halaman {i+1} berdasarkan kombinasi header.")
+            return i
+
+    # Cadangan: halaman scan yang diklasifikasi sebagai teks (misalnya tabel tanpa garis)
+    for i in text_class:
+        if check(i, pages[i].content):
+            print(f"INFO: Halaman BOQ terdeteksi di halaman {i+1} berdasarkan kombinasi header (halaman non-tabel).")
+            return i
+
+    if unread and images is not None and hasattr(images, "doc"):
+        config = load_config()
+        dpi = config.getint('boq', 'probe_dpi', fallback=100)
+        header_fraction = config.getfloat('boq', 'header_fraction', fallback=0.4)
+        # Klasifikasi murah dulu: tabel diprobe lebih dulu, foto dan halaman kosong dilewati
+        for i in unread:
+            if not pages[i].kind:
+                pages[i].kind = classify_page(i, images, pages[i].has_text_layer)[0]
+        tables = [i for i in unread if pages[i].kind in (PAGE_TABLE, "")]
+        others = [i for i in unread if pages[i].kind == PAGE_TEXT]
+        probe_title_hit = -1
+        for i in rank_boq_candidates(tables, len(pages)) + rank_boq_candidates(others, len(pages)):
+            try:
+                header_text = _probe_boq_header(i, images, dpi, header_fraction)
+            except Exception as e:
+                print(f"Error saat mencari halaman BOQ: {e}")
+                continue
+            is_header, is_title = match_boq_keywords(header_text)
+            if is_header:
+                print(f"INFO: Halaman BOQ terdeteksi di halaman {i+1} berdasarkan kombinasi header (OCR area header).")
                 return i
-        except Exception as e:
-            print(f"Error saat mencari halaman BOQ: {e}")
-            continue
-    
+            if is_title and probe_title_hit == -1:
+                probe_title_hit = i
+        if title_hit == -1 or (probe_title_hit != -1 and probe_title_hit < title_hit):
+            title_hit = probe_title_hit
+
     print("PERINGATAN: Tidak ada halaman yang cocok dengan kombinasi header utama. Sistem akan mencoba mencari berdasarkan judul umum.")
     # Fallback jika kombinasi di atas tidak ditemukan
-    for i, image in enumerate(images):
-         try:
-            page_text = pytesseract.image_to_string(image, lang="ind+eng", config="--psm 3", timeout=12)
-            page_text_lower = page_text.lower()
-            if "bill of quantity" in page_text_lower or "boq uji terima" in page_text_lower:
-                print(f"INFO: Halaman BOQ terdeteksi di halaman {i+1} berdasarkan judul (fallback).")
-                return i
-         except Exception:
-             continue
+    if title_hit != -1:
+        print(f"INFO: Halaman BOQ terdeteksi di halaman {title_hit+1} berdasarkan judul (fallback).")
+        return title_hit
 
     # Jika semua metode gagal
     print("KESALAHAN: Halaman BOQ tidak dapat ditemukan di dalam dokumen.")
     return -1
 
+BOQ_DESIGNATOR_HEADERS = ["designator", "kode"]
+BOQ_UNIT_PATTERN = r'\b(pcs|unit|meter|core|pos|set|ls|buah)\b'
+
+# Konfigurasi OCR per kolom: satu baris per sel, kolom angka hanya menerima digit
+BOQ_CELL_CONFIGS = {
+    "DESIGNATOR": "--psm 7 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-./()",
+    "SATUAN": "--psm 7 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz",
+    "KUANTITAS_BOQ": "--psm 7 -c tessedit_char_whitelist=0123456789",
+}
+
+def _designator_key(text):
+    return re.sub(r'[^A-Z0-9]', '', text.upper())
+
+# Designator yang punya label bukti (LABEL_MAP), dikunci tanpa spasi dan tanda baca
+KNOWN_DESIGNATORS = {_designator_key(designator): designator for designator in LABEL_MAP}
+
+def canonical_designator(text):
+    """
+    Membersihkan teks designator hasil OCR. Jika teks sama dengan designator di LABEL_MAP
+    setelah spasi dan tanda baca diabaikan (misalnya kurung penutup terpotong), dipakai
+    penulisan dari LABEL_MAP agar halaman buktinya bisa ditemukan.
+    """
+    designator = text.strip(' |[]().-:*')
+    return KNOWN_DESIGNATORS.get(_designator_key(designator), designator)
+
+def _page_gray(images, index, dpi):
+    # Render ulang pada DPI tabel jika memakai PageImageProvider
+    if hasattr(images, "get"):
+        return cv2.cvtColor(np.array(images.get(index, dpi=dpi).convert('RGB')), cv2.COLOR_RGB2GRAY)
+    # List gambar lama (DEFAULT_DPI): diperbesar ke DPI tabel
+    gray = cv2.cvtColor(np.array(images[index].convert('RGB')), cv2.COLOR_RGB2GRAY)
+    scale = dpi / DEFAULT_DPI
+    return cv2.resize(gray, (0, 0), fx=scale, fy=scale, interpolation=cv2.INTER_LANCZOS4) if scale > 1 else gray
+
+def _ocr_cell(cell, config):
+    return ocr_to_string(cell, config=config).strip()
+
+def _locate_boq_columns(gray, grid, max_rows=4):
+    """
+    Membaca baris header tabel (OCR per strip baris) lalu memetakan kolom DESIGNATOR,
+    SATUAN dan kuantitas. Mengembalikan (columns, index baris data pertama) atau None.
+    """
+    col_text = ["" for _ in grid["cols"]]
+    header_end = -1
+    header_keywords = BOQ_DESIGNATOR_HEADERS + BOQ_PRIMARY_KEYWORDS + BOQ_QUANTITY_KEYWORDS + ["uraian"]
+    for r, (y0, y1) in enumerate(grid["rows"][:max_rows]):
+        _, words = ocr_to_data(gray[y0:y1, :], config="--psm 6")
+        row_text = " ".join(word["text"].lower() for word in words)
+        if any(keyword in row_text for keyword in header_keywords):
+            header_end = r
+        for word in words:
+            center = word["left"] + word["width"] / 2
+            for c, (x0, x1) in enumerate(grid["cols"]):
+                if x0 <= center < x1:
+                    col_text[c] += " " + word["text"].lower()
+                    break
+    if header_end == -1:
+        return None
+
+    def find_col(keywords):
+        for c, text in enumerate(col_text):
+            if any(keyword in text for keyword in keywords):
+                return c
+        return None
+
+    designator_col = find_col(BOQ_DESIGNATOR_HEADERS)
+    if designator_col is None:
+        # Kolom designator biasanya tepat di kiri kolom uraian pekerjaan
+        uraian_col = find_col(["uraian"])
+        designator_col = uraian_col - 1 if uraian_col else None
+
+    # AKTUAL diutamakan; jika tidak ada, pakai kolom kuantitas paling kanan
+    quantity_col = find_col(["aktual", "actual"])
+    if quantity_col is None:
+        candidates = [c for c, text in enumerate(col_text) if any(k in text for k in BOQ_QUANTITY_KEYWORDS)]
+        quantity_col = candidates[-1] if candidates else None
+
+    if designator_col is None or quantity_col is None:
+        return None
+    columns = {"DESIGNATOR": designator_col, "KUANTITAS_BOQ": quantity_col}
+    satuan_col = find_col(["satuan"])
+    if satuan_col is not None:
+        columns["SATUAN"] = satuan_col
+    return columns, header_end + 1
+
+def _read_boq_rows(gray, grid, columns, first_row):
+    """
+    OCR hanya sel pada kolom yang dibutuhkan, dalam satu batch paralel.
+    """
+    jobs = []
+    for r, row in enumerate(grid["rows"][first_row:]):
+        for field, col in columns.items():
+            cell = crop_cell(gray, row, grid["cols"][col])
+            if not is_blank_cell(cell):
+                jobs.append((r, field, cell))
+
+    texts = map_pages(_ocr_cell, [(cell, BOQ_CELL_CONFIGS[field]) for _, field, cell in jobs], default="")
+
+    table = {}
+    for (r, field, _), text in zip(jobs, texts):
+        table.setdefault(r, {})[field] = text
+
+    boq_data = []
+    for r in sorted(table):
+        cells = table[r]
+        designator = canonical_designator(cells.get("DESIGNATOR", ""))
+        digits = re.sub(r'\D', '', cells.get("KUANTITAS_BOQ", ""))
+        quantity = int(digits) if digits else 0
+        if len(designator) > 2 and re.search(r'[a-zA-Z]', designator) and quantity > 0:
+            boq_data.append({
+                "DESIGNATOR": designator,
+                "SATUAN": cells.get("SATUAN", "").lower(),
+                "KUANTITAS_BOQ": quantity,
+            })
+    return boq_data
+
+def _extract_boq_table_from_grid(images, boq_page_index):
+    """
+    Ekstraksi tabel BOQ berbasis garis tabel, termasuk tabel yang berlanjut ke halaman berikutnya.
+    Mengembalikan list baris atau None jika grid/header tidak terdeteksi.
+    """
+    config = load_config()
+    dpi = config.getint('boq', 'table_dpi', fallback=300)
+    max_continuation = config.getint('boq', 'max_continuation_pages', fallback=5)
+
+    with page_scope(boq_page_index):
+        gray = _page_gray(images, boq_page_index, dpi)
+        grid = detect_table_grid(gray)
+        if grid is None:
+            return None
+        located = _locate_boq_columns(gray, grid)
+        if located is None:
+            return None
+        columns, first_row = located
+        boq_data = _read_boq_rows(gray, grid, columns, first_row)
+
+    # Tabel lanjutan: halaman berikutnya dengan susunan kolom yang sama
+    last_page = min(len(images), boq_page_index + 1 + max_continuation)
+    for index in range(boq_page_index + 1, last_page):
+        with page_scope(index):
+            next_gray = _page_gray(images, index, dpi)
+            next_grid = detect_table_grid(next_gray)
+            if not same_columns(grid, next_grid):
+                break
+            # Header bisa diulang di halaman lanjutan
+            repeated = _locate_boq_columns(next_gray, next_grid, max_rows=2)
+            next_first_row = repeated[1] if repeated else 0
+            print(f"INFO: Tabel BOQ berlanjut ke halaman {index+1}.")
+            boq_data.extend(_read_boq_rows(next_gray, next_grid, columns, next_first_row))
+    return boq_data
+
+@traced()
+@in_lane(LANE_INTERACTIVE)
 def extract_boq_table_with_cv(images, boq_page_index):
     """
-    Versi final yang paling disederhanakan dan fokus pada ekstraksi baris per baris 
-    yang terbukti paling tangguh.
+    Mengekstrak tabel BOQ. Garis tabel dideteksi dengan morfologi OpenCV, lalu hanya sel
+    DESIGNATOR, SATUAN dan kuantitas yang di-OCR (paralel, kolom angka hanya digit).
+    Jika grid tidak terdeteksi, dipakai ekstraksi lama berbasis heuristik baris.
     """
-    if boq_page_index == -1: 
+    if boq_page_index == -1:
         return pd.DataFrame()
     try:
-        image_cv = np.array(images[boq_page_index].convert('RGB'))
-        
+        boq_data = _extract_boq_table_from_grid(images, boq_page_index)
+    except Exception as e:
+        print(f"Error saat mengekstrak tabel BOQ berbasis grid: {e}")
+        boq_data = None
+
+    if boq_data:
+        return pd.DataFrame(boq_data).drop_duplicates()
+    print("PERINGATAN: Grid tabel BOQ tidak terdeteksi. Menggunakan ekstraksi berbasis teks.")
+    with page_scope(boq_page_index):
+        dpi = load_config().getint('boq', 'table_dpi', fallback=300)
+        return _extract_boq_table_from_text(_page_gray(images, boq_page_index, dpi))
+
+def _extract_boq_table_from_text(gray):
+    """
+    Ekstraksi lama (fallback) untuk halaman BOQ tanpa garis tabel yang terdeteksi:
+    OCR satu halaman penuh lalu baris dipulihkan dengan heuristik regex.
+    gray adalah halaman grayscale yang sudah dirender pada [boq] table_dpi.
+    """
+    try:
         # 1. PRA-PEMROSESAN YANG PALING STABIL
-        gray = cv2.cvtColor(image_cv, cv2.COLOR_BGR2GRAY)
-        scaled = cv2.resize(gray, (0, 0), fx=2, fy=2, interpolation=cv2.INTER_LANCZOS4)
-        processed_image = cv2.adaptiveThreshold(scaled, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2)
+        # Halaman langsung dirender pada DPI tabel, tidak perlu diperbesar 2x lagi
+        processed_image = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2)
         
         # 2. GUNAKAN OCR PALING DASAR (image_to_string) UNTUK MENGHINDARI KOMPLEKSITAS DATAFRAME
         ocr_config = r'--oem 3 --psm 4'
-        ocr_text = pytesseract.image_to_string(processed_image, lang="ind+eng", config=ocr_config)
+        ocr_text = ocr_to_string(processed_image, config=ocr_config)
 
-        # 3. LOGIKA EKSTRAKSI BARIS PER BARIS (PALING TANGGUH)
-        boq_data = []
-        lines = ocr_text.splitlines()
-        unit_pattern = r'\b(pcs|unit|meter|core|pos|set|ls|buah)\b'
-        
-        for line in lines:
-            if len(line) < 15 or "uraian pekerjaan" in line.lower():
-                continue
-
-            if re.search(unit_pattern, line, re.IGNORECASE):
-                words = line.split()
-                
-                designator = ""
-                # Cari kata pertama yang cocok dengan pola kode designator
-                for word in words[:5]: # Cek 5 kata pertama
-                    # Pola: Mengandung huruf DAN (angka ATAU '-') dan panjangnya > 2
-                    if len(word) > 2 and re.search(r'[a-zA-Z]', word) and (re.search(r'\d', word) or '-' in word):
-                        designator = word
-                        break
-                
-                # Heuristik Kuantitas: Cari semua angka, ambil yang kedua dari terakhir
-                numbers = [int(n.replace(',', '')) for n in re.findall(r'[\d,]+', line) if n.replace(',', '').isdigit()]
-                
-                quantity = 0
-                if len(numbers) >= 2:
-                    # Abaikan nomor urut di awal
-                    first_word_is_num = words[0].replace('.', '').isdigit()
-                    if first_word_is_num and int(words[0].replace('.', '')) == numbers[0]:
-                        relevant_numbers = numbers[1:]
-                    else:
-                        relevant_numbers = numbers
-
-                    if len(relevant_numbers) >= 2:
-                        quantity = relevant_numbers[-2] # Ambil kedua dari terakhir sebagai AKTUAL
-                    elif len(relevant_numbers) == 1:
-                        quantity = relevant_numbers[0]
-
-                if designator and quantity > 0:
-                    boq_data.append({
-                        "DESIGNATOR": designator.strip(' |[]().-:*'),
-                        "KUANTITAS_BOQ": quantity
-                    })
-
-        return pd.DataFrame(boq_data).drop_duplicates() if boq_data else pd.DataFrame()
+        return parse_boq_text(ocr_text)
 
     except Exception as e:
         print(f"Error Kritis saat mengekstrak tabel BOQ: {e}")
-        return pd.DataFrame()
\ No newline at end of file
+        return pd.DataFrame()
+
+def parse_boq_text(ocr_text):
+    """
+    Memulihkan baris BOQ (DESIGNATOR, SATUAN, KUANTITAS_BOQ) dari teks OCR satu halaman
+    dengan heuristik regex per baris. Dipakai fallback ekstraksi tabel dan replay indeks dokumen.
+    """
+    # LOGIKA EKSTRAKSI BARIS PER BARIS (PALING TANGGUH)
+    boq_data = []
+    lines = ocr_text.splitlines()
+    unit_pattern = BOQ_UNIT_PATTERN
+    
+    for line in lines:
+        if len(line) < 15 or "uraian pekerjaan" in line.lower():
+            continue
+
+        unit_match = re.search(unit_pattern, line, re.IGNORECASE)
+        if unit_match:
+            words = line.split()
+            
+            designator = ""
+            # Cari kata pertama yang cocok dengan pola kode designator
+            for word in words[:5]: # Cek 5 kata pertama
+                # Pola: Mengandung huruf DAN (angka ATAU '-') dan panjangnya > 2
+                if len(word) > 2 and re.search(r'[a-zA-Z]', word) and (re.search(r'\d', word) or '-' in word):
+                    designator = word
+                    break
+            
+            # Heuristik Kuantitas: Cari semua angka, ambil yang kedua dari terakhir
+            numbers = [int(n.replace(',', '')) for n in re.findall(r'[\d,]+', line) if n.replace(',', '').isdigit()]
+            
+            quantity = 0
+            if len(numbers) >= 2:
+                # Abaikan nomor urut di awal
+                first_word_is_num = words[0].replace('.', '').isdigit()
+                if first_word_is_num and int(words[0].replace('.', '')) == numbers[0]:
+                    relevant_numbers = numbers[1:]
+                else:
+                    relevant_numbers = numbers
+
+                if len(relevant_numbers) >= 2:
+                    quantity = relevant_numbers[-2] # Ambil kedua dari terakhir sebagai AKTUAL
+                elif len(relevant_numbers) == 1:
+                    quantity = relevant_numbers[0]
+
+            if designator and quantity > 0:
+                boq_data.append({
+                    "DESIGNATOR": canonical_designator(designator),
+                    "SATUAN": unit_match.group(1).lower(),
+                    "KUANTITAS_BOQ": quantity
+                })
+
+    return pd.DataFrame(boq_data).drop_duplicates() if boq_data else pd.DataFrame()
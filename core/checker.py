@@ -1,60 +1,257 @@
 import difflib
+from bisect import bisect_left, bisect_right
+from collections import Counter
 from fuzzywuzzy import fuzz
 import re
+from core.config import load_config
+from core.instrumentation import count, traced
+from core.matcher import AhoCorasick
+from core.page_analysis import page_texts
 
-def check_items(checklist_items, text_per_page, item_order):
-    results = []
+TITLE_THRESHOLD = 85
+
+def _bigrams(text):
+    return Counter(text[i:i + 2] for i in range(len(text) - 1))
 
-    for item_name in item_order:
-        config = checklist_items.get(item_name)
-        if not config:
-            results.append({"Item": item_name, "Status": "NOK", "Pages": []})
-            continue
+def _overlap(counter_a, counter_b):
+    return sum(min(count, counter_b[key]) for key, count in counter_a.items() if key in counter_b)
 
-        keywords = config.get("keywords", [])
-        method = config.get("method", "presence")
-        found_pages = []
+class TitleIndex:
+    """
+    Indeks untuk metode "title". fuzz.ratio hanya dihitung untuk baris yang masih mungkin
+    melewati ambang batas, berdasarkan batas atas yang pasti:
+    - panjang: ratio <= 2*min(a, b)/(a + b),
+    - karakter yang sama (unigram): ratio <= 2*overlap/(a + b),
+    - bigram bersama (q-gram lemma): jarak edit d memusnahkan paling banyak 2*d bigram.
+    Hasilnya sama persis dengan membandingkan keyword ke setiap baris.
+    """
 
-        if not keywords:
-            results.append({"Item": item_name, "Status": "NOK", "Pages": []})
-            continue
+    def __init__(self, keywords, threshold=TITLE_THRESHOLD, top_lines=0):
+        self.keywords = keywords
+        self.threshold = threshold
+        self.top_lines = top_lines
+        self._chars = [Counter(keyword) for keyword in keywords]
+        self._bigrams = [_bigrams(keyword) for keyword in keywords]
 
-        if isinstance(method, str):
-            method = [method]
+    def _could_match(self, length_a, length_b, overlap):
+        return 200 * overlap > self.threshold * (length_a + length_b)
 
-        for i, page_text in enumerate(text_per_page):
-            if not page_text:
+    def match(self, page_text_lower, skip=None):
+        """
+        Mengembalikan set id keyword yang cocok dengan salah satu baris halaman.
+        skip(keyword_id) dipakai untuk melewati keyword yang itemnya sudah terpenuhi.
+        """
+        lines = [line.strip() for line in page_text_lower.splitlines()]
+        if self.top_lines:
+            # Judul hanya muncul di bagian atas halaman
+            lines = [line for line in lines if line][:self.top_lines]
+        lines = sorted({line for line in lines if line}, key=len)
+        lengths = [len(line) for line in lines]
+        line_chars, line_bigrams = {}, {}
+
+        matched = set()
+        fuzzy_calls = 0
+        for keyword_id, keyword in enumerate(self.keywords):
+            if skip and skip(keyword_id):
+                continue
+            length_a = len(keyword)
+            if length_a == 0:
                 continue
+            # Rentang panjang baris yang masih mungkin melewati ambang batas
+            low = bisect_left(lengths, int(length_a * self.threshold / (200 - self.threshold)))
+            high = bisect_right(lengths, int(length_a * (200 - self.threshold) / self.threshold) + 1)
+
+            survivors = []
+            for line in lines[low:high]:
+                length_b = len(line)
+                if not self._could_match(length_a, length_b, min(length_a, length_b)):
+                    continue
+                chars = line_chars.get(line)
+                if chars is None:
+                    chars = line_chars[line] = Counter(line)
+                if not self._could_match(length_a, length_b, _overlap(self._chars[keyword_id], chars)):
+                    continue
+                bigrams = line_bigrams.get(line)
+                if bigrams is None:
+                    bigrams = line_bigrams[line] = _bigrams(line)
+                # Ratio > ambang menuntut jarak indel d < (1 - ambang) * (a + b)
+                max_distance = (100 - self.threshold) * (length_a + length_b) / 100
+                if _overlap(self._bigrams[keyword_id], bigrams) < max(length_a, length_b) - 1 - 2 * max_distance:
+                    continue
+                survivors.append(line)
+
+            # Hanya kandidat yang lolos yang dihitung skornya, sekaligus dalam satu batch
+            fuzzy_calls += len(survivors)
+            if any(score > self.threshold for score in (fuzz.ratio(keyword, line) for line in survivors)):
+                matched.add(keyword_id)
+        count("fuzzy_ratio_calls_total", fuzzy_calls)
+        return matched
+
+class CompiledChecklist:
+    """
+    Aturan checklist yang dikompilasi sekali dari checklist_items:
+    - semua keyword "presence" dicari sekaligus dengan automaton Aho-Corasick,
+    - semua keyword "regex" digabung menjadi satu alternasi dengan named group,
+    - keyword "title" dicocokkan per baris dengan fuzzy ratio.
+    """
+
+    def __init__(self, checklist_items, title_top_lines=0):
+        self.items = {}
+        # Item yang keyword-nya bisa muncul di badan halaman (presence/regex), bukan hanya di judul
+        self.body_items = set()
+        presence_keywords, presence_items = [], []
+        regex_keywords, regex_items = [], []
+        self.title_keywords, self.title_items = [], []
+
+        for item_name, config in checklist_items.items():
+            keywords = config.get("keywords", [])
+            method = config.get("method", "presence")
+            if isinstance(method, str):
+                method = [method]
+            self.items[item_name] = bool(keywords)
+            if keywords and ('presence' in method or 'regex' in method):
+                self.body_items.add(item_name)
 
-            page_text_lower = page_text.lower()
-            
             for keyword in keywords:
-                keyword_lower = keyword.lower()
-                
-                match_found = False
                 if 'title' in method:
-                    for line in page_text_lower.splitlines():
-                        if fuzz.ratio(keyword_lower, line.strip()) > 85:
-                            match_found = True
-                            break
-
-                if not match_found and 'regex' in method:
-                    if re.search(keyword, page_text, re.IGNORECASE):
-                        match_found = True
-
-                if not match_found and 'presence' in method:
-                    normalized_page_text = ' '.join(page_text_lower.split())
-                    if keyword_lower in normalized_page_text:
-                        match_found = True
-
-                if match_found and (i + 1) not in found_pages:
-                    found_pages.append(i + 1)
-        
-        result = {
-            "Item": item_name,
-            "Status": "OK" if found_pages else "NOK",
-            "Pages": found_pages
-        }
-        results.append(result)
-
-    return results
\ No newline at end of file
+                    _register(keyword.lower(), item_name, self.title_keywords, self.title_items)
+                if 'regex' in method:
+                    _register(keyword, item_name, regex_keywords, regex_items)
+                if 'presence' in method:
+                    _register(keyword.lower(), item_name, presence_keywords, presence_items)
+
+        self.title_index = TitleIndex(self.title_keywords, top_lines=title_top_lines)
+        self.presence_items = presence_items
+        self.presence_matcher = AhoCorasick(presence_keywords)
+
+        self.regex_items = regex_items
+        self.regex_patterns = [re.compile(keyword, re.IGNORECASE) for keyword in regex_keywords]
+        try:
+            self.regex_combined = re.compile(
+                "|".join(f"(?P<__kw{i}>{keyword})" for i, keyword in enumerate(regex_keywords)), re.IGNORECASE
+            ) if regex_keywords else None
+        except re.error:
+            # Pola yang tidak bisa digabung (mis. memakai backreference bernomor) dicek satu per satu
+            self.regex_combined = None
+
+    def match_page(self, page_text):
+        """
+        Mengembalikan set nama item yang terpenuhi oleh satu halaman.
+        Halaman hanya dinormalisasi sekali untuk semua aturan.
+        """
+        matched = set()
+        page_text_lower = page_text.lower()
+
+        if self.presence_items:
+            normalized_page_text = ' '.join(page_text_lower.split())
+            for keyword_id in self.presence_matcher.find_all(normalized_page_text):
+                matched |= self.presence_items[keyword_id]
+
+        if self.regex_items:
+            matched |= self._match_regex(page_text, matched)
+
+        if self.title_keywords:
+            for keyword_id in self.title_index.match(
+                page_text_lower, skip=lambda keyword_id: self.title_items[keyword_id] <= matched
+            ):
+                matched |= self.title_items[keyword_id]
+        return matched
+
+    def _match_regex(self, page_text, already_matched):
+        matched = set()
+        found = set()
+        if self.regex_combined is not None:
+            hits = list(self.regex_combined.finditer(page_text))
+            if not hits:
+                # Tidak ada satu pun pola yang cocok di posisi mana pun
+                return matched
+            for hit in hits:
+                found.add(int(hit.lastgroup[len("__kw"):]))
+
+        for keyword_id, items in enumerate(self.regex_items):
+            if keyword_id in found:
+                matched |= items
+            elif not items <= (already_matched | matched):
+                # Kecocokan bisa tertutup oleh kecocokan pola lain yang tumpang tindih,
+                # jadi pola yang belum terlihat dicek ulang satu per satu
+                if self.regex_patterns[keyword_id].search(page_text):
+                    matched |= items
+        return matched
+
+def _register(keyword, item_name, keywords, items):
+    # Keyword yang sama untuk beberapa item cukup dicari sekali
+    if keyword in keywords:
+        items[keywords.index(keyword)].add(item_name)
+    else:
+        keywords.append(keyword)
+        items.append({item_name})
+
+_compiled_cache = {}
+
+def compile_checklist(checklist_items):
+    """
+    Mengompilasi checklist_items sekali dan menyimpannya untuk pemanggilan berikutnya.
+    """
+    # Opsional: hanya N baris teratas halaman yang dicek untuk metode "title" (0 = semua baris)
+    title_top_lines = load_config().getint('checklist', 'title_top_lines', fallback=0)
+    key = (repr(sorted(checklist_items.items())), title_top_lines)
+    compiled = _compiled_cache.get(key)
+    if compiled is None:
+        compiled = CompiledChecklist(checklist_items, title_top_lines=title_top_lines)
+        _compiled_cache[key] = compiled
+    return compiled
+
+class ChecklistProgress:
+    """
+    Hasil checklist yang dibangun halaman demi halaman, untuk pipeline streaming:
+    status item bisa ditampilkan sebelum seluruh dokumen selesai diproses.
+    """
+
+    def __init__(self, checklist_items, item_order):
+        self.compiled = compile_checklist(checklist_items)
+        self.item_order = item_order
+        self.found_pages = {item_name: [] for item_name in item_order}
+
+    def add_page(self, index, page_text):
+        """
+        Mencocokkan satu halaman (index berbasis 0) dan mengembalikan item yang baru terpenuhi.
+        """
+        newly_found = set()
+        if not page_text:
+            return newly_found
+        for item_name in self.compiled.match_page(page_text):
+            if item_name in self.found_pages and self.compiled.items.get(item_name):
+                if not self.found_pages[item_name]:
+                    newly_found.add(item_name)
+                self.found_pages[item_name].append(index + 1)
+        return newly_found
+
+    def all_found(self, body_only=False):
+        """
+        True jika semua item yang punya keyword sudah ditemukan. Item tanpa keyword
+        tidak akan pernah OK, jadi tidak ditunggu. Dengan body_only=True hanya item
+        presence/regex yang dicek (item "title" cukup dijawab dari judul halaman).
+        """
+        return all(
+            pages for item_name, pages in self.found_pages.items()
+            if self.compiled.items.get(item_name) and (not body_only or item_name in self.compiled.body_items)
+        )
+
+    def results(self):
+        results = []
+        for item_name in self.item_order:
+            pages = sorted(self.found_pages[item_name])
+            results.append({
+                "Item": item_name,
+                "Status": "OK" if pages else "NOK",
+                "Pages": pages
+            })
+        return results
+
+@traced()
+def check_items(checklist_items, text_per_page, item_order):
+    # Menerima list PageAnalysis maupun list teks biasa
+    progress = ChecklistProgress(checklist_items, item_order)
+    for i, page_text in enumerate(page_texts(text_per_page)):
+        progress.add_page(i, page_text)
+    return progress.results()
@@ -0,0 +1,76 @@
+# core/checklist.py
+# Definisi checklist kelengkapan dokumen, dipakai bersama oleh app.py dan mode batch.
+
+# Halaman dengan judul berikut dikosongkan sebelum pengecekan
+IGNORE_TITLES = [
+    "CHECKLIST VERIFIKASI BA UJI TERIMA",
+    "CHECKLIST VERIFIKASI BERITA ACARA UJI TERIMA",
+    "CHECKLIST VERIFIKASI BERITA ACARA COMMISSIONING TEST",
+    "DOKUMEN BERITA ACARA UJI TERIMA KESATU",
+    "DOKUMEN BERITA ACARA UJI TERIMA",
+]
+
+# Kata kunci pencarian yang diperbarui dan lebih akurat
+# Menggunakan list untuk memungkinkan beberapa kemungkinan judul per item
+CHECKLIST_ITEMS = {
+    # Pencarian menggunakan metode regex
+    "BAUT": {
+        "keywords": [r"BERITA ACARA\s*UJI TERIMA"],
+        "method": "regex"
+    },
+    "Laporan UT": {
+        "keywords": ["LAPORAN UJI TERIMA", r"LAPORAN\s*UJI TERIMA"],
+        "method": "regex"
+    },
+    # Pencarian menggunakan metode title
+    "BA Test Commissioning": {
+        "keywords": ["BERITA ACARA COMMISSIONING TEST"],
+        "method": "title"
+    },
+    "Redline Drawing": {
+        "keywords": ["PETA LOKASI", "SKEMA KABEL", "SKEMA"],
+        "method": "title"
+    },
+    "BoQ Akhir": {
+        "keywords": ["BILL OF QUANTITY UJI TERIMA", "BOQ UJI TERIMA", "BOQ COMMISSIONING TEST", "LAPORAN BOQ UJI TERIMA"],
+        "method": "title"
+    },
+    "Hasil Capture": {
+        "keywords": ["FOTO PENGUKURAN OPM", "HASIL UKUR OTDR", "OTDR REPORT", "OTDR Report",
+                     "DATA PENGUKURAN OPM", "EVIDENCE HASIL UKUR", "EVIDENCE HASIL UKUR FEEDER", "EVIDENCE HASIL IN FEEDER OPM"],
+        "method": "title"
+    },
+    # Pencarian menggunakan metode presence (mencari berdasarkan frasa yang ditemukan)
+    "Evidence Photo": {
+        "keywords": ["LAMPIRAN EVIDENCE UJI TERIMA", "DOKUMENTASI UJI TERIMA", "EVIDENCE ODP", "EVIDENCE TIANG"],
+        "method": "presence"
+    },
+    "Surat Permintaan Uji Terima dari Mitra": {
+        "keywords": ["Permohonan Uji Terima SP"],
+        "method": "presence"
+    },
+    "S/K Penunjukan Team Uji Terima": {
+        "keywords": ["Penunjukan Personil Tim Uji Terima"],
+        "method": "presence"
+    },
+    "Nota Dinas Pelaksanaan Uji Terima": {
+        "keywords": ["Adapun periode waktu pelaksanaan dari tanggal"],
+        "method": "presence"
+    }
+}
+
+STRUCTURED_ITEMS = [
+    ("1", "A", "BAUT"),
+    ("1", "B", "Laporan UT"),
+    ("2", "A", "Surat Permintaan Uji Terima dari Mitra"),
+    ("2", "B", "BA Test Commissioning dan Lampirannya"),
+    ("3", "A", "S/K Penunjukan Team Uji Terima"),
+    ("3", "B", "Nota Dinas Pelaksanaan Uji Terima"),
+    ("4", "A", "Redline Drawing"),
+    ("4", "B", "BoQ Akhir"),
+    ("4", "C", "Hasil Capture"),
+    ("4", "D", "Evidence Photo")
+]
+
+# Urutan item sesuai structured_items
+ITEM_ORDER = [item[2] for item in STRUCTURED_ITEMS]
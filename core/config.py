@@ -0,0 +1,24 @@
+# core/config.py
+import configparser
+import os
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONFIG_PATH = os.path.join(PROJECT_ROOT, 'config.ini')
+
+def load_config():
+    """
+    Membaca config.ini di root project. Jika file tidak ada, dikembalikan config kosong
+    sehingga setiap pemanggil tetap bisa memakai nilai fallback.
+    """
+    config = configparser.ConfigParser()
+    if os.path.exists(CONFIG_PATH):
+        config.read(CONFIG_PATH)
+    return config
+
+def resolve_path(path):
+    """
+    Path relatif di config.ini dianggap relatif terhadap root project.
+    """
+    if not path or os.path.isabs(path):
+        return path
+    return os.path.join(PROJECT_ROOT, path)
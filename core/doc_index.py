@@ -0,0 +1,210 @@
+# core/doc_index.py
+"""
+Indeks per dokumen di disk: teks per halaman, kotak kata beserta confidence, jenis halaman
+dan baris BOQ yang terdeteksi, disimpan kolomnar dalam satu file .npz per doc_id
+([doc_index] path di config.ini).
+
+Dengan indeks ini aturan baru (keyword checklist, ignore_titles, pola LABEL_MAP, keyword header
+BOQ) bisa dijalankan ulang terhadap dokumen lama tanpa OCR ulang (replay_document, atau
+`python batch.py --replay`).
+
+Teks disimpan sebagai byte UTF-8 yang digabung ditambah array offset, dan kata sebagai kolom
+terpisah (halaman, teks, posisi, confidence, nomor baris), agar file kecil dan cepat dibaca.
+"""
+import glob
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from core.boq_extractor import find_boq_page, parse_boq_text
+from core.checker import check_items
+from core.checklist import CHECKLIST_ITEMS, IGNORE_TITLES, ITEM_ORDER
+from core.config import load_config, resolve_path
+from core.evidence_counter import build_evidence_index
+from core.instrumentation import traced
+from core.page_analysis import PageAnalysis, apply_ignore_titles
+
+INDEX_VERSION = 1
+WORD_BOX_COLUMNS = ["left", "top", "width", "height"]
+
+def get_doc_index_dir():
+    """
+    Direktori indeks dari [doc_index] di config.ini, atau None jika indeks dimatikan.
+    """
+    config = load_config()
+    if not config.getboolean('doc_index', 'enabled', fallback=True):
+        return None
+    return resolve_path(config.get('doc_index', 'path', fallback='data/doc_index'))
+
+def index_path(doc_id, directory):
+    return os.path.join(directory, f"{doc_id}.npz")
+
+def _pack_strings(values):
+    encoded = [(value or "").encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(value) for value in encoded])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+def _unpack_strings(data, offsets):
+    raw = data.tobytes()
+    return [raw[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+
+def _put_strings(arrays, name, values):
+    arrays[f"{name}_data"], arrays[f"{name}_offsets"] = _pack_strings(values)
+
+def _get_strings(arrays, name):
+    return _unpack_strings(arrays[f"{name}_data"], arrays[f"{name}_offsets"])
+
+def save_document(doc_id, pages, boq_page_index, df_boq, source=None, directory=None):
+    """
+    Menyimpan hasil analisis satu dokumen ke indeks (menimpa versi sebelumnya).
+    Mengembalikan path file, atau None jika indeks dimatikan.
+    """
+    directory = directory or get_doc_index_dir()
+    if directory is None:
+        return None
+    os.makedirs(directory, exist_ok=True)
+
+    arrays = {
+        "page_ocr_done": np.array([page.ocr_done for page in pages], dtype=bool),
+        "page_ignored": np.array([page.ignored for page in pages], dtype=bool),
+    }
+    _put_strings(arrays, "page_text_layer", [page.text_layer for page in pages])
+    _put_strings(arrays, "page_ocr_text", [page.ocr_text for page in pages])
+    _put_strings(arrays, "page_kind", [page.kind for page in pages])
+    _put_strings(arrays, "page_title", [page.title for page in pages])
+    _put_strings(arrays, "page_duplicate_of", [json.dumps(page.duplicate_of) if page.duplicate_of else "" for page in pages])
+
+    words = [(page.index, word) for page in pages for word in page.words]
+    arrays["word_page"] = np.array([index for index, _ in words], dtype=np.int32)
+    _put_strings(arrays, "word_text", [word["text"] for _, word in words])
+    for column in WORD_BOX_COLUMNS:
+        arrays[f"word_{column}"] = np.array([word[column] for _, word in words], dtype=np.int32)
+    arrays["word_conf"] = np.array([word["conf"] for _, word in words], dtype=np.float32)
+    arrays["word_line"] = np.array([word["line"] for _, word in words], dtype=np.int32).reshape(-1, 3)
+
+    boq_rows = df_boq.to_dict("records") if df_boq is not None and not df_boq.empty else []
+    _put_strings(arrays, "boq_designator", [str(row.get("DESIGNATOR", "")) for row in boq_rows])
+    _put_strings(arrays, "boq_satuan", [str(row.get("SATUAN", "")) for row in boq_rows])
+    arrays["boq_quantity"] = np.array([int(row.get("KUANTITAS_BOQ", 0)) for row in boq_rows], dtype=np.int64)
+
+    meta = {
+        "version": INDEX_VERSION,
+        "doc_id": doc_id,
+        "source": source if isinstance(source, str) else None,
+        "page_count": len(pages),
+        "boq_page_index": boq_page_index,
+        "created": time.time(),
+    }
+    arrays["meta"] = np.frombuffer(json.dumps(meta).encode("utf-8"), dtype=np.uint8)
+
+    path = index_path(doc_id, directory)
+    # Tulis ke file sementara lalu ganti, seperti job.json di JobStore
+    temp_path = f"{path}.tmp"
+    try:
+        with open(temp_path, "wb") as f:
+            np.savez_compressed(f, **arrays)
+        os.replace(temp_path, path)
+    except OSError as e:
+        # Indeks hanya pelengkap: kegagalan menulis tidak boleh menggagalkan pemrosesan dokumen
+        print(f"Peringatan: indeks dokumen {doc_id} gagal disimpan: {e}")
+        return None
+    return path
+
+def load_document(path, ignore_titles=None):
+    """
+    Membaca satu file indeks. Mengembalikan dict: doc_id, source, pages (list PageAnalysis),
+    boq_page_index, df_boq. Jika ignore_titles diberikan, status ignored halaman dihitung ulang.
+    """
+    with np.load(path, allow_pickle=False) as arrays:
+        meta = json.loads(arrays["meta"].tobytes().decode("utf-8"))
+        text_layers = _get_strings(arrays, "page_text_layer")
+        ocr_texts = _get_strings(arrays, "page_ocr_text")
+        kinds = _get_strings(arrays, "page_kind")
+        titles = _get_strings(arrays, "page_title")
+        duplicates = _get_strings(arrays, "page_duplicate_of")
+        ocr_done, ignored = arrays["page_ocr_done"], arrays["page_ignored"]
+
+        pages = [
+            PageAnalysis(
+                index=i, text_layer=text_layers[i], ocr_text=ocr_texts[i], ocr_done=bool(ocr_done[i]),
+                ignored=bool(ignored[i]), kind=kinds[i], title=titles[i],
+                duplicate_of=json.loads(duplicates[i]) if duplicates[i] else {},
+            )
+            for i in range(meta["page_count"])
+        ]
+
+        word_page, word_line, word_conf = arrays["word_page"], arrays["word_line"], arrays["word_conf"]
+        boxes = {column: arrays[f"word_{column}"] for column in WORD_BOX_COLUMNS}
+        for i, text in enumerate(_get_strings(arrays, "word_text")):
+            word = {column: int(values[i]) for column, values in boxes.items()}
+            word.update(text=text, conf=float(word_conf[i]), line=[int(v) for v in word_line[i]])
+            pages[word_page[i]].words.append(word)
+
+        df_boq = pd.DataFrame([
+            {"DESIGNATOR": designator, "SATUAN": satuan, "KUANTITAS_BOQ": int(quantity)}
+            for designator, satuan, quantity in zip(
+                _get_strings(arrays, "boq_designator"), _get_strings(arrays, "boq_satuan"), arrays["boq_quantity"]
+            )
+        ])
+
+    if ignore_titles is not None:
+        apply_ignore_titles(pages, ignore_titles)
+    return {
+        "doc_id": meta["doc_id"],
+        "source": meta["source"],
+        "pages": pages,
+        "boq_page_index": meta["boq_page_index"],
+        "df_boq": df_boq,
+    }
+
+def find_indexed_documents(inputs=None):
+    """
+    Daftar file indeks (.npz) dari direktori/pola glob; default direktori [doc_index] path.
+    """
+    inputs = inputs or [get_doc_index_dir() or resolve_path('data/doc_index')]
+    paths = []
+    for item in inputs:
+        pattern = os.path.join(item, "*.npz") if os.path.isdir(item) else item
+        paths.extend(os.path.abspath(path) for path in glob.glob(pattern) if path.endswith(".npz"))
+    return sorted(set(paths))
+
+@traced()
+def replay_document(path, checklist_items=CHECKLIST_ITEMS, item_order=ITEM_ORDER, ignore_titles=IGNORE_TITLES):
+    """
+    Menjalankan ulang aturan checklist, pencarian halaman BOQ dan indeks bukti terhadap indeks
+    yang tersimpan, tanpa membuka PDF dan tanpa OCR. Hasilnya berbentuk seperti process_document
+    (images bernilai None) ditambah doc_id, evidence_index dan pages_without_ocr.
+
+    Halaman BOQ dan barisnya dari pemrosesan asli dipertahankan (baris hasil OCR sel tabel lebih
+    akurat). Jika dulu halaman BOQ tidak ditemukan, halaman dicari lagi pada teks tersimpan; jika
+    barisnya belum ada, baris dibaca dari teks halaman dengan heuristik teks.
+    """
+    start = time.perf_counter()
+    stored = load_document(path, ignore_titles=ignore_titles)
+    pages = stored["pages"]
+    check_results = check_items(checklist_items, pages, item_order)
+
+    boq_page_index, df_boq = stored["boq_page_index"], stored["df_boq"]
+    if boq_page_index == -1 and pages:
+        boq_page_index = find_boq_page(pages)
+    if df_boq.empty and boq_page_index != -1:
+        df_boq = parse_boq_text(pages[boq_page_index].content)
+
+    evidence_index = build_evidence_index(None, pages, boq_page_index)
+    return {
+        "doc_id": stored["doc_id"],
+        "source": stored["source"],
+        "pages": pages,
+        "images": None,
+        "check_results": check_results,
+        "boq_page_index": boq_page_index,
+        "df_boq": df_boq,
+        "evidence_index": evidence_index,
+        # Halaman scan yang belum pernah di-OCR penuh (misalnya karena stop_early): bukti di sana tidak terlihat
+        "pages_without_ocr": [page.index + 1 for page in pages if not page.ocr_done and not page.has_text_layer],
+        "timings": {"replay": time.perf_counter() - start},
+    }
@@ -0,0 +1,146 @@
+# core/document_store.py
+import io
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import fitz
+
+from core.config import load_config
+from core.page_images import PageImageProvider
+
+@dataclass(frozen=True)
+class PageHandle:
+    """
+    Referensi ringan ke satu halaman dokumen di DocumentStore. Aman di-pickle oleh
+    st.cache_data karena tidak membawa piksel.
+    """
+    doc_id: str
+    index: int
+
+class DocumentStore:
+    """
+    Penyimpanan dokumen per proses, dikunci dengan doc_id. Dokumen disimpan sebagai byte PDF
+    (penyedia gambar dibuka sekali), sedangkan halaman yang sudah dirender disimpan sebagai
+    buffer JPEG terkompresi dalam LRU dengan batas ukuran total. Galeri memakai thumbnail
+    (DPI rendah) dan potongan di sekitar label; resolusi penuh hanya dirender jika diminta.
+    """
+
+    def __init__(self, max_documents=8, max_buffer_bytes=256 * 1024 * 1024, jpeg_quality=85,
+                 thumbnail_dpi=48, region_margin=72):
+        self.max_documents = max_documents
+        self.max_buffer_bytes = max_buffer_bytes
+        self.jpeg_quality = jpeg_quality
+        self.thumbnail_dpi = thumbnail_dpi
+        self.region_margin = region_margin
+        self._documents = OrderedDict()
+        self._buffers = OrderedDict()
+        self._buffer_bytes = 0
+        self._lock = threading.Lock()
+
+    def register(self, doc_id, images):
+        """
+        Mendaftarkan PageImageProvider yang sudah terbuka untuk doc_id.
+        """
+        with self._lock:
+            self._documents[doc_id] = images
+            self._documents.move_to_end(doc_id)
+            while len(self._documents) > self.max_documents:
+                old_id, _ = self._documents.popitem(last=False)
+                self._drop_buffers(old_id)
+                # Provider tidak ditutup di sini: sesi lain (indeks bukti, render yang sedang
+                # berjalan) mungkin masih memegangnya. Dokumen PyMuPDF ditutup oleh garbage
+                # collector setelah referensi terakhir dilepas.
+        return self.handles(doc_id)
+
+    def ensure(self, doc_id, pdf_bytes):
+        """
+        Memastikan dokumen ada di store (misalnya setelah tergusur LRU), tanpa render ulang.
+        """
+        with self._lock:
+            if doc_id in self._documents:
+                self._documents.move_to_end(doc_id)
+                return
+        self.register(doc_id, PageImageProvider(pdf_bytes))
+
+    def images(self, doc_id):
+        with self._lock:
+            return self._documents[doc_id]
+
+    def handles(self, doc_id):
+        return [PageHandle(doc_id, index) for index in range(len(self.images(doc_id)))]
+
+    def get_bytes(self, handle, dpi=None, clip=None):
+        """
+        Mengembalikan halaman (atau bagian halaman, clip dalam koordinat PDF) sebagai buffer JPEG.
+        Halaman dirender dan dikompresi hanya saat pertama kali diminta.
+        """
+        key = (handle.doc_id, handle.index, dpi, tuple(clip) if clip is not None else None)
+        with self._lock:
+            buffer = self._buffers.get(key)
+            if buffer is not None:
+                self._buffers.move_to_end(key)
+                return buffer
+            images = self._documents[handle.doc_id]
+
+        image = images.get(handle.index, dpi=dpi, clip=clip)
+        output = io.BytesIO()
+        image.save(output, format="JPEG", quality=self.jpeg_quality)
+        buffer = output.getvalue()
+
+        with self._lock:
+            if key not in self._buffers:
+                self._buffers[key] = buffer
+                self._buffer_bytes += len(buffer)
+                while self._buffer_bytes > self.max_buffer_bytes and len(self._buffers) > 1:
+                    _, old = self._buffers.popitem(last=False)
+                    self._buffer_bytes -= len(old)
+        return buffer
+
+    def get_thumbnail(self, handle):
+        """
+        Halaman utuh sebagai JPEG kecil ([document_store] thumbnail_dpi) untuk galeri.
+        """
+        return self.get_bytes(handle, dpi=self.thumbnail_dpi)
+
+    def get_region(self, handle, box):
+        """
+        Potongan halaman di sekitar box (piksel pada DPI provider, seperti kotak kata OCR),
+        diperlebar region_margin poin ke setiap sisi, sebagai JPEG pada DPI provider.
+        """
+        images = self.images(handle.doc_id)
+        scale = 72 / images.dpi
+        x0, y0, x1, y1 = box
+        margin = self.region_margin
+        clip = fitz.Rect(x0 * scale - margin, y0 * scale - margin, x1 * scale + margin, y1 * scale + margin)
+        return self.get_bytes(handle, clip=clip & images.page_rect(handle.index))
+
+    def get_image(self, handle, dpi=None):
+        """
+        Gambar PIL resolusi penuh untuk tahap yang butuh piksel asli (misalnya OCR).
+        """
+        return self.images(handle.doc_id).get(handle.index, dpi=dpi)
+
+    def _drop_buffers(self, doc_id):
+        for key in [key for key in self._buffers if key[0] == doc_id]:
+            self._buffer_bytes -= len(self._buffers.pop(key))
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_document_store():
+    """
+    Store global per proses, dikonfigurasi dari section [document_store] di config.ini.
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            config = load_config()
+            _store = DocumentStore(
+                max_documents=config.getint('document_store', 'max_documents', fallback=8),
+                max_buffer_bytes=config.getint('document_store', 'max_buffer_mb', fallback=256) * 1024 * 1024,
+                jpeg_quality=config.getint('document_store', 'jpeg_quality', fallback=85),
+                thumbnail_dpi=config.getint('document_store', 'thumbnail_dpi', fallback=48),
+                region_margin=config.getint('document_store', 'region_margin', fallback=72),
+            )
+        return _store
@@ -1,6 +1,9 @@
 # core/evidence_counter.py
-import pytesseract
 import re
+from core.instrumentation import traced
+from core.ocr_scheduler import LANE_BACKGROUND, in_lane
+from core.page_analysis import ensure_full_ocr, ensure_ocr
+from core.page_classifier import PAGE_PHOTO
 
 LABEL_MAP = {
     "SC-OF-SM-24": "JOIN CLOSURE",
@@ -12,23 +15,101 @@ LABEL_MAP = {
     "PU-AS-DE-50/70": "PU-AS-DE",
     "PU-AS-SC": "PU-AS-SC",
 }
+LABEL_PATTERNS = {designator: re.compile(pattern, re.IGNORECASE) for designator, pattern in LABEL_MAP.items()}
 
-def collect_evidence(images, verified_boq_df, text_per_page, boq_page_index):
-    evidence_galleries = {row["DESIGNATOR"]: [] for index, row in verified_boq_df.iterrows()}
-    found_pages_for_designator = {designator: set() for designator in evidence_galleries.keys()}
+def _has_label(text):
+    return any(pattern.search(text) for pattern in LABEL_PATTERNS.values())
 
-    for i, image in enumerate(images):
-        if (i < len(text_per_page) and not text_per_page[i]) or i == boq_page_index:
+@traced()
+@in_lane(LANE_BACKGROUND)
+def build_evidence_index(images, pages, boq_page_index):
+    """
+    Membangun indeks terbalik: designator LABEL_MAP -> list nomor halaman (index 0) yang
+    memuat labelnya. Dibangun sekali per dokumen; perubahan tabel BOQ cukup dijawab dari indeks ini.
+    Halaman yang belum pernah di-OCR diproses sekali di sini. Dengan images=None (indeks dokumen
+    yang tersimpan) tidak ada OCR: hanya teks yang sudah ada yang dicari.
+
+    Halaman foto biasanya hanya di-OCR pita keterangannya. Jika keterangannya tidak memuat label
+    apa pun, halaman itu di-OCR penuh sekali lagi, karena label bisa tertulis di dalam foto.
+    """
+    page_count = len(images) if images is not None else len(pages)
+    # Halaman yang belum di-OCR (misalnya setelah OCR dihentikan lebih awal) tetap jadi kandidat;
+    # hanya halaman yang judulnya masuk ignore_titles dan halaman BOQ yang dilewati
+    candidates = [
+        i for i in range(page_count)
+        if not ((i < len(pages) and pages[i].ignored) or i == boq_page_index)
+    ]
+    if images is not None:
+        # Halaman kandidat yang belum di-OCR dibaca sesuai jenisnya (halaman foto: pita keterangan saja)
+        ensure_ocr(pages, images, candidates)
+        # Label yang tidak ada di keterangan mungkin tertulis di dalam foto: OCR halaman penuh
+        unlabeled_photos = [
+            i for i in candidates
+            if i < len(pages) and pages[i].kind == PAGE_PHOTO and not _has_label(pages[i].ocr_text)
+        ]
+        ensure_full_ocr(pages, images, unlabeled_photos)
+
+    evidence_index = {designator: [] for designator in LABEL_MAP}
+    for i in candidates:
+        page_text_ocr = pages[i].ocr_text if i < len(pages) else ""
+        if not page_text_ocr:
             continue
-            
-        try:
-            page_text_ocr = pytesseract.image_to_string(image, lang="ind+eng", config="--psm 3")
-        except Exception:
+        for designator, pattern in LABEL_PATTERNS.items():
+            if pattern.search(page_text_ocr):
+                evidence_index[designator].append(i)
+    return evidence_index
+
+def locate_label(page, designator):
+    """
+    Kotak (x0, y0, x1, y1) label designator pada halaman, dalam koordinat kotak kata OCR
+    (piksel pada DPI PageImageProvider). Label dicari per baris OCR; None jika tidak ada
+    kotak kata atau label tidak ditemukan utuh di satu baris.
+    """
+    pattern = LABEL_PATTERNS.get(designator)
+    if pattern is None or not page.words:
+        return None
+    lines = {}
+    for word in page.words:
+        lines.setdefault(tuple(word["line"]), []).append(word)
+    for words in lines.values():
+        text, spans = "", []
+        for word in words:
+            if text:
+                text += " "
+            spans.append((len(text), len(text) + len(word["text"]), word))
+            text += word["text"]
+        match = pattern.search(text)
+        if match is None:
             continue
+        hit = [word for start, end, word in spans if start < match.end() and end > match.start()]
+        return (
+            min(word["left"] for word in hit),
+            min(word["top"] for word in hit),
+            max(word["left"] + word["width"] for word in hit),
+            max(word["top"] + word["height"] for word in hit),
+        )
+    return None
+
+def update_evidence_pages(evidence_pages, evidence_index, designators):
+    """
+    Menyesuaikan pemetaan designator -> halaman bukti dengan isi tabel BOQ terbaru.
+    Hanya designator yang baru muncul yang dihitung; yang sudah dihapus dibuang.
+    """
+    designators = list(dict.fromkeys(designators))
+    updated = {d: evidence_pages[d] for d in designators if d in evidence_pages}
+    for designator in designators:
+        if designator not in updated:
+            updated[designator] = list(evidence_index.get(designator, []))
+    return updated
 
-        for designator, pattern in LABEL_MAP.items():
-            if designator in evidence_galleries and re.search(pattern, page_text_ocr, re.IGNORECASE):
-                if i not in found_pages_for_designator[designator]:
-                    evidence_galleries[designator].append(image)
-                    found_pages_for_designator[designator].add(i)
-    return evidence_galleries
\ No newline at end of file
+@traced()
+def collect_evidence(images, verified_boq_df, pages, boq_page_index, evidence_index=None):
+    """
+    Mengumpulkan gambar halaman bukti per designator. Jika evidence_index belum tersedia,
+    indeks dibangun terlebih dahulu.
+    """
+    if evidence_index is None:
+        evidence_index = build_evidence_index(images, pages, boq_page_index)
+    evidence_pages = update_evidence_pages({}, evidence_index, verified_boq_df["DESIGNATOR"])
+    # Gambar halaman hanya dirender untuk halaman yang benar-benar jadi bukti
+    return {designator: [images[i] for i in page_list] for designator, page_list in evidence_pages.items()}
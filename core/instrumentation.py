@@ -0,0 +1,227 @@
+# core/instrumentation.py
+"""
+Instrumentasi ringan untuk pipeline: span waktu per tahap dan counter (pemanggilan OCR,
+hit/miss cache, waktu render, jumlah fuzzy ratio).
+
+Ada dua tempat pencatatan:
+- metrik proses (kumulatif, tanpa label halaman), diekspor sebagai teks Prometheus,
+- trace per dokumen (aktif di dalam trace_document), berisi setiap span beserta nomor halaman,
+  diekspor sebagai JSON.
+
+Contoh:
+    with trace_document() as trace:
+        process_document(path)
+    json.dump(trace.to_json(), f)
+"""
+import contextvars
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+from core.config import load_config
+
+_trace = contextvars.ContextVar("docscheck_trace", default=None)
+_page = contextvars.ContextVar("docscheck_page", default=None)
+
+def _label_key(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items() if value is not None))
+
+class Recorder:
+    """
+    Kumpulan span dan counter yang aman dipakai dari beberapa thread.
+    keep_spans=False hanya menyimpan counter (untuk metrik proses yang berumur panjang).
+    """
+
+    def __init__(self, keep_spans=True):
+        self.keep_spans = keep_spans
+        self.started = time.time()
+        self.spans = []
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def add_span(self, name, start, duration, attrs):
+        with self._lock:
+            if self.keep_spans:
+                self.spans.append({
+                    "name": name,
+                    "start": round(start - self.started, 6),
+                    "duration": round(duration, 6),
+                    "thread": threading.current_thread().name,
+                    **attrs,
+                })
+            self._inc("span_seconds_total", duration, {"span": name})
+            self._inc("span_calls_total", 1, {"span": name})
+
+    def inc(self, name, value=1, labels=None):
+        with self._lock:
+            self._inc(name, value, labels or {})
+
+    def _inc(self, name, value, labels):
+        key = (name, _label_key(labels))
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def counter_rows(self):
+        with self._lock:
+            items = sorted(self.counters.items())
+        return [{"name": name, "labels": dict(labels), "value": value} for (name, labels), value in items]
+
+    def merge_rows(self, rows, drop_labels=()):
+        """
+        Menambahkan counter dari recorder lain (misalnya dari worker proses di mode batch).
+        Label di drop_labels (misalnya "page") dibuang sehingga nilainya dijumlahkan.
+        """
+        with self._lock:
+            for row in rows:
+                labels = {key: value for key, value in row["labels"].items() if key not in drop_labels}
+                self._inc(row["name"], row["value"], labels)
+
+    def summary(self):
+        """
+        Ringkasan untuk dibaca manusia: waktu per span, OCR per config psm dan per halaman.
+        """
+        stages, ocr_by_config, ocr_by_page = {}, {}, {}
+        for row in self.counter_rows():
+            labels = row["labels"]
+            if row["name"] in ("span_seconds_total", "span_calls_total"):
+                stage = stages.setdefault(labels["span"], {"calls": 0, "seconds": 0.0})
+                stage["calls" if row["name"] == "span_calls_total" else "seconds"] += row["value"]
+            elif row["name"] in ("ocr_calls_total", "ocr_seconds_total"):
+                field = "calls" if row["name"] == "ocr_calls_total" else "seconds"
+                config = ocr_by_config.setdefault(labels.get("psm", "-"), {"calls": 0, "seconds": 0.0})
+                config[field] += row["value"]
+                if "page" in labels:
+                    page = ocr_by_page.setdefault(labels["page"], {"calls": 0, "seconds": 0.0})
+                    page[field] += row["value"]
+        totals = {}
+        for row in self.counter_rows():
+            if not row["name"].startswith(("span_", "ocr_calls", "ocr_seconds")):
+                totals[row["name"]] = totals.get(row["name"], 0) + row["value"]
+        return {
+            "stages": stages,
+            "ocr_by_config": ocr_by_config,
+            "ocr_by_page": dict(sorted(ocr_by_page.items(), key=lambda item: int(item[0]))),
+            "totals": totals,
+        }
+
+    def to_json(self):
+        with self._lock:
+            spans = list(self.spans)
+        return {
+            "started": self.started,
+            "spans": spans,
+            "counters": self.counter_rows(),
+            "summary": self.summary(),
+        }
+
+    def to_prometheus(self, prefix="docscheck_", extra=None):
+        """
+        Teks format eksposisi Prometheus. extra: dict nama -> nilai gauge tambahan.
+        """
+        lines = []
+        typed = set()
+        for row in self.counter_rows():
+            name = prefix + row["name"]
+            if name not in typed:
+                lines.append(f"# TYPE {name} counter")
+                typed.add(name)
+            labels = ",".join(f'{key}="{_escape(value)}"' for key, value in sorted(row["labels"].items()))
+            lines.append(f"{name}{{{labels}}} {row['value']}" if labels else f"{name} {row['value']}")
+        for name, value in (extra or {}).items():
+            lines.append(f"# TYPE {prefix}{name} gauge")
+            lines.append(f"{prefix}{name} {value}")
+        return "\n".join(lines) + "\n"
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+_process = Recorder(keep_spans=False)
+_enabled = None
+
+def is_enabled():
+    global _enabled
+    if _enabled is None:
+        _enabled = load_config().getboolean('instrumentation', 'enabled', fallback=True)
+    return _enabled
+
+def process_metrics():
+    """
+    Recorder kumulatif untuk seluruh proses (dipakai endpoint /metrics di service).
+    """
+    return _process
+
+def current_trace():
+    return _trace.get()
+
+@contextmanager
+def trace_document():
+    """
+    Mengaktifkan trace per dokumen untuk kode di dalam blok ini, termasuk worker thread
+    yang dijalankan lewat map_pages/iter_pages.
+    """
+    recorder = Recorder()
+    token = _trace.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _trace.reset(token)
+
+@contextmanager
+def page_scope(index):
+    """
+    Menandai halaman yang sedang diproses, agar span dan counter OCR diberi label halaman.
+    """
+    token = _page.set(index)
+    try:
+        yield
+    finally:
+        _page.reset(token)
+
+def count(name, value=1, **labels):
+    if not is_enabled():
+        return
+    _process.inc(name, value, labels)
+    trace = _trace.get()
+    if trace is not None:
+        page = _page.get()
+        trace.inc(name, value, dict(labels, page=page) if page is not None else labels)
+
+@contextmanager
+def span(name, **attrs):
+    """
+    Mengukur durasi blok kode sebagai span bernama.
+    """
+    if not is_enabled():
+        yield
+        return
+    start = time.time()
+    perf_start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - perf_start
+        _process.add_span(name, start, duration, {})
+        trace = _trace.get()
+        if trace is not None:
+            page = _page.get()
+            trace.add_span(name, start, duration, dict(attrs, page=page) if page is not None else attrs)
+
+def traced(name=None):
+    """
+    Dekorator span untuk satu fungsi (nama span default: nama fungsi).
+    """
+    def decorator(func):
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def submit_with_context(executor, func, *args):
+    """
+    executor.submit yang membawa trace dan halaman aktif ke worker thread.
+    """
+    return executor.submit(contextvars.copy_context().run, func, *args)
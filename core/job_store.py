@@ -0,0 +1,200 @@
+# core/job_store.py
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+FINISHED_STATUSES = (JOB_DONE, JOB_FAILED)
+
+# ID job = uuid4().hex; ID lain (misalnya ".." dari URL) tidak pernah dipakai sebagai path
+JOB_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+def is_valid_job_id(job_id):
+    return isinstance(job_id, str) and JOB_ID_PATTERN.match(job_id) is not None
+
+class JobStore:
+    """
+    Penyimpanan job di disk: satu direktori per job berisi input.pdf, job.json (status dan
+    progres) dan result.json. Job yang belum selesai tetap ada setelah service di-restart.
+    input.pdf dihapus begitu job selesai (remove_input), dan direktori job yang sudah lama
+    selesai dihapus seluruhnya oleh prune.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self._lock = threading.Lock()
+        if not os.path.exists(root):
+            os.makedirs(root)
+
+    def _job_dir(self, job_id):
+        if not is_valid_job_id(job_id):
+            raise ValueError(f"ID job tidak valid: {job_id!r}")
+        return os.path.join(self.root, job_id)
+
+    def _write_json(self, path, data):
+        # Tulis ke file sementara lalu ganti, agar pembaca tidak pernah melihat file setengah jadi
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+
+    def create(self, pdf_bytes, doc_id, client_id):
+        job_id = uuid.uuid4().hex
+        job_dir = self._job_dir(job_id)
+        os.makedirs(job_dir)
+        with open(os.path.join(job_dir, "input.pdf"), "wb") as f:
+            f.write(pdf_bytes)
+        job = {
+            "job_id": job_id,
+            "doc_id": doc_id,
+            "client_id": client_id,
+            "status": JOB_QUEUED,
+            "created": time.time(),
+            "started": None,
+            "finished": None,
+            "progress": {"stage": "queued", "done": 0, "total": 0},
+            "error": None,
+        }
+        with self._lock:
+            self._write_json(os.path.join(job_dir, "job.json"), job)
+        return job
+
+    def get(self, job_id):
+        if not is_valid_job_id(job_id):
+            return None
+        path = os.path.join(self._job_dir(job_id), "job.json")
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def update(self, job_id, **fields):
+        with self._lock:
+            job = self.get(job_id)
+            if job is None:
+                return None
+            job.update(fields)
+            self._write_json(os.path.join(self._job_dir(job_id), "job.json"), job)
+        return job
+
+    def input_path(self, job_id):
+        return os.path.join(self._job_dir(job_id), "input.pdf")
+
+    def remove_input(self, job_id):
+        """
+        Menghapus PDF upload job yang sudah selesai; hasil dan trace tetap disimpan sampai di-prune.
+        """
+        try:
+            os.remove(self.input_path(job_id))
+        except FileNotFoundError:
+            pass
+
+    def save_result(self, job_id, result):
+        self._write_json(os.path.join(self._job_dir(job_id), "result.json"), result)
+
+    def load_result(self, job_id):
+        if not is_valid_job_id(job_id):
+            return None
+        path = os.path.join(self._job_dir(job_id), "result.json")
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def save_trace(self, job_id, trace):
+        self._write_json(os.path.join(self._job_dir(job_id), "trace.json"), trace)
+
+    def load_trace(self, job_id):
+        if not is_valid_job_id(job_id):
+            return None
+        path = os.path.join(self._job_dir(job_id), "trace.json")
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def all_jobs(self):
+        jobs = []
+        for job_id in os.listdir(self.root):
+            job = self.get(job_id) if is_valid_job_id(job_id) else None
+            if job is not None:
+                jobs.append(job)
+        return sorted(jobs, key=lambda job: job["created"])
+
+    def prune(self, max_age_seconds):
+        """
+        Menghapus direktori job yang sudah selesai (done/failed) lebih dari max_age_seconds lalu.
+        Job yang masih mengantri atau berjalan tidak disentuh. Mengembalikan jumlah job yang dihapus.
+        """
+        cutoff = time.time() - max_age_seconds
+        removed = 0
+        for job in self.all_jobs():
+            if job["status"] in FINISHED_STATUSES and (job["finished"] or job["created"]) < cutoff:
+                with self._lock:
+                    shutil.rmtree(self._job_dir(job["job_id"]), ignore_errors=True)
+                removed += 1
+        return removed
+
+    def find_by_doc(self, doc_id):
+        """
+        Job terbaru untuk dokumen yang sama yang belum gagal (upload ulang tidak diproses dua kali).
+        """
+        for job in reversed(self.all_jobs()):
+            if job["doc_id"] == doc_id and job["status"] != JOB_FAILED:
+                return job
+        return None
+
+class FairJobQueue:
+    """
+    Antrian adil per klien: setiap klien punya antriannya sendiri dan worker mengambil job
+    secara bergiliran (round-robin) antar klien, sehingga satu reviewer dengan banyak
+    dokumen tidak menghalangi reviewer lain.
+    """
+
+    def __init__(self):
+        self._queues = OrderedDict()
+        self._condition = threading.Condition()
+
+    def put(self, client_id, job_id):
+        with self._condition:
+            self._queues.setdefault(client_id, deque()).append(job_id)
+            self._condition.notify()
+
+    def get(self):
+        with self._condition:
+            while not self._queues:
+                self._condition.wait()
+            # Ambil dari klien terdepan lalu pindahkan klien itu ke belakang giliran
+            client_id, queue = next(iter(self._queues.items()))
+            job_id = queue.popleft()
+            del self._queues[client_id]
+            if queue:
+                self._queues[client_id] = queue
+            return job_id
+
+    def depth(self):
+        with self._condition:
+            return sum(len(queue) for queue in self._queues.values())
+
+    def position(self, job_id):
+        """
+        Perkiraan posisi job di antrian (0 = berikutnya), atau None jika tidak mengantri.
+        """
+        with self._condition:
+            queues = [list(queue) for queue in self._queues.values()]
+        position = 0
+        for round_index in range(max((len(queue) for queue in queues), default=0)):
+            for queue in queues:
+                if round_index < len(queue):
+                    if queue[round_index] == job_id:
+                        return position
+                    position += 1
+        return None
@@ -0,0 +1,58 @@
+# core/matcher.py
+from collections import deque
+
+class AhoCorasick:
+    """
+    Automaton Aho-Corasick sederhana: mencari banyak keyword sekaligus dalam satu kali
+    pembacaan teks. find_all mengembalikan set id keyword yang muncul.
+    """
+
+    def __init__(self, keywords):
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [set()]
+        self._always = set()
+        for keyword_id, keyword in enumerate(keywords):
+            if not keyword:
+                # String kosong selalu dianggap ada (sama seperti '' in text)
+                self._always.add(keyword_id)
+                continue
+            self._add(keyword, keyword_id)
+        self._build()
+
+    def _add(self, keyword, keyword_id):
+        node = 0
+        for char in keyword:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(set())
+                self._goto[node][char] = next_node
+            node = next_node
+        self._output[node].add(keyword_id)
+
+    def _build(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                self._output[child] |= self._output[self._fail[child]]
+
+    def find_all(self, text):
+        found = set(self._always)
+        goto, fail, output = self._goto, self._fail, self._output
+        node = 0
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if output[node]:
+                found |= output[node]
+        return found
@@ -0,0 +1,85 @@
+# core/ocr.py
+import time
+
+from core.instrumentation import count
+from core.ocr_backend import get_ocr_backend, parse_tesseract_config
+from core.ocr_cache import get_ocr_cache, make_cache_key
+from core.ocr_scheduler import get_ocr_scheduler
+
+OCR_LANG = "ind+eng"
+
+def _pixels(image):
+    if hasattr(image, "size") and hasattr(image, "mode"):
+        return image.size[0] * image.size[1]
+    return int(image.shape[0] * image.shape[1])
+
+def _timed(kind, image, config, run):
+    # Setiap pemanggilan tesseract yang sebenarnya dihitung per jenis keluaran dan psm,
+    # dan harus mendapat slot dari scheduler OCR proses (waktu tunggu tidak ikut dihitung)
+    psm = parse_tesseract_config(config)[0]
+    with get_ocr_scheduler().slot():
+        start = time.perf_counter()
+        try:
+            return run()
+        finally:
+            labels = {"kind": kind, "psm": psm if psm is not None else "default"}
+            count("ocr_calls_total", **labels)
+            count("ocr_seconds_total", time.perf_counter() - start, **labels)
+            count("ocr_pixels_total", _pixels(image), **labels)
+
+def _cached(kind, image, config, dpi, run):
+    # Semua pemanggilan OCR melewati cache disk berbasis isi piksel
+    cache = get_ocr_cache()
+    if cache is None:
+        return _timed(kind, image, config, run)
+    key = make_cache_key(image, kind, OCR_LANG, config, dpi)
+    result = cache.get(key)
+    if result is None:
+        count("ocr_cache_misses_total")
+        result = _timed(kind, image, config, run)
+        cache.put(key, result)
+    else:
+        count("ocr_cache_hits_total")
+    return result
+
+def ocr_to_string(image, config="--psm 3", timeout=0, dpi=None):
+    """
+    Titik tunggal pemanggilan OCR untuk keluaran teks biasa. Backend (pool engine
+    tesserocr atau pytesseract) dipilih oleh core/ocr_backend.py.
+    """
+    return _cached(
+        "string", image, config, dpi,
+        lambda: get_ocr_backend().image_to_string(image, OCR_LANG, config, timeout),
+    )
+
+def ocr_to_data(image, config="--psm 3", timeout=0, dpi=None):
+    """
+    Menjalankan OCR tingkat kata dan mengembalikan (teks, words).
+    Teks disusun ulang per baris dari hasil image_to_data, sedangkan words berisi
+    kotak posisi dan confidence setiap kata.
+    """
+    text, words = _cached("data", image, config, dpi, lambda: _run_ocr_data(image, config, timeout))
+    return text, words
+
+def _run_ocr_data(image, config, timeout):
+    data = get_ocr_backend().image_to_data(image, OCR_LANG, config, timeout)
+    words = []
+    lines = {}
+    for i, word in enumerate(data["text"]):
+        word = (word or "").strip()
+        if not word:
+            continue
+        line_key = [data["block_num"][i], data["par_num"][i], data["line_num"][i]]
+        words.append({
+            "text": word,
+            "left": int(data["left"][i]),
+            "top": int(data["top"][i]),
+            "width": int(data["width"][i]),
+            "height": int(data["height"][i]),
+            "conf": float(data["conf"][i]),
+            "line": line_key,
+        })
+        lines.setdefault(tuple(line_key), []).append(word)
+
+    text = "\n".join(" ".join(line_words) for line_words in lines.values())
+    return [text, words]
@@ -0,0 +1,210 @@
+# core/ocr_backend.py
+import queue
+import shlex
+import threading
+
+import numpy as np
+import pytesseract
+from PIL import Image
+
+from core.config import load_config
+
+try:
+    import tesserocr
+except ImportError:  # tesserocr opsional; tanpa itu dipakai pytesseract
+    tesserocr = None
+
+TSV_COLUMNS = ["level", "page_num", "block_num", "par_num", "line_num", "word_num",
+               "left", "top", "width", "height", "conf", "text"]
+
+def parse_tesseract_config(config):
+    """
+    Memecah string config gaya CLI tesseract ("--psm 7 --oem 3 -c key=value")
+    menjadi (psm, oem, variables).
+    """
+    psm, oem, variables = None, None, {}
+    tokens = shlex.split(config or "")
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        if token == "--psm" and i + 1 < len(tokens):
+            psm = int(tokens[i + 1])
+            i += 1
+        elif token == "--oem" and i + 1 < len(tokens):
+            oem = int(tokens[i + 1])
+            i += 1
+        elif token == "-c" and i + 1 < len(tokens):
+            key, _, value = tokens[i + 1].partition("=")
+            variables[key] = value
+            i += 1
+        i += 1
+    return psm, oem, variables
+
+def _is_timeout(error):
+    # pytesseract mematikan proses tesseract yang melewati timeout dengan RuntimeError ini
+    return isinstance(error, RuntimeError) and "timeout" in str(error).lower()
+
+def _to_pil(image):
+    if isinstance(image, np.ndarray):
+        return Image.fromarray(image)
+    return image
+
+class OcrBackend:
+    """
+    Antarmuka backend OCR. image_to_data mengembalikan dict kolom seperti
+    pytesseract.Output.DICT (text, conf, left, top, width, height, block_num, ...).
+    """
+    name = "base"
+
+    def image_to_string(self, image, lang, config="", timeout=0):
+        raise NotImplementedError
+
+    def image_to_data(self, image, lang, config="", timeout=0):
+        raise NotImplementedError
+
+class PytesseractBackend(OcrBackend):
+    """
+    Backend lama: satu proses tesseract per pemanggilan (lewat file PNG sementara).
+    """
+    name = "pytesseract"
+
+    def image_to_string(self, image, lang, config="", timeout=0):
+        return pytesseract.image_to_string(image, lang=lang, config=config, timeout=timeout)
+
+    def image_to_data(self, image, lang, config="", timeout=0):
+        return pytesseract.image_to_data(
+            image, lang=lang, config=config, timeout=timeout, output_type=pytesseract.Output.DICT
+        )
+
+class TesserocrPoolBackend(OcrBackend):
+    """
+    Backend dengan pool engine tesseract yang tetap hidup (tesserocr). Model bahasa dimuat
+    sekali per engine, dan gambar dikirim langsung dari memori tanpa file sementara.
+    Engine dikelompokkan per (bahasa, oem, variabel -c); psm diatur per pemanggilan.
+
+    Engine tesserocr tidak bisa dihentikan di tengah pemanggilan, jadi pemanggilan dengan
+    timeout (misalnya probe header BOQ) dijalankan lewat timeout_backend (pytesseract), yang
+    mematikan proses tesseract-nya begitu batas waktunya habis. Pemanggilan tanpa timeout
+    memakai pool.
+    """
+    name = "tesserocr"
+
+    def __init__(self, max_engines_per_key=4, timeout_backend=None):
+        self.max_engines_per_key = max_engines_per_key
+        self.timeout_backend = timeout_backend or PytesseractBackend()
+        self._pools = {}
+        self._created = {}
+        self._lock = threading.Lock()
+
+    def _acquire(self, key):
+        with self._lock:
+            pool = self._pools.setdefault(key, queue.Queue())
+            try:
+                return pool.get_nowait()
+            except queue.Empty:
+                if self._created.get(key, 0) < self.max_engines_per_key:
+                    self._created[key] = self._created.get(key, 0) + 1
+                    create = True
+                else:
+                    create = False
+        if create:
+            lang, oem, variables = key
+            kwargs = {"lang": lang}
+            if oem is not None:
+                kwargs["oem"] = oem
+            try:
+                engine = tesserocr.PyTessBaseAPI(**kwargs)
+            except Exception:
+                with self._lock:
+                    self._created[key] -= 1
+                raise
+            for name, value in variables:
+                engine.SetVariable(name, value)
+            return engine
+        # Semua engine untuk kunci ini sedang dipakai, tunggu giliran
+        return pool.get()
+
+    def _release(self, key, engine):
+        self._pools[key].put(engine)
+
+    def _run(self, image, lang, config, reader):
+        psm, oem, variables = parse_tesseract_config(config)
+        key = (lang, oem, tuple(sorted(variables.items())))
+        engine = self._acquire(key)
+        try:
+            engine.SetPageSegMode(psm if psm is not None else tesserocr.PSM.AUTO)
+            engine.SetImage(_to_pil(image))
+            return reader(engine)
+        finally:
+            engine.Clear()
+            self._release(key, engine)
+
+    def image_to_string(self, image, lang, config="", timeout=0):
+        if timeout:
+            return self.timeout_backend.image_to_string(image, lang, config, timeout)
+        return self._run(image, lang, config, lambda engine: engine.GetUTF8Text())
+
+    def image_to_data(self, image, lang, config="", timeout=0):
+        if timeout:
+            return self.timeout_backend.image_to_data(image, lang, config, timeout)
+        tsv = self._run(image, lang, config, lambda engine: engine.GetTSVText(0))
+        data = {column: [] for column in TSV_COLUMNS}
+        for row in tsv.splitlines():
+            values = row.split("\t")
+            if len(values) < len(TSV_COLUMNS) - 1:
+                continue
+            values += [""] * (len(TSV_COLUMNS) - len(values))
+            for column, value in zip(TSV_COLUMNS, values):
+                data[column].append(value if column == "text" else float(value) if column == "conf" else int(value))
+        return data
+
+class FallbackBackend(OcrBackend):
+    """
+    Memakai backend utama, dan kembali ke pytesseract jika backend utama gagal. Pemanggilan
+    yang melewati timeout tidak diulang: batas waktu pemanggil sudah habis.
+    """
+
+    def __init__(self, primary, fallback):
+        self.primary = primary
+        self.fallback = fallback
+        self.name = f"{primary.name}+{fallback.name}"
+
+    def image_to_string(self, image, lang, config="", timeout=0):
+        try:
+            return self.primary.image_to_string(image, lang, config, timeout)
+        except Exception as e:
+            if _is_timeout(e):
+                raise
+            print(f"PERINGATAN: Backend OCR {self.primary.name} gagal ({e}), memakai {self.fallback.name}.")
+            return self.fallback.image_to_string(image, lang, config, timeout)
+
+    def image_to_data(self, image, lang, config="", timeout=0):
+        try:
+            return self.primary.image_to_data(image, lang, config, timeout)
+        except Exception as e:
+            if _is_timeout(e):
+                raise
+            print(f"PERINGATAN: Backend OCR {self.primary.name} gagal ({e}), memakai {self.fallback.name}.")
+            return self.fallback.image_to_data(image, lang, config, timeout)
+
+_backend = None
+_backend_lock = threading.Lock()
+
+def get_ocr_backend():
+    """
+    Memilih backend OCR dari [ocr] backend di config.ini: auto, tesserocr atau pytesseract.
+    auto memakai tesserocr jika terpasang, selain itu pytesseract.
+    """
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            config = load_config()
+            choice = config.get('ocr', 'backend', fallback='auto')
+            max_engines = config.getint('ocr', 'engines_per_language', fallback=4)
+            if choice in ('auto', 'tesserocr') and tesserocr is not None:
+                _backend = FallbackBackend(TesserocrPoolBackend(max_engines), PytesseractBackend())
+            else:
+                if choice == 'tesserocr':
+                    print("PERINGATAN: tesserocr tidak terpasang, memakai pytesseract.")
+                _backend = PytesseractBackend()
+        return _backend
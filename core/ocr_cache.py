@@ -0,0 +1,124 @@
+# core/ocr_cache.py
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+from core.config import load_config, resolve_path
+
+def image_fingerprint(image):
+    """
+    Hash isi piksel gambar (PIL Image atau numpy array), tidak bergantung pada nama file.
+    """
+    digest = hashlib.sha256()
+    if hasattr(image, "tobytes") and hasattr(image, "mode"):
+        # PIL Image
+        digest.update(f"{image.mode}:{image.size}".encode())
+        digest.update(image.tobytes())
+    else:
+        # numpy array (hasil pra-pemrosesan OpenCV)
+        digest.update(f"{image.dtype}:{image.shape}".encode())
+        digest.update(image.tobytes())
+    return digest.hexdigest()
+
+def make_cache_key(image, kind, lang, config, dpi=None):
+    """
+    Kunci cache: hash piksel + bahasa tesseract + config psm/oem + DPI + jenis keluaran.
+    """
+    parts = [image_fingerprint(image), kind, lang, config or "", str(dpi or "")]
+    return hashlib.sha256("|".join(parts).encode()).hexdigest()
+
+class OcrCache:
+    """
+    Cache hasil OCR di disk (SQLite) dengan eviksi LRU berdasarkan total ukuran.
+    Aman dipakai dari beberapa thread dan bertahan setelah server di-restart.
+    """
+
+    def __init__(self, path, max_bytes):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS ocr_cache ("
+            " key TEXT PRIMARY KEY, value BLOB NOT NULL,"
+            " size INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_ocr_cache_access ON ocr_cache(last_access)")
+        self._conn.commit()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM ocr_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute("UPDATE ocr_cache SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+        return json.loads(zlib.decompress(row[0]).decode("utf-8"))
+
+    def put(self, key, value):
+        blob = zlib.compress(json.dumps(value).encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO ocr_cache (key, value, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, blob, len(blob), time.time()),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM ocr_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Hapus entri yang paling lama tidak diakses sampai ukuran kembali di bawah batas
+        for key, size in self._conn.execute("SELECT key, size FROM ocr_cache ORDER BY last_access").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM ocr_cache WHERE key = ?", (key,))
+            total -= size
+
+    def stats(self):
+        with self._lock:
+            entries, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM ocr_cache"
+            ).fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": total}
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_ocr_cache():
+    """
+    Mengembalikan instance cache global sesuai config.ini, atau None jika cache dimatikan.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            config = load_config()
+            if config.getboolean('ocr_cache', 'enabled', fallback=True):
+                path = resolve_path(config.get('ocr_cache', 'path', fallback='data/ocr_cache.sqlite'))
+                max_mb = config.getint('ocr_cache', 'max_mb', fallback=512)
+                _cache = OcrCache(path, max_mb * 1024 * 1024)
+            else:
+                _cache = False
+        return _cache or None
+
+def set_ocr_cache(cache):
+    """
+    Mengganti cache global untuk proses ini (None = tanpa cache), misalnya agar benchmark
+    mengukur OCR yang sebenarnya atau memakai cache sementara yang masih kosong.
+    """
+    global _cache
+    with _cache_lock:
+        _cache = cache if cache is not None else False
@@ -0,0 +1,176 @@
+# core/ocr_scheduler.py
+"""
+Admission control OCR untuk seluruh proses. Beberapa sesi Streamlit (atau job service)
+yang memproses dokumen bersamaan berbagi satu batas jumlah tesseract yang berjalan
+sekaligus ([ocr] max_concurrent), agar CPU tidak diperebutkan.
+
+Pemanggilan yang harus menunggu diantrikan per jalur prioritas:
+- interactive: halaman dan tabel BOQ yang sedang ditunggu reviewer,
+- document: analisis halaman untuk checklist,
+- background: pencarian label bukti.
+Di dalam satu jalur, sesi dilayani bergiliran (round-robin, seperti FairJobQueue), sehingga
+dokumen kecil tidak menunggu di belakang seluruh halaman scan 300 halaman milik sesi lain.
+Pemanggilan yang sudah menunggu lebih dari [ocr] lane_aging_seconds didahulukan tanpa
+melihat jalurnya, agar jalur background tidak tertahan selamanya oleh dokumen besar.
+
+Sesi dan jalur dibawa lewat contextvars (ocr_session, ocr_lane), jadi ikut terbawa ke worker
+thread yang dijalankan lewat map_pages/iter_pages.
+"""
+import contextvars
+import functools
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+from core.config import load_config
+from core.instrumentation import count
+
+LANE_INTERACTIVE = "interactive"
+LANE_DOCUMENT = "document"
+LANE_BACKGROUND = "background"
+# Urutan prioritas, dari yang paling didahulukan
+LANES = (LANE_INTERACTIVE, LANE_DOCUMENT, LANE_BACKGROUND)
+
+_session = contextvars.ContextVar("docscheck_ocr_session", default="default")
+_lane = contextvars.ContextVar("docscheck_ocr_lane", default=LANE_DOCUMENT)
+
+class OcrScheduler:
+    """
+    Semaphore dengan antrian berprioritas: paling banyak max_concurrent slot terpakai,
+    dan slot yang kosong diberikan ke jalur tertinggi yang punya antrian, bergiliran antar sesi.
+    """
+
+    def __init__(self, max_concurrent, aging_seconds=30.0):
+        self.max_concurrent = max(1, max_concurrent)
+        self.aging_seconds = aging_seconds
+        self._running = 0
+        self._waiting = {lane: OrderedDict() for lane in LANES}
+        self._condition = threading.Condition()
+
+    def _head(self):
+        # Kandidat: tiket terdepan setiap jalur, sesuai urutan prioritas
+        heads = []
+        for lane in LANES:
+            sessions = self._waiting[lane]
+            if sessions:
+                session, tickets = next(iter(sessions.items()))
+                heads.append((lane, session, tickets[0]))
+        if not heads:
+            return None
+        aged = [head for head in heads if time.monotonic() - head[2][0] > self.aging_seconds]
+        return min(aged, key=lambda head: head[2][0]) if aged else heads[0]
+
+    def _admit(self, session, lane):
+        start = time.perf_counter()
+        with self._condition:
+            if self._running < self.max_concurrent and self._head() is None:
+                self._running += 1
+                return 0.0
+            # Tiket berisi waktu masuk antrian (list agar setiap tiket unik)
+            ticket = [time.monotonic()]
+            self._waiting[lane].setdefault(session, deque()).append(ticket)
+            while True:
+                head = self._head()
+                if head[2] is ticket and self._running < self.max_concurrent:
+                    break
+                self._condition.wait()
+            # Sesi yang baru dilayani pindah ke belakang giliran di jalurnya
+            sessions = self._waiting[lane]
+            tickets = sessions.pop(session)
+            tickets.popleft()
+            if tickets:
+                sessions[session] = tickets
+            self._running += 1
+            # Slot mungkin masih tersisa untuk antrian berikutnya
+            self._condition.notify_all()
+        return time.perf_counter() - start
+
+    def _release(self):
+        with self._condition:
+            self._running -= 1
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self, session=None, lane=None):
+        """
+        Menunggu giliran lalu menahan satu slot OCR selama blok berjalan.
+        Default sesi dan jalur diambil dari ocr_session/ocr_lane yang aktif.
+        """
+        lane = lane or _lane.get()
+        waited = self._admit(session or _session.get(), lane)
+        count("ocr_queue_admitted_total", lane=lane)
+        count("ocr_queue_wait_seconds_total", waited, lane=lane)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def snapshot(self):
+        """
+        Keadaan saat ini sebagai gauge: slot terpakai dan kedalaman antrian per jalur.
+        """
+        with self._condition:
+            depths = {lane: sum(len(t) for t in self._waiting[lane].values()) for lane in LANES}
+            sessions = {session for lane in LANES for session in self._waiting[lane]}
+        gauges = {
+            "ocr_max_concurrent": self.max_concurrent,
+            "ocr_running": self._running,
+            "ocr_queue_depth": sum(depths.values()),
+            "ocr_sessions_waiting": len(sessions),
+        }
+        gauges.update({f"ocr_queue_depth_{lane}": depth for lane, depth in depths.items()})
+        return gauges
+
+@contextmanager
+def ocr_session(session_id):
+    """
+    Menandai pemanggilan OCR di dalam blok ini (termasuk worker thread-nya) sebagai milik satu sesi.
+    """
+    token = _session.set(session_id or "default")
+    try:
+        yield
+    finally:
+        _session.reset(token)
+
+@contextmanager
+def ocr_lane(lane):
+    """
+    Menjalankan OCR di dalam blok ini pada jalur prioritas tertentu (LANES).
+    """
+    token = _lane.set(lane)
+    try:
+        yield
+    finally:
+        _lane.reset(token)
+
+def in_lane(lane):
+    """
+    Dekorator ocr_lane untuk satu fungsi.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with ocr_lane(lane):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+def get_ocr_scheduler():
+    """
+    Scheduler global per proses; batasnya dari [ocr] max_concurrent (0 = jumlah core CPU).
+    """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            config = load_config()
+            max_concurrent = config.getint('ocr', 'max_concurrent', fallback=0)
+            _scheduler = OcrScheduler(
+                max_concurrent or os.cpu_count() or 1,
+                aging_seconds=config.getfloat('ocr', 'lane_aging_seconds', fallback=30),
+            )
+        return _scheduler
@@ -0,0 +1,347 @@
+# core/page_analysis.py
+from dataclasses import dataclass, field
+
+import fitz
+
+from core.config import load_config
+from core.instrumentation import count, page_scope, span
+from core.ocr import ocr_to_data
+from core.page_classifier import (
+    PAGE_BLANK, PAGE_PHOTO, caption_bands, classify_page, get_classifier_settings, render_gray,
+)
+from core.page_dedup import get_page_index, page_signature
+from core.resolution import get_resolution_settings, mean_confidence, ocr_with_escalation, scale_words
+from core.parallel import map_pages
+
+# Satu konfigurasi OCR untuk seluruh tahap (checker, pencari BOQ, pengumpul bukti)
+ANALYSIS_OCR_CONFIG = "--psm 3"
+# Strip keterangan foto dan pita judul berisi satu blok teks pendek
+CAPTION_OCR_CONFIG = "--psm 6"
+TITLE_OCR_CONFIG = "--psm 6"
+MIN_TEXT_LAYER_CHARS = 20
+
+@dataclass
+class PageAnalysis:
+    """
+    Hasil analisis satu halaman PDF: teks digital, hasil OCR, kotak kata dan confidence.
+    OCR halaman penuh dijalankan paling banyak sekali per halaman (lihat ensure_ocr),
+    lalu hasilnya dibaca oleh semua tahap pipeline.
+    """
+    index: int
+    text_layer: str = ""
+    ocr_text: str = ""
+    # Kotak kata dalam koordinat gambar halaman pada DPI provider (images.dpi), apa pun DPI OCR-nya
+    words: list = field(default_factory=list)
+    ocr_done: bool = False
+    ignored: bool = False
+    # Jenis halaman dari page_classifier (blank, text, table, photo); "" = belum diklasifikasi
+    kind: str = ""
+    # Judul halaman (baris teratas), dari teks digital atau OCR pita atas halaman
+    title: str = ""
+    # Jika hasil OCR dipakai ulang dari halaman yang hampir identik: {"doc_id", "index"} halaman sumbernya
+    duplicate_of: dict = field(default_factory=dict)
+
+    @property
+    def has_text_layer(self):
+        return len(self.text_layer.strip()) >= MIN_TEXT_LAYER_CHARS
+
+    @property
+    def content(self):
+        # Teks digital diutamakan, OCR hanya dipakai jika teks digital tidak memadai
+        if self.has_text_layer or not self.ocr_text:
+            return self.text_layer
+        return self.ocr_text
+
+    @property
+    def text(self):
+        """
+        Teks halaman untuk checklist. Halaman yang judulnya masuk ignore_titles dikosongkan.
+        """
+        return "" if self.ignored else self.content
+
+    @property
+    def mean_confidence(self):
+        return mean_confidence(self.words)
+
+def ocr_page(index, images):
+    """
+    OCR halaman penuh untuk satu halaman pada [resolution] page_dpi; halaman dengan confidence
+    rendah diulang pada DPI tinggi (lihat core/resolution.py). Mengembalikan [teks, words].
+    """
+    with page_scope(index):
+        if not hasattr(images, "get"):
+            # List gambar lama hanya punya satu resolusi
+            image = images[index]
+            if image is None:
+                return ["", []]
+            return list(ocr_to_data(image, config=ANALYSIS_OCR_CONFIG))
+        page_dpi, _, _ = get_resolution_settings()
+        text, words, dpi = ocr_with_escalation(
+            lambda dpi: images.get(index, dpi=dpi), ANALYSIS_OCR_CONFIG, "page", page_dpi
+        )
+        return [text, scale_words(words, images.dpi / dpi)]
+
+def render_band(index, images, y0, y1, dpi=None):
+    """
+    Merender pita horizontal halaman (y0-y1 sebagai pecahan tinggi halaman).
+    Mengembalikan (gambar, offset piksel atas pita pada DPI yang sama).
+    """
+    if hasattr(images, "page_rect"):
+        # page_rect membaca ukuran halaman di bawah lock provider (PyMuPDF tidak thread-safe)
+        rect = images.page_rect(index)
+        clip = fitz.Rect(rect.x0, rect.y0 + rect.height * y0, rect.x1, rect.y0 + rect.height * y1)
+        band = images.get(index, dpi=dpi, clip=clip)
+        return band, int(round(rect.height * y0 * (dpi or images.dpi) / 72))
+    image = images[index]
+    offset = int(image.height * y0)
+    return image.crop((0, offset, image.width, int(image.height * y1))), offset
+
+def ocr_band(index, images, y0, y1, config, stage, dpi):
+    """
+    OCR tingkat kata untuk satu pita halaman, dengan eskalasi DPI jika confidence rendah.
+    Kotak kata dikembalikan dalam koordinat halaman penuh pada DPI provider. Mengembalikan (teks, words).
+    """
+    if not hasattr(images, "get"):
+        band, offset = render_band(index, images, y0, y1)
+        text, words = ocr_to_data(band, config=config)
+        return text, scale_words(words, 1, offset)
+
+    offsets = {}
+
+    def render(band_dpi):
+        band, offsets[band_dpi] = render_band(index, images, y0, y1, dpi=band_dpi)
+        return band
+
+    text, words, used_dpi = ocr_with_escalation(render, config, stage, dpi)
+    return text, scale_words(words, images.dpi / used_dpi, offsets[used_dpi])
+
+def ocr_caption_bands(index, images, stats):
+    """
+    OCR hanya pita teks di luar area foto (judul dan keterangan/label). Kotak kata
+    dikembalikan dalam koordinat halaman penuh. Mengembalikan [teks, words].
+    """
+    texts, words = [], []
+    page_dpi, _, _ = get_resolution_settings()
+    with page_scope(index):
+        for y0, y1 in caption_bands(stats):
+            text, band_words = ocr_band(index, images, y0, y1, CAPTION_OCR_CONFIG, "caption", page_dpi)
+            if text.strip():
+                texts.append(text)
+            for word in band_words:
+                # Nomor baris dibuat unik per pita
+                words.append(dict(word, line=[len(texts)] + list(word["line"][1:])))
+    return ["\n".join(texts), words]
+
+def _ocr_by_kind(index, images, kind, stats=None):
+    if kind == PAGE_BLANK:
+        return ["", []]
+    if kind == PAGE_PHOTO and stats is not None:
+        return ocr_caption_bands(index, images, stats)
+    return ocr_page(index, images)
+
+def classify_for_read(index, images, has_text_layer=False, kind=""):
+    """
+    Merender halaman sekali pada DPI klasifikasi dan mengklasifikasikannya (jika jenisnya belum
+    diketahui). Render yang sama dipakai untuk sidik dedup (find_duplicate), jadi tidak bergantung
+    pada LRU provider yang dipakai bersama worker lain. Mengembalikan (jenis, statistik, gray).
+    """
+    enabled, dpi = get_classifier_settings()
+    gray = None
+    if enabled or get_page_index() is not None:
+        gray = render_gray(images, index, dpi)
+    stats = None
+    if not kind or kind == PAGE_PHOTO:
+        kind, stats = classify_page(index, images, has_text_layer, gray=gray)
+    return kind, stats, gray
+
+def find_duplicate(index, images, gray=None):
+    """
+    Mencari halaman hampir identik yang sudah pernah di-OCR (core/page_dedup.py), di dokumen
+    ini maupun dokumen lain. gray adalah render DPI klasifikasi jika sudah ada.
+    Mengembalikan (sidik, hasil); hasil None jika tidak ada duplikat.
+    """
+    page_index = get_page_index()
+    signature = page_signature(index, images, gray) if page_index is not None else None
+    if signature is None:
+        return None, None
+    count("dedup_lookups_total")
+    match = page_index.find(signature)
+    if match is not None:
+        if match["doc_id"] != getattr(images, "doc_id", None):
+            scope = "corpus"
+        else:
+            # Halaman yang sama dari pemrosesan ulang dokumen ini dihitung terpisah
+            scope = "repeat" if match["page_index"] == index else "document"
+        count("dedup_hits_total", scope=scope)
+        match["scope"] = scope
+    return signature, match
+
+def remember_page(signature, index, images, kind, text, words):
+    """
+    Menyimpan hasil OCR halaman penuh ke indeks dedup agar bisa dipakai ulang halaman lain.
+    """
+    page_index = get_page_index()
+    if signature is not None and page_index is not None:
+        page_index.add(signature, getattr(images, "doc_id", None), index, kind, text, words)
+
+def _duplicate_source(match):
+    if match["scope"] == "repeat":
+        return {}
+    return {"doc_id": match["doc_id"], "index": match["page_index"]}
+
+def read_page(index, images, has_text_layer=False, kind=""):
+    """
+    Mengklasifikasikan halaman (jika belum) lalu menjalankan OCR sesuai jenisnya:
+    halaman kosong dilewati, halaman foto hanya di-OCR pada strip keterangannya,
+    halaman teks/tabel di-OCR penuh. Halaman yang hampir identik dengan halaman yang sudah
+    di-OCR memakai hasil halaman tersebut; halaman kosong tidak masuk indeks dedup.
+    Mengembalikan [jenis, teks, words, duplicate_of].
+    """
+    with page_scope(index):
+        kind, stats, gray = classify_for_read(index, images, has_text_layer, kind)
+        if kind == PAGE_BLANK:
+            return [kind, "", [], {}]
+        signature, match = find_duplicate(index, images, gray)
+        if match is not None:
+            return [match["kind"], match["text"], match["words"], _duplicate_source(match)]
+        text, words = _ocr_by_kind(index, images, kind, stats)
+        remember_page(signature, index, images, kind, text, words)
+        return [kind, text, words, {}]
+
+def get_title_probe_settings():
+    """
+    Membaca pengaturan probe judul dari section [title_probe] di config.ini.
+    """
+    config = load_config()
+    enabled = config.getboolean('title_probe', 'enabled', fallback=True)
+    dpi = config.getint('title_probe', 'dpi', fallback=100)
+    fraction = config.getfloat('title_probe', 'fraction', fallback=0.2)
+    return enabled, dpi, fraction
+
+def probe_title(index, images, dpi, fraction):
+    """
+    OCR hanya pita atas halaman (judul) pada DPI rendah, dieskalasi jika confidence rendah.
+    Mengembalikan teks pita tersebut.
+    """
+    with page_scope(index), span("probe_title"):
+        return ocr_band(index, images, 0.0, fraction, TITLE_OCR_CONFIG, "title_probe", dpi)[0]
+
+def detect_title(text, max_lines=2):
+    """
+    Judul halaman: gabungan beberapa baris pertama yang tidak kosong.
+    """
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    return " ".join(lines[:max_lines])
+
+def _matches_title(text, ignore_titles):
+    text_lower = text.lower()
+    return any(title.lower() in text_lower for title in ignore_titles)
+
+def apply_ignore_titles(pages, ignore_titles):
+    """
+    Menghitung ulang status ignored halaman dengan daftar ignore_titles lain, tanpa OCR
+    (misalnya saat aturan dijalankan ulang terhadap indeks dokumen).
+    """
+    for page in pages:
+        page.ignored = bool(ignore_titles) and _matches_title(page.content, ignore_titles)
+    return pages
+
+def _read_scanned_page(page, images, ignore_titles, need_body):
+    kind, stats, gray = classify_for_read(page.index, images)
+    page.kind = kind
+    if kind == PAGE_BLANK:
+        # Halaman kosong tidak perlu OCR maupun sidik dedup (semua halaman kosong "identik")
+        page.ocr_done = True
+        return
+    signature, match = find_duplicate(page.index, images, gray)
+    if match is not None:
+        page.kind, page.ocr_text, page.words = match["kind"], match["text"], match["words"]
+        page.duplicate_of = _duplicate_source(match)
+        page.ocr_done = True
+        return
+    # Probe judul hanya jika isi halaman memang bisa dilewati (need_body() bernilai False). Selama isi
+    # halaman dibutuhkan, probe hanya menambah satu pemanggilan tesseract per halaman; judul dan
+    # ignore_titles cukup diambil dari hasil OCR penuh (lihat analyze_page).
+    if kind != PAGE_PHOTO and need_body is not None and not need_body():
+        enabled, dpi, fraction = get_title_probe_settings()
+        if enabled:
+            probe_text = probe_title(page.index, images, dpi, fraction)
+            page.title = detect_title(probe_text)
+            page.ignored = bool(ignore_titles) and _matches_title(probe_text, ignore_titles)
+            # Isi halaman tidak dibutuhkan: cukup teks pita atas, OCR penuh bisa menyusul lewat ensure_ocr
+            page.ocr_text = probe_text
+            return
+    page.ocr_text, page.words = _ocr_by_kind(page.index, images, kind, stats)
+    page.ocr_done = True
+    remember_page(signature, page.index, images, kind, page.ocr_text, page.words)
+
+def analyze_page(index, images, text_layer="", ignore_titles=None, ocr=True, need_body=None):
+    """
+    Membungkus teks digital halaman dan, jika teks digital tidak memadai, menjalankan
+    satu kali OCR pada gambar halaman. images adalah PageImageProvider (atau list gambar);
+    halaman baru dirender di sini. Halaman yang gagal di-OCR tetap dikembalikan dengan teks OCR kosong.
+    Dengan ocr=False hanya teks digital yang dipakai; OCR bisa disusulkan lewat ensure_ocr.
+
+    Halaman scan yang hampir identik dengan halaman yang sudah pernah di-OCR (di dokumen ini
+    atau dokumen lain) langsung memakai jenis dan hasil OCR halaman tersebut (duplicate_of).
+    Jika need_body diberikan dan need_body() bernilai False (isi halaman tidak dibutuhkan lagi),
+    halaman scan teks/tabel lainnya hanya di-OCR pita judulnya ([title_probe]): teks pita atas
+    disimpan sebagai ocr_text dengan ocr_done=False, dan judul serta ignore_titles diambil dari pita
+    tersebut. Selain itu halaman langsung di-OCR penuh.
+    """
+    page = PageAnalysis(index=index, text_layer=text_layer or "")
+    if ocr and not page.has_text_layer and images is not None and index < len(images):
+        with page_scope(index), span("analyze_page"):
+            try:
+                _read_scanned_page(page, images, ignore_titles, need_body)
+            except Exception as e:
+                print(f"Error OCR pada halaman {index + 1}: {e}")
+                page.ocr_done = True
+
+    if not page.title:
+        page.title = detect_title(page.content)
+    if ignore_titles and not page.ignored:
+        page.ignored = _matches_title(page.content, ignore_titles)
+    return page
+
+def ensure_ocr(pages, images, indices=None):
+    """
+    Memastikan halaman-halaman (default: semua) sudah di-OCR sesuai jenisnya (lihat read_page).
+    Hanya halaman yang belum pernah di-OCR yang diproses, secara paralel.
+    """
+    if indices is None:
+        indices = range(len(pages))
+    pending = [i for i in indices if i < len(pages) and not pages[i].ocr_done and i < len(images)]
+    if not pending:
+        return pages
+
+    results = map_pages(
+        read_page, [(i, images, pages[i].has_text_layer, pages[i].kind) for i in pending],
+        default=lambda i, images, has_text_layer, kind: [kind, "", [], {}],
+    )
+    for i, (kind, text, words, duplicate_of) in zip(pending, results):
+        pages[i].kind, pages[i].ocr_text, pages[i].words = kind, text, words
+        pages[i].duplicate_of = duplicate_of
+        pages[i].ocr_done = True
+    return pages
+
+def ensure_full_ocr(pages, images, indices):
+    """
+    OCR halaman penuh untuk halaman foto yang sejauh ini hanya di-OCR pita keterangannya
+    (read_page), misalnya karena teks yang dicari mungkin tertulis di dalam foto. Hasilnya
+    menggantikan teks dan kotak kata pita keterangan, karena OCR halaman penuh juga mencakupnya.
+    """
+    pending = [i for i in indices if i < len(pages) and i < len(images) and pages[i].kind == PAGE_PHOTO]
+    if not pending:
+        return pages
+    results = map_pages(ocr_page, [(i, images) for i in pending], default=None)
+    for i, result in zip(pending, results):
+        if result is not None and result[0].strip():
+            pages[i].ocr_text, pages[i].words = result
+    return pages
+
+def page_texts(pages):
+    """
+    Mengubah list PageAnalysis (atau list teks biasa) menjadi list teks per halaman.
+    """
+    return [p.text if isinstance(p, PageAnalysis) else (p or "") for p in pages]
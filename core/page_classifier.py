@@ -0,0 +1,133 @@
+# core/page_classifier.py
+import cv2
+import numpy as np
+
+from core.config import load_config
+
+PAGE_BLANK = "blank"
+PAGE_TEXT = "text"
+PAGE_TABLE = "table"
+PAGE_PHOTO = "photo"
+
+def get_classifier_settings():
+    """
+    Membaca pengaturan klasifikasi halaman dari section [classifier] di config.ini.
+    """
+    config = load_config()
+    enabled = config.getboolean('classifier', 'enabled', fallback=True)
+    dpi = config.getint('classifier', 'dpi', fallback=50)
+    return enabled, dpi
+
+def _photo_rows(gray):
+    """
+    Baris gambar yang didominasi warna abu-abu menengah (ciri foto, bukan teks hitam di atas putih).
+    Mengembalikan array boolean per baris.
+    """
+    # Diperhalus dulu agar noise scan pada halaman teks tidak terhitung sebagai warna menengah
+    smooth = cv2.GaussianBlur(gray, (5, 5), 0)
+    # Batas atas relatif terhadap warna kertas, agar kertas scan yang agak gelap tidak dianggap foto
+    paper = float(np.percentile(smooth, 95))
+    midtone = (smooth > 50) & (smooth < paper - 45)
+    return midtone.mean(axis=1) > 0.35
+
+def _line_count(binary, horizontal):
+    h, w = binary.shape
+    if horizontal:
+        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (max(w // 4, 10), 1))
+        strength = cv2.morphologyEx(binary, cv2.MORPH_OPEN, kernel).sum(axis=1) / 255
+        hits = np.where(strength > 0.3 * w)[0]
+    else:
+        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (1, max(h // 8, 10)))
+        strength = cv2.morphologyEx(binary, cv2.MORPH_OPEN, kernel).sum(axis=0) / 255
+        hits = np.where(strength > 0.1 * h)[0]
+    # Piksel bertetangga dihitung sebagai satu garis
+    return int(np.count_nonzero(np.diff(hits) > 2) + 1) if len(hits) else 0
+
+def page_statistics(gray):
+    """
+    Statistik murah dari gambar halaman grayscale beresolusi rendah.
+    """
+    binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)[1]
+    if gray.std() < 8:
+        # Halaman hampir seragam: Otsu akan memisahkan noise saja
+        binary[:] = 0
+    ink = float(np.count_nonzero(binary)) / binary.size
+    edges = cv2.Canny(gray, 80, 200)
+    photo_rows = _photo_rows(gray)
+    count, _, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+    # Komponen kecil seukuran huruf (bukan noise satu piksel, bukan blok foto)
+    areas = stats[1:, cv2.CC_STAT_AREA] if count > 1 else np.array([])
+    glyphs = int(np.count_nonzero((areas >= 3) & (areas <= 0.002 * binary.size)))
+    return {
+        "ink": ink,
+        "edge_density": float(np.count_nonzero(edges)) / edges.size,
+        "photo_fraction": float(photo_rows.mean()),
+        "glyphs": glyphs,
+        "h_lines": _line_count(binary, horizontal=True),
+        "v_lines": _line_count(binary, horizontal=False),
+        "photo_rows": photo_rows,
+        "ink_rows": binary.mean(axis=1) > 0.004,
+    }
+
+def classify_gray(gray, has_text_layer=False):
+    """
+    Mengklasifikasikan halaman sebagai blank, text, table atau photo (foto dengan keterangan).
+    Mengembalikan (jenis, statistik).
+    """
+    stats = page_statistics(gray)
+    if stats["photo_fraction"] >= 0.2:
+        kind = PAGE_PHOTO
+    elif stats["h_lines"] >= 3 and stats["v_lines"] >= 3:
+        kind = PAGE_TABLE
+    elif not has_text_layer and stats["ink"] < 0.002 and stats["glyphs"] < 10:
+        kind = PAGE_BLANK
+    else:
+        kind = PAGE_TEXT
+    return kind, stats
+
+def render_gray(images, index, dpi):
+    image = images.get(index, dpi=dpi) if hasattr(images, "get") else images[index]
+    if image is None:
+        return None
+    if hasattr(images, "get"):
+        return np.array(image.convert("L"))
+    # List gambar lama (resolusi penuh): diperkecil dulu
+    scale = dpi / 200
+    gray = np.array(image.convert("L"))
+    return cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+def classify_page(index, images, has_text_layer=False, gray=None):
+    """
+    Klasifikasi satu halaman dari render DPI rendah ([classifier] dpi). gray adalah render
+    grayscale pada DPI tersebut jika sudah ada (misalnya dipakai bersama sidik dedup).
+    Mengembalikan (jenis, statistik) atau ("", None) jika klasifikasi dimatikan.
+    """
+    enabled, dpi = get_classifier_settings()
+    if not enabled:
+        return "", None
+    if gray is None:
+        gray = render_gray(images, index, dpi)
+    if gray is None:
+        return PAGE_BLANK, None
+    kind, stats = classify_gray(gray, has_text_layer)
+    stats["dpi"] = dpi
+    return kind, stats
+
+def caption_bands(stats, padding=2, min_gap=3):
+    """
+    Pita horizontal di luar area foto yang berisi tinta (judul, keterangan, label).
+    Mengembalikan list (y0, y1) sebagai pecahan tinggi halaman.
+    """
+    text_rows = stats["ink_rows"] & ~stats["photo_rows"]
+    height = len(text_rows)
+    rows = np.where(text_rows)[0]
+    bands = []
+    for y in rows:
+        if bands and y - bands[-1][1] <= min_gap:
+            bands[-1][1] = y
+        else:
+            bands.append([y, y])
+    return [
+        (float(max(y0 - padding, 0) / height), float(min(y1 + 1 + padding, height) / height))
+        for y0, y1 in bands
+    ]
@@ -0,0 +1,259 @@
+# core/page_dedup.py
+"""
+Deduplikasi halaman yang hampir identik (surat pengantar, template S/K, form checklist,
+foto bukti yang ditempel di beberapa halaman) agar hasil klasifikasi dan OCR-nya dipakai ulang.
+
+Setiap halaman scan diberi sidik:
+- dHash 256 bit dari render DPI klasifikasi (dipakai untuk mencari kandidat dengan cepat),
+- bitmap tinta (biner, Otsu) dari render [dedup] verify_dpi (dipakai untuk verifikasi).
+
+dHash saja tidak cukup: dua halaman teks berbeda dengan tata letak yang sama hashnya sangat
+dekat. Verifikasi juga harus dilakukan pada resolusi OCR: pada thumbnail kecil satu digit yang
+berubah ("1250" -> "1256") hanya menggeser satu-dua piksel. Bitmap tinta kedua halaman
+dibandingkan dengan toleransi geser 1 piksel (noise JPEG dan tepi huruf tidak dihitung), lalu
+piksel yang berbeda dijumlahkan per jendela WINDOW x WINDOW piksel (kira-kira satu huruf).
+Kandidat ditolak jika ada satu jendela dengan lebih dari max_window_diff piksel berbeda, jadi
+satu huruf yang berubah sudah cukup untuk menolak, berapa pun luas halamannya. Halaman yang
+di-scan ulang dengan kemiringan lain atau disalin dengan resolusi lebih rendah tidak dianggap
+duplikat, sehingga teks OCR yang dipakai ulang selalu berasal dari gambar yang sama.
+
+Indeks disimpan di SQLite ([dedup] path di config.ini) sehingga berlaku antar dokumen dan
+antar restart; jika path kosong indeks hanya hidup di memori proses.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+import cv2
+import numpy as np
+
+from core.config import load_config, resolve_path
+from core.page_classifier import get_classifier_settings, render_gray
+
+HASH_SIZE = 16
+# Sisi jendela (piksel pada verify_dpi) tempat piksel tinta yang berbeda dijumlahkan
+WINDOW = 16
+MAX_CANDIDATES = 8
+# Versi skema tabel pages (PRAGMA user_version); indeks versi lama dibuang
+SCHEMA_VERSION = 2
+
+def get_dedup_settings():
+    """
+    Membaca pengaturan deduplikasi halaman dari section [dedup] di config.ini.
+    """
+    config = load_config()
+    return {
+        "enabled": config.getboolean('dedup', 'enabled', fallback=True),
+        "path": config.get('dedup', 'path', fallback='data/page_index.sqlite').strip(),
+        "max_mb": config.getint('dedup', 'max_mb', fallback=256),
+        "max_hash_distance": config.getint('dedup', 'max_hash_distance', fallback=64),
+        "verify_dpi": config.getint('dedup', 'verify_dpi', fallback=150),
+        "max_window_diff": config.getint('dedup', 'max_window_diff', fallback=2),
+    }
+
+def dhash(gray, size=HASH_SIZE):
+    """
+    Difference hash: perbandingan kecerahan piksel bertetangga pada gambar size x size.
+    Mengembalikan size*size bit yang dipadatkan menjadi array uint8.
+    """
+    small = cv2.resize(gray, (size + 1, size), interpolation=cv2.INTER_AREA)
+    return np.packbits(small[:, 1:] > small[:, :-1])
+
+def ink_bitmap(gray):
+    """
+    Bitmap tinta halaman (1 = tinta) dengan ambang Otsu, sehingga perbedaan kecerahan atau
+    kompresi scan tidak ikut terhitung.
+    """
+    _, ink = cv2.threshold(gray, 0, 1, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    return ink
+
+def page_signature(index, images, gray=None):
+    """
+    Sidik halaman (hash, bitmap tinta). Hash dihitung dari render DPI klasifikasi (gray, jika
+    classify_page sudah merendernya) dan bitmap dari render [dedup] verify_dpi, yang sama dengan
+    render OCR halaman ([resolution] page_dpi) selama masih ada di LRU provider.
+    Mengembalikan None jika halaman tidak bisa dirender.
+    """
+    if gray is None:
+        _, dpi = get_classifier_settings()
+        gray = render_gray(images, index, dpi)
+    if gray is None:
+        return None
+    verify = render_gray(images, index, get_dedup_settings()["verify_dpi"])
+    if verify is None:
+        return None
+    return dhash(gray), ink_bitmap(verify)
+
+def hash_distance(hash_a, hashes):
+    """
+    Jarak Hamming antara satu hash dan setiap baris di hashes (array uint8 N x byte).
+    """
+    return np.unpackbits(np.bitwise_xor(hashes, hash_a), axis=1).sum(axis=1)
+
+def bitmaps_match(ink_a, ink_b, max_window_diff):
+    """
+    True jika tidak ada jendela WINDOW x WINDOW dengan lebih dari max_window_diff piksel tinta
+    yang hanya ada di salah satu bitmap. Tinta yang bergeser 1 piksel tidak dihitung.
+    """
+    if ink_a.shape != ink_b.shape:
+        return False
+    kernel = np.ones((3, 3), np.uint8)
+    residual = (ink_a & (1 - cv2.dilate(ink_b, kernel))) | (ink_b & (1 - cv2.dilate(ink_a, kernel)))
+    if not residual.any():
+        return True
+    window = cv2.boxFilter(residual.astype(np.float32), -1, (WINDOW, WINDOW), normalize=False)
+    return float(window.max()) <= max_window_diff + 0.5
+
+def pack_bitmap(ink):
+    return zlib.compress(np.packbits(ink).tobytes())
+
+def unpack_bitmap(blob, shape):
+    bits = np.unpackbits(np.frombuffer(zlib.decompress(blob), dtype=np.uint8), count=shape[0] * shape[1])
+    return bits.reshape(shape)
+
+class PageIndex:
+    """
+    Indeks halaman yang sudah di-OCR, dikunci dengan sidik halaman. Hash semua entri
+    disimpan juga di memori untuk pencarian kandidat; bitmap dan hasil OCR hanya dibaca
+    dari SQLite untuk kandidat terdekat. Eviksi LRU berdasarkan total ukuran, seperti OcrCache.
+    """
+
+    def __init__(self, path, max_bytes, max_hash_distance=64, max_window_diff=2):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_hash_distance = max_hash_distance
+        self.max_window_diff = max_window_diff
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            directory = os.path.dirname(path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            # Entri lama diverifikasi dengan thumbnail yang terlalu kasar: tidak dipakai lagi
+            self._conn.execute("DROP TABLE IF EXISTS pages")
+            self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT, hash BLOB NOT NULL,"
+            " bitmap_shape TEXT NOT NULL, bitmap BLOB NOT NULL, result BLOB NOT NULL,"
+            " doc_id TEXT, page_index INTEGER, size INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_pages_access ON pages(last_access)")
+        self._conn.commit()
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._hashes = np.zeros((0, HASH_SIZE * HASH_SIZE // 8), dtype=np.uint8)
+        self._last_id = 0
+
+    def _refresh(self):
+        # Entri baru dari proses lain (worker batch, service) ikut dimuat
+        rows = self._conn.execute(
+            "SELECT id, hash FROM pages WHERE id > ? ORDER BY id", (self._last_id,)
+        ).fetchall()
+        if rows:
+            self._ids = np.concatenate([self._ids, np.array([row[0] for row in rows], dtype=np.int64)])
+            new_hashes = np.frombuffer(b"".join(row[1] for row in rows), dtype=np.uint8)
+            self._hashes = np.vstack([self._hashes, new_hashes.reshape(len(rows), -1)])
+            self._last_id = rows[-1][0]
+
+    def find(self, signature):
+        """
+        Mencari halaman yang hampir identik. Mengembalikan dict (kind, text, words, doc_id,
+        page_index) atau None.
+        """
+        page_hash, ink = signature
+        with self._lock:
+            self._refresh()
+            if not len(self._ids):
+                return None
+            distances = hash_distance(page_hash, self._hashes)
+            order = np.argsort(distances, kind="stable")[:MAX_CANDIDATES]
+            candidates = [int(self._ids[i]) for i in order if distances[i] <= self.max_hash_distance]
+            for row_id in candidates:
+                row = self._conn.execute(
+                    "SELECT bitmap_shape, bitmap, result, doc_id, page_index FROM pages WHERE id = ?", (row_id,)
+                ).fetchone()
+                if row is None:
+                    # Sudah tergusur oleh proses lain
+                    continue
+                shape = tuple(json.loads(row[0]))
+                if shape != ink.shape or not bitmaps_match(ink, unpack_bitmap(row[1], shape), self.max_window_diff):
+                    continue
+                self._conn.execute("UPDATE pages SET last_access = ? WHERE id = ?", (time.time(), row_id))
+                self._conn.commit()
+                result = json.loads(zlib.decompress(row[2]).decode("utf-8"))
+                return dict(result, doc_id=row[3], page_index=row[4])
+        return None
+
+    def add(self, signature, doc_id, page_index, kind, text, words):
+        page_hash, ink = signature
+        bitmap_blob = pack_bitmap(ink)
+        result_blob = zlib.compress(json.dumps({"kind": kind, "text": text, "words": words}).encode("utf-8"))
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO pages (hash, bitmap_shape, bitmap, result, doc_id, page_index, size, last_access)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (page_hash.tobytes(), json.dumps(ink.shape), bitmap_blob, result_blob, doc_id, page_index,
+                 len(bitmap_blob) + len(result_blob), time.time()),
+            )
+            self._evict()
+            self._conn.commit()
+            if cursor.lastrowid == self._last_id + 1:
+                # Jalur cepat: tidak ada entri baru dari proses lain di antaranya
+                self._ids = np.append(self._ids, cursor.lastrowid)
+                self._hashes = np.vstack([self._hashes, page_hash.reshape(1, -1)])
+                self._last_id = cursor.lastrowid
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = []
+        for row_id, size in self._conn.execute("SELECT id, size FROM pages ORDER BY last_access").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM pages WHERE id = ?", (row_id,))
+            evicted.append(row_id)
+            total -= size
+        keep = ~np.isin(self._ids, evicted)
+        self._ids, self._hashes = self._ids[keep], self._hashes[keep]
+
+    def stats(self):
+        with self._lock:
+            entries, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pages").fetchone()
+        return {"entries": entries, "bytes": total}
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_page_index():
+    """
+    Mengembalikan indeks halaman global sesuai config.ini, atau None jika deduplikasi dimatikan.
+    """
+    global _index
+    with _index_lock:
+        if _index is None:
+            settings = get_dedup_settings()
+            if settings["enabled"]:
+                path = resolve_path(settings["path"]) if settings["path"] else ":memory:"
+                _index = PageIndex(
+                    path, settings["max_mb"] * 1024 * 1024,
+                    max_hash_distance=settings["max_hash_distance"], max_window_diff=settings["max_window_diff"],
+                )
+            else:
+                _index = False
+        return _index or None
+
+def set_page_index(index):
+    """
+    Mengganti indeks global untuk proses ini (None = tanpa deduplikasi), misalnya agar
+    benchmark mulai dari indeks kosong.
+    """
+    global _index
+    with _index_lock:
+        _index = index if index is not None else False
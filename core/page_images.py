@@ -0,0 +1,114 @@
+# core/page_images.py
+import hashlib
+import threading
+from collections import OrderedDict
+
+import fitz
+from PIL import Image
+
+from core.instrumentation import span
+from core.parallel import get_executor_settings
+
+DEFAULT_DPI = 200
+MIN_CACHE_SIZE = 4
+
+def document_id(pdf_bytes):
+    """
+    ID dokumen berbasis isi file, dipakai sebagai kunci cache per dokumen.
+    """
+    return hashlib.sha1(pdf_bytes).hexdigest()
+
+class PageImageProvider:
+    """
+    Penyedia gambar halaman yang dirender sesuai kebutuhan dari dokumen PyMuPDF yang sudah terbuka.
+    Halaman hanya dirender saat sebuah tahap benar-benar butuh piksel, pada DPI yang diminta,
+    dan beberapa hasil render terakhir disimpan dalam LRU kecil.
+    Objek ini bisa dipakai seperti list gambar lama: len(images), images[i], for image in images.
+
+    LRU dipakai bersama oleh semua worker halaman (map_pages/iter_pages). Ukuran defaultnya
+    dua entri per worker, agar render verifikasi dedup masih ada saat OCR halaman yang sama
+    memintanya lagi meski worker lain merender halamannya sendiri di antaranya.
+    """
+
+    def __init__(self, pdf_bytes, dpi=DEFAULT_DPI, cache_size=None):
+        self.pdf_bytes = pdf_bytes
+        self.dpi = dpi
+        if cache_size is None:
+            workers, _ = get_executor_settings()
+            cache_size = max(MIN_CACHE_SIZE, 2 * workers)
+        self.cache_size = cache_size
+        self._doc_id = None
+        self._open()
+
+    def _open(self):
+        self._doc = fitz.open(stream=self.pdf_bytes, filetype="pdf")
+        self._cache = OrderedDict()
+        # PyMuPDF tidak thread-safe, rendering dijalankan bergantian
+        self._lock = threading.Lock()
+
+    @property
+    def doc(self):
+        return self._doc
+
+    @property
+    def doc_id(self):
+        if self._doc_id is None:
+            self._doc_id = document_id(self.pdf_bytes)
+        return self._doc_id
+
+    def __len__(self):
+        return len(self._doc)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return self.get(index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self.get(index)
+
+    def get(self, index, dpi=None, clip=None):
+        """
+        Mengembalikan PIL Image untuk halaman index pada DPI tertentu (default DPI provider).
+        clip (fitz.Rect dalam koordinat PDF) dipakai untuk merender sebagian halaman saja.
+        """
+        dpi = dpi or self.dpi
+        key = (index, dpi, tuple(clip) if clip is not None else None)
+        with self._lock:
+            image = self._cache.get(key)
+            if image is not None:
+                self._cache.move_to_end(key)
+                return image
+
+            with span("render_page", index=index, dpi=dpi, clipped=clip is not None):
+                pix = self._doc[index].get_pixmap(dpi=dpi, clip=clip, alpha=False)
+                image = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+
+            self._cache[key] = image
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return image
+
+    def page_rect(self, index):
+        """
+        Ukuran halaman dalam koordinat PDF (poin), untuk membatasi clip.
+        """
+        with self._lock:
+            return self._doc[index].rect
+
+    def close(self):
+        with self._lock:
+            self._cache.clear()
+            self._doc.close()
+
+    # Saat di-pickle (st.cache_data) hanya byte PDF yang dibawa, bukan bitmap
+    def __getstate__(self):
+        return {"pdf_bytes": self.pdf_bytes, "dpi": self.dpi, "cache_size": self.cache_size}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._doc_id = None
+        self._open()
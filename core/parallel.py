@@ -0,0 +1,106 @@
+# core/parallel.py
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from core.config import load_config
+from core.instrumentation import submit_with_context
+
+def _pin_worker_threads(omp_thread_limit):
+    # Batasi thread internal tesseract agar N worker tidak saling berebut core
+    os.environ["OMP_THREAD_LIMIT"] = str(omp_thread_limit)
+
+_workers_override = None
+
+def set_page_workers(workers):
+    """
+    Mengganti jumlah worker per dokumen untuk proses ini, misalnya di mode batch
+    yang sudah memproses beberapa dokumen sekaligus.
+    """
+    global _workers_override
+    _workers_override = workers
+
+def get_executor_settings():
+    """
+    Membaca pengaturan executor OCR dari section [ocr] di config.ini.
+    """
+    config = load_config()
+    workers = _workers_override or config.getint('ocr', 'workers', fallback=0) or (os.cpu_count() or 1)
+    omp_thread_limit = config.getint('ocr', 'omp_thread_limit', fallback=1)
+    return workers, omp_thread_limit
+
+def map_pages(func, items, workers=None, default=None, progress=None):
+    """
+    Menjalankan func(*item) untuk setiap item secara paralel dan mengembalikan hasil
+    sesuai urutan halaman. Jika satu halaman gagal, hasilnya diganti default tanpa
+    menghentikan dokumen. progress(selesai, total) dipanggil setiap satu item selesai.
+
+    Worker berupa thread: tesseract sudah berjalan sebagai proses terpisah (atau melepas GIL
+    lewat tesserocr), dan thread berbagi dokumen PDF yang sudah terbuka serta konteks trace,
+    sesi dan jalur OCR, tanpa mengirim ulang seluruh PDF ke setiap worker.
+    """
+    items = list(items)
+    cfg_workers, omp_thread_limit = get_executor_settings()
+    workers = min(workers or cfg_workers, len(items)) or 1
+
+    if workers == 1:
+        _pin_worker_threads(omp_thread_limit)
+        results = []
+        for index, item in enumerate(items):
+            results.append(_call_safely(func, index, item, default))
+            if progress:
+                progress(index + 1, len(items))
+        return results
+
+    # Subprocess tesseract mewarisi environment proses ini
+    _pin_worker_threads(omp_thread_limit)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [submit_with_context(executor, func, *item) for item in items]
+        results = []
+        for index, future in enumerate(futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                print(f"Error memproses halaman {index + 1}: {e}")
+                results.append(default(*items[index]) if callable(default) else default)
+            if progress:
+                progress(index + 1, len(items))
+    return results
+
+def iter_pages(func, items, workers=None, window=None, default=None):
+    """
+    Versi streaming map_pages: menghasilkan (yield) hasil func(*item) satu per satu sesuai
+    urutan halaman, begitu halaman itu selesai. Paling banyak `window` halaman dikerjakan
+    di depan halaman yang sedang dibaca, sehingga render halaman berikutnya tumpang tindih
+    dengan OCR halaman sekarang. Menutup generator (close) membatalkan halaman yang belum mulai.
+    """
+    items = list(items)
+    cfg_workers, omp_thread_limit = get_executor_settings()
+    workers = workers or cfg_workers
+    window = window or workers * 2
+    _pin_worker_threads(omp_thread_limit)
+
+    executor = ThreadPoolExecutor(max_workers=workers)
+    futures = {}
+    next_index = 0
+    try:
+        for index in range(len(items)):
+            while next_index < len(items) and next_index <= index + window:
+                futures[next_index] = submit_with_context(executor, func, *items[next_index])
+                next_index += 1
+            try:
+                result = futures.pop(index).result()
+            except Exception as e:
+                print(f"Error memproses halaman {index + 1}: {e}")
+                result = default(*items[index]) if callable(default) else default
+            yield result
+    finally:
+        for future in futures.values():
+            future.cancel()
+        executor.shutdown(wait=False)
+
+def _call_safely(func, index, item, default):
+    try:
+        return func(*item)
+    except Exception as e:
+        print(f"Error memproses halaman {index + 1}: {e}")
+        return default(*item) if callable(default) else default
@@ -1,65 +1,56 @@
 # core/pdf_reader.py
-import pytesseract
-from pdf2image import convert_from_path
-import fitz
-import os
-import streamlit as st
-import configparser
-import traceback    
+import traceback
+from core.instrumentation import traced
+from core.page_analysis import PageAnalysis, analyze_page
+from core.page_images import PageImageProvider, document_id  # noqa: F401 (dipakai app.py, batch, service)
+from core.parallel import map_pages
 
-def extract_text_from_pdf(file_path, ignore_titles=None):
+def read_pdf_bytes(source):
     """
-    Fungsi ini diekslusifkan untuk melakukan OCR pada halaman gambar dan mengekstrak teks digital.
-    Fungsi ini akan mengembalikan teks per halaman dan juga list gambar untuk analisis lebih lanjut.
+    source berupa path file atau byte PDF (misalnya hasil upload yang sudah ada di memori).
     """
-    text_per_page = []
-    images = []
-    config = configparser.ConfigParser()
-    script_dir = os.path.dirname(__file__)
-    project_root = os.path.dirname(script_dir)
-    config_path = os.path.join(project_root, 'config.ini')
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return bytes(source)
+    with open(source, "rb") as f:
+        return f.read()
 
-    poppler_path_from_config = None
-    if os.path.exists(config_path):
-        config.read(config_path)
-        poppler_path_from_config = config.get('poppler', 'path', fallback=None)
+def open_pdf(source):
+    """
+    Membuka PDF sekali dan mengembalikan (PageImageProvider, list teks digital per halaman).
+    source berupa path file atau byte PDF; byte dibuka langsung dari memori oleh PyMuPDF,
+    tanpa file sementara, dan dokumen yang sama dipakai semua tahap untuk merender halaman.
+    """
+    pdf_bytes = read_pdf_bytes(source)
+    images = PageImageProvider(pdf_bytes)
+    # Ekstraksi teks digital dari dokumen yang sama (cepat, berurutan)
+    text_layers = [page.get_text("text") for page in images.doc]
+    return images, text_layers
 
+@traced()
+def extract_text_from_pdf(source, ignore_titles=None, progress=None):
+    """
+    Fungsi ini membangun analisis per halaman (teks digital, hasil OCR, kotak kata) dengan
+    satu kali OCR per halaman. Hasilnya dibaca ulang oleh checker, pencari BOQ dan pengumpul bukti.
+    Fungsi ini akan mengembalikan list PageAnalysis dan juga penyedia gambar halaman
+    (PageImageProvider) yang merender halaman hanya saat dibutuhkan.
+    progress(selesai, total) dipanggil setiap satu halaman selesai dianalisis.
+    source berupa path file atau byte PDF.
+    """
     try:
-        images = convert_from_path(file_path, poppler_path=poppler_path_from_config)
+        images, text_layers = open_pdf(source)
     except Exception as e:
-        print(f"Error converting PDF to images: {e}")
+        print(f"Error membuka PDF: {e}")
         traceback.print_exc()
         return [], []
-        # Jika konversi gagal, buat list gambar kosong sesuai jumlah halaman
-        #with fitz.open(file_path) as doc:
-        #    images = [None] * len(doc) 
-    
-    with fitz.open(file_path) as doc:
-        # Pastikan jumlah gambar dan halaman cocok jika konversi berhasil
-        #if len(images) != len(doc):
-        #     images = [None] * len(doc)
-
-        for i, page in enumerate(doc):
-            # Coba ekstraksi teks digital terlebih dahulu
-            text = page.get_text("text")
-            page_content = ""
-            
-            # Jika tidak ada teks digital, lakukan OCR pada gambar halaman tersebut
-            if (not text or len(text.strip()) < 20) and i < len(images) and images[i] is not None:
-                try:
-                    # Gunakan config yang fleksibel untuk menangani berbagai jenis halaman
-                    config = '--psm 6' 
-                    page_content = pytesseract.image_to_string(images[i], lang="ind+eng", config=config)
-                except Exception:
-                    page_content = ""
-            else:
-                page_content = text if text else ""
 
-            # Abaikan halaman berdasarkan judul yang ada di daftar ignore_titles
-            if ignore_titles and any(title.lower() in page_content.lower() for title in ignore_titles):
-                text_per_page.append("")
-            else:
-                text_per_page.append(page_content)
+    # Satu kali OCR per halaman, dijalankan paralel dan dikembalikan sesuai urutan halaman.
+    # Gambar halaman dirender oleh worker masing-masing, bukan sekaligus di awal.
+    jobs = [(i, images, text, ignore_titles) for i, text in enumerate(text_layers)]
+    pages = map_pages(
+        analyze_page, jobs,
+        default=lambda i, images, text, titles: PageAnalysis(index=i, text_layer=text or ""),
+        progress=progress,
+    )
 
-    # Kembalikan DUA variabel: list teks dan list gambar
-    return text_per_page, images
\ No newline at end of file
+    # Kembalikan DUA variabel: list analisis halaman dan penyedia gambar
+    return pages, images
@@ -0,0 +1,208 @@
+# core/pipeline.py
+import time
+
+from core.boq_extractor import extract_boq_table_with_cv, find_boq_page, match_boq_keywords
+from core.checker import ChecklistProgress, check_items
+from core.checklist import CHECKLIST_ITEMS, IGNORE_TITLES, ITEM_ORDER, STRUCTURED_ITEMS
+from core.config import load_config
+from core.page_analysis import PageAnalysis, analyze_page
+from core.page_classifier import PAGE_BLANK, PAGE_PHOTO, PAGE_TEXT
+from core.parallel import iter_pages
+from core.pdf_reader import document_id, extract_text_from_pdf, open_pdf, read_pdf_bytes
+
+def process_document(source, checklist_items=CHECKLIST_ITEMS, item_order=ITEM_ORDER, ignore_titles=IGNORE_TITLES,
+                     progress=None):
+    """
+    Menjalankan seluruh pipeline tanpa Streamlit untuk satu PDF (path file atau byte PDF):
+    analisis halaman, pengecekan checklist, pencarian halaman BOQ dan ekstraksi tabel BOQ.
+    Waktu setiap tahap (detik) dicatat di "timings".
+    progress(tahap, selesai, total) dipanggil untuk melaporkan kemajuan per halaman.
+    """
+    timings = {}
+    report = progress or (lambda stage, done, total: None)
+
+    start = time.perf_counter()
+    pages, images = extract_text_from_pdf(
+        source, ignore_titles=ignore_titles, progress=lambda done, total: report("extract_text", done, total)
+    )
+    timings["extract_text"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    check_results = check_items(checklist_items, pages, item_order)
+    timings["check_items"] = time.perf_counter() - start
+
+    report("find_boq_page", 0, 1)
+    start = time.perf_counter()
+    boq_page_index = find_boq_page(pages, images) if pages else -1
+    timings["find_boq_page"] = time.perf_counter() - start
+
+    report("extract_boq_table", 0, 1)
+    start = time.perf_counter()
+    df_boq = extract_boq_table_with_cv(images, boq_page_index)
+    timings["extract_boq_table"] = time.perf_counter() - start
+    report("done", 1, 1)
+
+    return {
+        "pages": pages,
+        "images": images,
+        "check_results": check_results,
+        "boq_page_index": boq_page_index,
+        "df_boq": df_boq,
+        "timings": timings,
+    }
+
+def iter_document(source, checklist_items=CHECKLIST_ITEMS, item_order=ITEM_ORDER, ignore_titles=IGNORE_TITLES,
+                  stop_early=None):
+    """
+    Versi streaming process_document untuk UI; source berupa path file atau byte PDF
+    (upload dibuka langsung dari memori). Halaman dianalisis sesuai urutan dengan
+    render dan OCR yang saling tumpang tindih, dan setiap halaman yang selesai langsung
+    menghasilkan event {"event": "page", "index", "page_count", "check_results", "boq_page_index"}
+    sehingga checklist bisa ditampilkan bertahap.
+
+    Jika stop_early aktif ([pipeline] stop_early di config.ini), OCR dihentikan begitu semua
+    item checklist OK dan header BOQ sudah ditemukan. Halaman sisanya hanya memakai teks
+    digital (ocr_done=False), sehingga tahap lain masih bisa menyusulkan OCR lewat ensure_ocr.
+    Begitu semua item presence/regex dan header BOQ ditemukan, halaman scan berikutnya hanya
+    di-OCR pita judulnya (cukup untuk item "title").
+
+    Event terakhir adalah {"event": "done", ...} dengan isi yang sama seperti hasil
+    process_document ditambah "stopped_early".
+    """
+    if stop_early is None:
+        stop_early = load_config().getboolean('pipeline', 'stop_early', fallback=True)
+
+    start = time.perf_counter()
+    images, text_layers = open_pdf(source)
+    page_count = len(text_layers)
+    checklist = ChecklistProgress(checklist_items, item_order)
+    pages = []
+    boq_page_index = -1
+    stopped_early = False
+
+    def need_body():
+        # Dipanggil di worker saat halaman mulai diproses
+        return not (stop_early and boq_page_index != -1 and checklist.all_found(body_only=True))
+
+    # Tanpa stop_early isi setiap halaman selalu dibaca, jadi tidak perlu probe judul lebih dulu
+    body_check = need_body if stop_early else None
+    stream = iter_pages(
+        analyze_page, [(i, images, text, ignore_titles, True, body_check) for i, text in enumerate(text_layers)],
+        default=lambda i, images, text, *args: PageAnalysis(index=i, text_layer=text or ""),
+    )
+    for page in stream:
+        pages.append(page)
+        checklist.add_page(page.index, page.text)
+        # Header BOQ hanya diterima dari halaman tabel (atau teks digital); sisanya diputuskan find_boq_page
+        candidate = page.kind not in (PAGE_BLANK, PAGE_PHOTO, PAGE_TEXT) or page.has_text_layer
+        if boq_page_index == -1 and candidate and match_boq_keywords(page.content)[0]:
+            boq_page_index = page.index
+        yield {
+            "event": "page",
+            "index": page.index,
+            "page_count": page_count,
+            "check_results": checklist.results(),
+            "boq_page_index": boq_page_index,
+        }
+        if stop_early and boq_page_index != -1 and checklist.all_found() and len(pages) < page_count:
+            stream.close()
+            stopped_early = True
+            break
+
+    # Halaman yang tidak sempat di-OCR tetap dicek dengan teks digitalnya (tanpa biaya OCR)
+    for i in range(len(pages), page_count):
+        page = analyze_page(i, images, text_layers[i], ignore_titles, ocr=False)
+        pages.append(page)
+        checklist.add_page(i, page.text)
+    timings = {"extract_text": time.perf_counter() - start}
+
+    start = time.perf_counter()
+    if boq_page_index == -1 and pages:
+        boq_page_index = find_boq_page(pages, images)
+    timings["find_boq_page"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    df_boq = extract_boq_table_with_cv(images, boq_page_index)
+    timings["extract_boq_table"] = time.perf_counter() - start
+
+    yield {
+        "event": "done",
+        "pages": pages,
+        "images": images,
+        "check_results": checklist.results(),
+        "boq_page_index": boq_page_index,
+        "df_boq": df_boq,
+        "timings": timings,
+        "stopped_early": stopped_early,
+    }
+
+def deduplicated_pages(pages, doc_id=None):
+    """
+    Halaman yang hasil OCR-nya dipakai ulang dari halaman hampir identik (lihat core/page_dedup.py).
+    Nomor halaman dimulai dari 1; source_doc_id sama dengan doc_id jika sumbernya di dokumen yang sama.
+    """
+    return [
+        {
+            "page": page.index + 1,
+            "source_doc_id": page.duplicate_of["doc_id"],
+            "source_page": page.duplicate_of["index"] + 1,
+            "same_document": page.duplicate_of["doc_id"] == doc_id,
+        }
+        for page in pages if page.duplicate_of
+    ]
+
+def checklist_record(check_results, structured_items=STRUCTURED_ITEMS):
+    """
+    Hasil check_items sebagai list dict (no, sub, item, status, pages) yang bisa ditulis sebagai JSON.
+    """
+    return [
+        {"no": no, "sub": sub, "item": row["Item"], "status": row["Status"], "pages": row["Pages"]}
+        for (no, sub, _), row in zip(structured_items, check_results)
+    ]
+
+def boq_record(df_boq):
+    """
+    Baris DataFrame BOQ sebagai list dict dengan nilai Python biasa (bukan tipe numpy).
+    """
+    return [
+        {key: (value.item() if hasattr(value, "item") else value) for key, value in row.items()}
+        for row in df_boq.to_dict("records")
+    ]
+
+def document_record(file_path, result, structured_items=STRUCTURED_ITEMS):
+    """
+    Merangkum hasil process_document menjadi satu record yang bisa ditulis sebagai JSON.
+    """
+    images = result["images"]
+    if result.get("doc_id"):
+        # Hasil replay indeks dokumen: PDF tidak dibuka lagi
+        doc_id = result["doc_id"]
+    elif hasattr(images, "pdf_bytes"):
+        doc_id = document_id(images.pdf_bytes)
+    else:
+        doc_id = document_id(read_pdf_bytes(file_path))
+
+    return {
+        "path": file_path,
+        "doc_id": doc_id,
+        "page_count": len(result["pages"]),
+        "checklist": checklist_record(result["check_results"], structured_items),
+        "boq_page_index": result["boq_page_index"],
+        "boq_rows": boq_record(result["df_boq"]),
+        "deduplicated_pages": deduplicated_pages(result["pages"], doc_id),
+        "timings": {stage: round(seconds, 3) for stage, seconds in result["timings"].items()},
+        "error": None,
+    }
+
+def replay_record(result, structured_items=STRUCTURED_ITEMS):
+    """
+    Record JSON untuk hasil replay_document (core/doc_index.py): seperti document_record,
+    ditambah halaman bukti per designator (nomor halaman mulai 1) dan halaman yang belum di-OCR.
+    """
+    record = document_record(result["source"], result, structured_items)
+    record.update(
+        evidence={designator: [i + 1 for i in pages] for designator, pages in result["evidence_index"].items() if pages},
+        pages_without_ocr=result["pages_without_ocr"],
+        replayed=True,
+    )
+    return record
@@ -0,0 +1,157 @@
+# core/report.py
+"""
+Laporan Excel gabungan untuk banyak dokumen: satu workbook berisi
+- Ringkasan: satu baris per dokumen (jumlah item checklist OK/NOK, halaman BOQ, status verifikasi),
+- Checklist: status setiap item checklist per dokumen,
+- BOQ: baris BOQ per dokumen beserta halaman bukti, status verifikasi dan catatan.
+
+Workbook ditulis baris demi baris dengan mode constant_memory xlsxwriter: setiap baris langsung
+dipindah ke file sementara, sehingga memori tetap kecil untuk ratusan dokumen. Record dokumen
+sama dengan baris JSONL mode batch (document_record / replay_record).
+
+Contoh (dari hasil batch):
+    python batch.py data/arsip --output hasil.jsonl --report laporan.xlsx
+"""
+import json
+import math
+from collections import Counter
+
+import pandas as pd
+import xlsxwriter
+
+SUMMARY_COLUMNS = [
+    ("Dokumen", 50), ("Doc ID", 42), ("Jumlah Halaman", 10), ("Checklist OK", 10), ("Checklist NOK", 10),
+    ("Halaman BOQ", 10), ("Baris BOQ", 10), ("Status Verifikasi", 40), ("Error", 40),
+]
+CHECKLIST_COLUMNS = [("Dokumen", 50), ("No", 5), ("Sub", 5), ("Item", 60), ("Status", 8), ("Halaman", 20)]
+BOQ_COLUMNS = [
+    ("Dokumen", 50), ("Designator", 30), ("Satuan", 10), ("Kuantitas BOQ", 12), ("Halaman Bukti", 20),
+    ("Status Verifikasi", 20), ("Catatan", 60),
+]
+
+def _pages_text(pages):
+    return ", ".join(str(page) for page in pages or [])
+
+def _is_empty(value):
+    # Sel kosong di data_editor (baris baru) berisi NaN/NaT; xlsxwriter menolak NaN/INF
+    return value is None or value is pd.NaT or (isinstance(value, float) and not math.isfinite(value))
+
+class ReportWriter:
+    """
+    Penulis workbook laporan gabungan. output adalah path file atau objek file (misalnya BytesIO).
+    Dokumen ditambahkan satu per satu lewat add_document; workbook selesai ditulis saat close().
+    """
+
+    def __init__(self, output):
+        self.workbook = xlsxwriter.Workbook(output, {"constant_memory": True})
+        header = self.workbook.add_format({"bold": True, "bg_color": "#DDDDDD", "border": 1, "text_wrap": True})
+        self._status_formats = {
+            "OK": self.workbook.add_format({"font_color": "#006100", "bg_color": "#C6EFCE"}),
+            "NOK": self.workbook.add_format({"font_color": "#9C0006", "bg_color": "#FFC7CE"}),
+        }
+        self._wrap = self.workbook.add_format({"text_wrap": True, "valign": "top"})
+        self._sheets = {}
+        for name, columns in (("Ringkasan", SUMMARY_COLUMNS), ("Checklist", CHECKLIST_COLUMNS), ("BOQ", BOQ_COLUMNS)):
+            sheet = self.workbook.add_worksheet(name)
+            for col, (title, width) in enumerate(columns):
+                sheet.set_column(col, col, width)
+                sheet.write(0, col, title, header)
+            sheet.freeze_panes(1, 0)
+            # [worksheet, baris berikutnya, jumlah kolom]
+            self._sheets[name] = [sheet, 1, len(columns)]
+        self.documents = 0
+
+    def _write_row(self, name, values, formats=None):
+        entry = self._sheets[name]
+        sheet, row = entry[0], entry[1]
+        for col, value in enumerate(values):
+            if not _is_empty(value):
+                sheet.write(row, col, value, (formats or {}).get(col))
+        entry[1] += 1
+
+    def add_document(self, record, verification=None):
+        """
+        Menambahkan satu dokumen. record berbentuk baris JSONL mode batch; verification
+        (opsional) memetakan designator -> (status, catatan) hasil verifikasi reviewer.
+        """
+        verification = verification or {}
+        path = record.get("path") or record.get("doc_id") or ""
+        checklist = record.get("checklist") or []
+        boq_rows = record.get("boq_rows") or []
+        evidence = record.get("evidence") or {}
+        statuses = Counter(verification[row.get("DESIGNATOR")][0] for row in boq_rows if row.get("DESIGNATOR") in verification)
+        boq_page_index = record.get("boq_page_index", -1)
+
+        self._write_row("Ringkasan", [
+            path,
+            record.get("doc_id"),
+            record.get("page_count"),
+            sum(1 for item in checklist if item["status"] == "OK"),
+            sum(1 for item in checklist if item["status"] != "OK"),
+            boq_page_index + 1 if boq_page_index is not None and boq_page_index >= 0 else None,
+            len(boq_rows),
+            ", ".join(f"{status}: {n}" for status, n in statuses.items()) or None,
+            record.get("error"),
+        ])
+        for item in checklist:
+            self._write_row(
+                "Checklist",
+                [path, item.get("no"), item.get("sub"), item.get("item"), item.get("status"), _pages_text(item.get("pages"))],
+                formats={4: self._status_formats.get(item.get("status"))},
+            )
+        for row in boq_rows:
+            designator = row.get("DESIGNATOR")
+            status, notes = verification.get(designator, (None, None))
+            self._write_row(
+                "BOQ",
+                [path, designator, row.get("SATUAN"), row.get("KUANTITAS_BOQ"), _pages_text(evidence.get(designator)),
+                 status, notes or None],
+                formats={6: self._wrap},
+            )
+        self.documents += 1
+
+    def close(self):
+        for sheet, rows, columns in self._sheets.values():
+            sheet.autofilter(0, 0, max(rows - 1, 0), columns - 1)
+        self.workbook.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+def iter_latest_records(jsonl_path):
+    """
+    Membaca record JSONL mode batch; untuk dokumen yang muncul lebih dari sekali (misalnya
+    --retry-errors) hanya record terakhir yang dipakai. Dokumen dikenali dari doc_id maupun path:
+    record digantikan oleh record berikutnya yang doc_id atau path-nya sama (record error hanya
+    punya path), sedangkan record tanpa keduanya tidak pernah digabung. Hasil replay dokumen
+    yang diindeks app/service tidak punya path, jadi dikenali dari doc_id saja.
+    Baris yang terpotong diabaikan. File dibaca dua kali agar record tidak perlu ditampung di memori.
+    """
+    keys = {}
+    last_line = {}
+    with open(jsonl_path, "r", encoding="utf-8") as f:
+        for number, line in enumerate(f):
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            keys[number] = [(field, record[field]) for field in ("doc_id", "path") if record.get(field) is not None]
+            for key in keys[number]:
+                last_line[key] = number
+    keep = {number for number, record_keys in keys.items() if all(last_line[key] == number for key in record_keys)}
+    with open(jsonl_path, "r", encoding="utf-8") as f:
+        for number, line in enumerate(f):
+            if number in keep:
+                yield json.loads(line)
+
+def write_report(jsonl_path, output):
+    """
+    Menulis workbook laporan gabungan dari file JSONL mode batch. Mengembalikan jumlah dokumen.
+    """
+    with ReportWriter(output) as report:
+        for record in iter_latest_records(jsonl_path):
+            report.add_document(record)
+    return report.documents
@@ -0,0 +1,69 @@
+# core/resolution.py
+"""
+Kebijakan resolusi OCR per tahap. Tahap murah (probe judul, deteksi header BOQ, OCR halaman
+untuk checklist dan label bukti) dijalankan pada DPI rendah; hanya hasil yang confidence
+kata-katanya rendah yang diulang sekali pada DPI tinggi ([resolution] di config.ini).
+Tabel BOQ tetap dibaca pada [boq] table_dpi.
+"""
+from core.config import load_config
+from core.instrumentation import count
+from core.ocr import ocr_to_data
+
+def get_resolution_settings():
+    """
+    Membaca kebijakan resolusi dari section [resolution] di config.ini.
+    Mengembalikan (page_dpi, escalate_dpi, min_confidence).
+    """
+    config = load_config()
+    page_dpi = config.getint('resolution', 'page_dpi', fallback=150)
+    escalate_dpi = config.getint('resolution', 'escalate_dpi', fallback=300)
+    min_confidence = config.getfloat('resolution', 'min_confidence', fallback=70)
+    return page_dpi, escalate_dpi, min_confidence
+
+def mean_confidence(words):
+    """
+    Rata-rata confidence tesseract (0-100) dari kata-kata hasil ocr_to_data; None jika tidak ada kata.
+    """
+    confs = [w["conf"] for w in words if w["conf"] >= 0]
+    return sum(confs) / len(confs) if confs else None
+
+def scale_words(words, scale, offset=0):
+    """
+    Mengubah kotak kata ke DPI lain (scale = DPI tujuan / DPI OCR). offset ditambahkan
+    ke posisi atas sebelum diskalakan (misalnya posisi pita dalam halaman).
+    """
+    if scale == 1 and not offset:
+        return words
+    return [
+        dict(
+            word,
+            left=int(round(word["left"] * scale)),
+            top=int(round((word["top"] + offset) * scale)),
+            width=int(round(word["width"] * scale)),
+            height=int(round(word["height"] * scale)),
+        )
+        for word in words
+    ]
+
+def ocr_with_escalation(render, config, stage, dpi, escalate_dpi=None, min_confidence=None, timeout=0):
+    """
+    OCR tingkat kata pada render(dpi). Jika ada kata yang terbaca tetapi rata-rata confidence-nya
+    di bawah min_confidence, halaman dirender ulang pada escalate_dpi dan di-OCR sekali lagi;
+    dipakai hasil yang confidence-nya lebih tinggi. Render tanpa kata (pita kosong, halaman
+    tanpa teks) tidak dieskalasi. Mengembalikan (teks, words, dpi hasil yang dipakai).
+    """
+    if escalate_dpi is None or min_confidence is None:
+        _, default_escalate, default_confidence = get_resolution_settings()
+        escalate_dpi = default_escalate if escalate_dpi is None else escalate_dpi
+        min_confidence = default_confidence if min_confidence is None else min_confidence
+    text, words = ocr_to_data(render(dpi), config=config, timeout=timeout, dpi=dpi)
+    confidence = mean_confidence(words)
+    if escalate_dpi <= dpi or confidence is None or confidence >= min_confidence:
+        return text, words, dpi
+
+    count("ocr_escalations_total", stage=stage)
+    high_text, high_words = ocr_to_data(render(escalate_dpi), config=config, timeout=timeout, dpi=escalate_dpi)
+    high_confidence = mean_confidence(high_words)
+    if high_confidence is not None and high_confidence > confidence:
+        return high_text, high_words, escalate_dpi
+    return text, words, dpi
@@ -0,0 +1,38 @@
+# core/service_client.py
+import json
+import urllib.request
+from urllib.parse import quote
+
+from core.config import load_config
+from core.page_analysis import PageAnalysis
+
+def get_service_url():
+    """
+    URL service worker dari [service] url di config.ini. Kosong berarti proses lokal.
+    """
+    return load_config().get('service', 'url', fallback='').strip().rstrip('/')
+
+def _request(url, data=None, timeout=30):
+    request = urllib.request.Request(url, data=data, method="POST" if data is not None else "GET")
+    if data is not None:
+        request.add_header("Content-Type", "application/pdf")
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read().decode("utf-8"))
+
+def submit_job(service_url, pdf_bytes, client_id):
+    return _request(f"{service_url}/jobs?client={quote(client_id)}", data=pdf_bytes, timeout=120)
+
+def get_job(service_url, job_id):
+    return _request(f"{service_url}/jobs/{job_id}")
+
+def get_result(service_url, job_id):
+    return _request(f"{service_url}/jobs/{job_id}/result", timeout=120)
+
+def get_trace(service_url, job_id):
+    return _request(f"{service_url}/jobs/{job_id}/trace")
+
+def pages_from_result(result):
+    """
+    Mengubah teks per halaman dari hasil service kembali menjadi list PageAnalysis.
+    """
+    return [PageAnalysis(**page) for page in result.get("pages", [])]
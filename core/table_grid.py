@@ -0,0 +1,84 @@
+# core/table_grid.py
+import cv2
+import numpy as np
+
+def _group_positions(indices, max_gap=3):
+    """
+    Menggabungkan indeks piksel yang berdekatan menjadi satu posisi garis (nilai tengah).
+    """
+    positions = []
+    group = []
+    for idx in indices:
+        if group and idx - group[-1] > max_gap:
+            positions.append(int(np.mean(group)))
+            group = []
+        group.append(idx)
+    if group:
+        positions.append(int(np.mean(group)))
+    return positions
+
+def _intervals(lines, min_size):
+    return [(a, b) for a, b in zip(lines, lines[1:]) if b - a >= min_size]
+
+def detect_table_grid(gray):
+    """
+    Mendeteksi garis tabel dengan morfologi OpenCV pada gambar grayscale.
+    Mengembalikan dict berisi rows [(y0, y1)] dan cols [(x0, x1)], atau None jika
+    halaman tidak memiliki tabel bergaris yang jelas.
+    """
+    h, w = gray.shape[:2]
+    binary = cv2.adaptiveThreshold(~gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY, 15, -2)
+
+    # Garis horizontal: bukaan morfologi dengan kernel memanjang ke samping
+    horiz_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (max(w // 30, 10), 1))
+    horizontal = cv2.morphologyEx(binary, cv2.MORPH_OPEN, horiz_kernel)
+    row_strength = horizontal.sum(axis=1) / 255
+    row_lines = _group_positions(np.where(row_strength > 0.3 * w)[0])
+    if len(row_lines) < 3:
+        return None
+
+    top, bottom = row_lines[0], row_lines[-1]
+
+    # Garis vertikal: hanya dihitung di dalam rentang tinggi tabel
+    vert_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (1, max(h // 60, 10)))
+    vertical = cv2.morphologyEx(binary[top:bottom + 1], cv2.MORPH_OPEN, vert_kernel)
+    col_strength = vertical.sum(axis=0) / 255
+    col_lines = _group_positions(np.where(col_strength > 0.5 * (bottom - top))[0])
+    if len(col_lines) < 4:
+        return None
+
+    min_cell = max(h // 200, 8)
+    rows = _intervals(row_lines, min_cell)
+    cols = _intervals(col_lines, min_cell)
+    if len(rows) < 2 or len(cols) < 3:
+        return None
+    return {"rows": rows, "cols": cols, "width": w, "height": h}
+
+def same_columns(grid_a, grid_b, tolerance=0.02):
+    """
+    Mengecek apakah dua grid memiliki susunan kolom yang sama (untuk tabel yang
+    berlanjut ke halaman berikutnya). Posisi dibandingkan relatif terhadap lebar halaman.
+    """
+    if grid_a is None or grid_b is None or len(grid_a["cols"]) != len(grid_b["cols"]):
+        return False
+    for (a0, a1), (b0, b1) in zip(grid_a["cols"], grid_b["cols"]):
+        if abs(a0 / grid_a["width"] - b0 / grid_b["width"]) > tolerance:
+            return False
+        if abs(a1 / grid_a["width"] - b1 / grid_b["width"]) > tolerance:
+            return False
+    return True
+
+def crop_cell(gray, row, col, inset=3):
+    """
+    Memotong satu sel tanpa garis tepinya.
+    """
+    (y0, y1), (x0, x1) = row, col
+    return gray[y0 + inset:max(y1 - inset, y0 + inset + 1), x0 + inset:max(x1 - inset, x0 + inset + 1)]
+
+def is_blank_cell(cell, min_ink_pixels=25):
+    """
+    Sel tanpa tinta (hanya noise beberapa piksel) tidak perlu di-OCR.
+    """
+    if cell.size == 0:
+        return True
+    return np.count_nonzero(cell < 128) < min_ink_pixels
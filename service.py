@@ -0,0 +1,221 @@
+# service.py
+"""
+Service worker lokal: menerima PDF lewat HTTP, memprosesnya di worker latar belakang
+dengan antrian adil per klien, dan menyimpan status/progres/hasil job di disk.
+app.py menjadi klien tipis jika [service] url diisi di config.ini.
+
+Menjalankan service:
+    python service.py
+
+API:
+    POST /jobs?client=<id>     body: byte PDF  -> status job (job yang sama dipakai ulang untuk dokumen yang sama)
+    GET  /jobs/<job_id>        -> status, progres per halaman, posisi antrian
+    GET  /jobs/<job_id>/result -> hasil pipeline (checklist, BOQ, teks per halaman, indeks bukti)
+    GET  /jobs/<job_id>/trace  -> trace JSON job (span per tahap, OCR per psm dan halaman)
+    GET  /health               -> jumlah worker, kedalaman antrian job dan antrian OCR
+    GET  /metrics              -> metrik kumulatif service dalam format teks Prometheus
+"""
+import json
+import os
+import threading
+import time
+import traceback
+from dataclasses import asdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from core.config import load_config, resolve_path
+from core.doc_index import save_document
+from core.evidence_counter import build_evidence_index
+from core.instrumentation import process_metrics, trace_document
+from core.ocr_scheduler import get_ocr_scheduler, ocr_session
+from core.job_store import (
+    JOB_DONE, JOB_FAILED, JOB_QUEUED, JOB_RUNNING, FairJobQueue, JobStore, is_valid_job_id,
+)
+from core.parallel import set_page_workers
+from core.pdf_reader import document_id
+from core.pipeline import document_record, process_document
+
+def run_job(store, job_id):
+    """
+    Menjalankan pipeline untuk satu job dan mencatat progres per halaman ke job.json.
+    """
+    store.update(job_id, status=JOB_RUNNING, started=time.time())
+    input_path = store.input_path(job_id)
+    last_update = [0.0]
+
+    def progress(stage, done, total):
+        # Progres per halaman ditulis paling sering dua kali per detik
+        now = time.time()
+        if stage != "extract_text" or done == total or now - last_update[0] > 0.5:
+            last_update[0] = now
+            store.update(job_id, progress={"stage": stage, "done": done, "total": total})
+
+    # OCR job ini diantrikan adil terhadap job klien lain yang sedang berjalan
+    with trace_document() as trace, ocr_session(store.get(job_id)["client_id"]):
+        try:
+            result = process_document(input_path, progress=progress)
+            # Indeks bukti dibangun di sini agar klien tipis tidak perlu meng-OCR halaman bukti sendiri
+            store.update(job_id, progress={"stage": "evidence_index", "done": 0, "total": 1})
+            evidence_index = build_evidence_index(result["images"], result["pages"], result["boq_page_index"])
+            record = document_record(input_path, result)
+            record["pages"] = [asdict(page) for page in result["pages"]]
+            record["evidence_index"] = evidence_index
+            save_document(record["doc_id"], result["pages"], result["boq_page_index"], result["df_boq"])
+            store.save_result(job_id, record)
+            status, error = JOB_DONE, None
+        except Exception as e:
+            traceback.print_exc()
+            status, error = JOB_FAILED, f"{type(e).__name__}: {e}"
+    store.save_trace(job_id, trace.to_json())
+    store.update(job_id, status=status, finished=time.time(), error=error)
+    # PDF upload tidak disimpan setelah job selesai; hasil job tidak membutuhkannya lagi
+    store.remove_input(job_id)
+
+class JobService:
+    def __init__(self, store, workers, retention_seconds=0):
+        self.store = store
+        self.queue = FairJobQueue()
+        self.workers = workers
+        # 0 = job yang sudah selesai tidak pernah dihapus
+        self.retention_seconds = retention_seconds
+        self._threads = []
+        self._submit_lock = threading.Lock()
+
+    def start(self):
+        # Job yang belum selesai saat service berhenti dimasukkan kembali ke antrian
+        for job in self.store.all_jobs():
+            if job["status"] in (JOB_QUEUED, JOB_RUNNING):
+                self.store.update(job["job_id"], status=JOB_QUEUED)
+                self.queue.put(job["client_id"], job["job_id"])
+        for _ in range(self.workers):
+            thread = threading.Thread(target=self._work, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        if self.retention_seconds > 0:
+            thread = threading.Thread(target=self._prune, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _prune(self):
+        # Diperiksa paling jarang sekali per jam, atau lebih sering jika masa simpannya pendek
+        interval = min(3600, self.retention_seconds)
+        while True:
+            with self._submit_lock:
+                removed = self.store.prune(self.retention_seconds)
+            if removed:
+                print(f"INFO: {removed} job lama dihapus dari {self.store.root}.")
+            time.sleep(interval)
+
+    def _work(self):
+        while True:
+            job_id = self.queue.get()
+            run_job(self.store, job_id)
+
+    def submit(self, pdf_bytes, client_id):
+        doc_id = document_id(pdf_bytes)
+        with self._submit_lock:
+            existing = self.store.find_by_doc(doc_id)
+            if existing is not None:
+                return existing, False
+            job = self.store.create(pdf_bytes, doc_id, client_id)
+        self.queue.put(client_id, job["job_id"])
+        return job, True
+
+    def status(self, job_id):
+        job = self.store.get(job_id)
+        if job is not None and job["status"] == JOB_QUEUED:
+            job["queue_position"] = self.queue.position(job_id)
+        return job
+
+def make_handler(service, max_upload_bytes):
+    class JobRequestHandler(BaseHTTPRequestHandler):
+        def _send_json(self, status, data):
+            body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _send_text(self, status, text):
+            body = text.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            if url.path != "/jobs":
+                return self._send_json(404, {"error": "not found"})
+            length = int(self.headers.get("Content-Length") or 0)
+            if length <= 0 or length > max_upload_bytes:
+                return self._send_json(413 if length else 400, {"error": "ukuran upload tidak valid"})
+            pdf_bytes = self.rfile.read(length)
+            client_id = parse_qs(url.query).get("client", ["anonymous"])[0]
+            job, created = service.submit(pdf_bytes, client_id)
+            self._send_json(202 if created else 200, job)
+
+        def do_GET(self):
+            parts = [part for part in urlparse(self.path).path.split("/") if part]
+            if parts == ["health"]:
+                return self._send_json(200, {
+                    "workers": service.workers, "queue_depth": service.queue.depth(),
+                    "ocr": get_ocr_scheduler().snapshot(),
+                })
+            if parts == ["metrics"]:
+                return self._send_text(200, process_metrics().to_prometheus(
+                    extra=dict(
+                        get_ocr_scheduler().snapshot(),
+                        service_workers=service.workers, service_queue_depth=service.queue.depth(),
+                    )
+                ))
+            if len(parts) in (2, 3) and parts[0] == "jobs" and not is_valid_job_id(parts[1]):
+                return self._send_json(404, {"error": "job tidak ditemukan"})
+            if len(parts) == 2 and parts[0] == "jobs":
+                job = service.status(parts[1])
+                return self._send_json(200, job) if job else self._send_json(404, {"error": "job tidak ditemukan"})
+            if len(parts) == 3 and parts[0] == "jobs" and parts[2] == "result":
+                job = service.store.get(parts[1])
+                if job is None:
+                    return self._send_json(404, {"error": "job tidak ditemukan"})
+                if job["status"] != JOB_DONE:
+                    return self._send_json(409, {"error": "job belum selesai", "status": job["status"]})
+                return self._send_json(200, service.store.load_result(parts[1]))
+            if len(parts) == 3 and parts[0] == "jobs" and parts[2] == "trace":
+                trace = service.store.load_trace(parts[1])
+                return self._send_json(200, trace) if trace else self._send_json(404, {"error": "trace tidak ditemukan"})
+            self._send_json(404, {"error": "not found"})
+
+        def log_message(self, format, *args):
+            pass
+
+    return JobRequestHandler
+
+def main():
+    config = load_config()
+    host = config.get('service', 'host', fallback='127.0.0.1')
+    port = config.getint('service', 'port', fallback=8765)
+    workers = config.getint('service', 'workers', fallback=2)
+    jobs_dir = resolve_path(config.get('service', 'jobs_dir', fallback='data/jobs'))
+    max_upload_bytes = config.getint('service', 'max_upload_mb', fallback=200) * 1024 * 1024
+    retention_seconds = config.getfloat('service', 'job_retention_days', fallback=7) * 24 * 3600
+
+    # Core dibagi rata antar worker dokumen
+    set_page_workers(max(1, (os.cpu_count() or 1) // workers))
+
+    service = JobService(JobStore(jobs_dir), workers, retention_seconds=retention_seconds)
+    service.start()
+    server = ThreadingHTTPServer((host, port), make_handler(service, max_upload_bytes))
+    print(f"INFO: Service berjalan di http://{host}:{port} dengan {workers} worker.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
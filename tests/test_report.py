@@ -0,0 +1,34 @@
+import io
+import json
+
+import pandas as pd
+from openpyxl import load_workbook
+
+from core.pipeline import boq_record
+from core.report import ReportWriter, iter_latest_records
+
+def test_empty_boq_cells_are_written_blank():
+    # Baris baru dari data_editor: designator dan kuantitas masih kosong
+    df_boq = pd.DataFrame({"DESIGNATOR": ["AC-OF-SM-24", None], "KUANTITAS_BOQ": [12.0, float("nan")]})
+    record = {"path": "bundle.pdf", "doc_id": "abc", "checklist": [], "boq_rows": boq_record(df_boq)}
+    output = io.BytesIO()
+    with ReportWriter(output) as report:
+        report.add_document(record, {"AC-OF-SM-24": ("OK", "")})
+
+    rows = list(load_workbook(output)["BOQ"].iter_rows(min_row=2, values_only=True))
+    assert rows[0][1:4] == ("AC-OF-SM-24", None, 12)
+    assert rows[1][1:4] == (None, None, None)
+
+def test_latest_records_keyed_by_doc_id(tmp_path):
+    records = [
+        {"path": None, "doc_id": "a"},
+        {"path": None, "doc_id": "b"},
+        {"path": "x.pdf", "error": "OSError"},
+        {"path": "x.pdf", "doc_id": "c"},
+        {"path": None, "doc_id": "a", "page_count": 3},
+    ]
+    jsonl = tmp_path / "hasil.jsonl"
+    jsonl.write_text("\n".join(json.dumps(record) for record in records) + "\n", encoding="utf-8")
+
+    latest = list(iter_latest_records(jsonl))
+    assert [(record["doc_id"], record.get("page_count")) for record in latest] == [("b", None), ("c", None), ("a", 3)]
@@ -0,0 +1,31 @@
+import core.resolution as resolution
+
+def _fake_ocr(results):
+    calls = []
+
+    def ocr_to_data(image, config="--psm 3", timeout=0, dpi=None):
+        calls.append(dpi)
+        return results[dpi]
+    return ocr_to_data, calls
+
+def _word(conf):
+    return {"text": "BOQ", "left": 0, "top": 0, "width": 10, "height": 10, "conf": conf, "line": [1, 1, 1]}
+
+def test_mean_confidence_without_words_is_none():
+    assert resolution.mean_confidence([]) is None
+    assert resolution.mean_confidence([_word(-1)]) is None
+    assert resolution.mean_confidence([_word(60), _word(80)]) == 70
+
+def test_empty_render_is_not_escalated(monkeypatch):
+    fake, calls = _fake_ocr({150: ("", [])})
+    monkeypatch.setattr(resolution, "ocr_to_data", fake)
+    result = resolution.ocr_with_escalation(lambda dpi: dpi, "", "caption", 150, escalate_dpi=300, min_confidence=70)
+    assert result == ("", [], 150)
+    assert calls == [150]
+
+def test_low_confidence_words_are_escalated(monkeypatch):
+    fake, calls = _fake_ocr({150: ("B0Q", [_word(40)]), 300: ("BOQ", [_word(90)])})
+    monkeypatch.setattr(resolution, "ocr_to_data", fake)
+    text, _, dpi = resolution.ocr_with_escalation(lambda dpi: dpi, "", "page", 150, escalate_dpi=300, min_confidence=70)
+    assert (text, dpi) == ("BOQ", 300)
+    assert calls == [150, 300]